@@ -18,6 +18,8 @@ from . import (
     websocket,
     ready,
     check,
+    metrics,
+    sync,
 )
 from ..settings import settings
 
@@ -46,6 +48,9 @@ api_router.include_router(checkout.router, prefix="/stripe", tags=["stripe"])
 # Webhooks (Meta + Stripe)
 api_router.include_router(webhooks.router, prefix="/webhooks", tags=["webhooks"])
 
+# Delta sync for reconnecting clients
+api_router.include_router(sync.router, prefix="/sync", tags=["sync"])
+
 # AI Drafting
 api_router.include_router(ai.router, prefix="/ai", tags=["ai"])
 
@@ -61,3 +66,6 @@ api_router.include_router(websocket.router, prefix="/ws", tags=["websocket"])
 api_router.include_router(check.router, prefix="/check", tags=["check"])
 
 api_router.include_router(ready.router, prefix="", tags=["ready"])
+
+# Metrics
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
@@ -1,6 +1,23 @@
+from typing import Iterable, Set
+
+from fastapi import HTTPException
+from prisma.models import Conversation
+
+from app.db import db
 from app.repositories.conversation_participant_repository import (
+    conversation_acl_cache,
     conversation_participant_repository,
 )
+from app.repositories.conversation_repository import conversation_repo
+from app.settings import settings
+
+
+def _remember_access(user_id: str, conversation_id: str, allowed: bool) -> None:
+    conversation_acl_cache.set(
+        (user_id, conversation_id),
+        allowed,
+        ttl_seconds=None if allowed else settings.acl_cache_negative_ttl_seconds,
+    )
 
 
 async def can_user_access_conversation(
@@ -8,7 +25,69 @@ async def can_user_access_conversation(
     user_id: str,
     conversation_id: str,
 ) -> bool:
-    return await conversation_participant_repository.exists(
+    allowed = conversation_acl_cache.get((user_id, conversation_id))
+    if allowed is not None:
+        return allowed
+
+    allowed = await conversation_participant_repository.exists(
         user_id=user_id,
         conversation_id=conversation_id,
     )
+    _remember_access(user_id, conversation_id, allowed)
+    return allowed
+
+
+async def filter_accessible_conversations(
+    *,
+    user_id: str,
+    conversation_ids: Iterable[str],
+) -> Set[str]:
+    """
+    The subset of `conversation_ids` the user may access.
+
+    Answers from the ACL cache where it can and resolves the rest with one
+    query, caching every answer.
+    """
+    allowed: Set[str] = set()
+    unknown = []
+    for conversation_id in set(conversation_ids):
+        cached = conversation_acl_cache.get((user_id, conversation_id))
+        if cached is None:
+            unknown.append(conversation_id)
+        elif cached:
+            allowed.add(conversation_id)
+
+    if unknown:
+        found = await conversation_participant_repository.accessible_conversation_ids(
+            user_id=user_id,
+            conversation_ids=unknown,
+        )
+        for conversation_id in unknown:
+            _remember_access(user_id, conversation_id, conversation_id in found)
+        allowed |= found
+
+    return allowed
+
+
+async def get_accessible_conversation(
+    *,
+    user_id: str,
+    conversation_id: str,
+) -> Conversation:
+    """
+    Load a conversation with its contact for a participant.
+
+    Raises 404 when it does not exist and 403 when the user is not a
+    participant. Fetch and access check share one query.
+    """
+    conversation, allowed = await conversation_repo.get_for_participant(
+        db, conversation_id, user_id=user_id
+    )
+    if conversation is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    _remember_access(user_id, conversation_id, allowed)
+    if not allowed:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    return conversation
@@ -1,11 +1,10 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Query
 
 from app.api.users import get_current_user
-from app.api.access_control import can_user_access_conversation
+from app.api.access_control import get_accessible_conversation
 from app.db import db
-from app.repositories.conversation_repository import conversation_repo
 from app.repositories.message_repository import message_repo
 from app.services.ai_service import ai_service
 
@@ -19,14 +18,9 @@ async def generate_draft(
     current_user=Depends(get_current_user),
 ):
     """Generate an AI-drafted response for a conversation."""
-    conversation = await conversation_repo.get_by_id(db, conversation_id)
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-
-    if not await can_user_access_conversation(
+    await get_accessible_conversation(
         user_id=current_user.id, conversation_id=conversation_id
-    ):
-        raise HTTPException(status_code=403, detail="Access denied")
+    )
 
     recent_messages = await message_repo.get_recent(
         db,
@@ -2,6 +2,9 @@
 API endpoints for authentication.
 """
 
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.params import Security
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
@@ -16,10 +19,20 @@ from app.schemas.user import (
     LogoutResponse,
     Role,
 )
-from app.repositories.user_repository import user_repo
-from app.services.auth_service import auth_service
+from app.repositories.user_repository import user_cache, user_repo
+from app.services.auth_service import (
+    ExpiredTokenError,
+    InvalidTokenError,
+    WrongTokenTypeError,
+    auth_service,
+)
+from app.services.password_hasher import PasswordHasherBusyError
+from app.settings import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/br-general/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl="/br-general/auth/login", auto_error=False
+)
 
 router = APIRouter()
 
@@ -42,16 +55,53 @@ async def get_current_user(token: str = Security(oauth2_scheme)) -> UserOut:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if settings.auth_trust_token_claims:
+        claimed = _user_from_claims(payload)
+        if claimed is not None:
+            return claimed
+
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+
     user = await user_repo.get_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    return UserOut(
+    current = UserOut(
         id=user.id,
         email=user.email,
         name=user.name,
         role=Role(user.role),
     )
+    user_cache.set(user_id, current)
+    return current
+
+
+def _user_from_claims(payload: dict) -> Optional[UserOut]:
+    """Build the user from signed profile claims, if the token carries them."""
+    try:
+        return UserOut(
+            id=payload["sub"],
+            email=payload["email"],
+            name=payload["name"],
+            role=Role(payload["role"]),
+        )
+    except (KeyError, ValueError):
+        return None
+
+
+@contextmanager
+def password_hashing_admission() -> Iterator[None]:
+    """Turn a saturated password hasher pool into 429 Too Many Requests."""
+    try:
+        yield
+    except PasswordHasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many sign-in attempts in progress, please retry",
+            headers={"Retry-After": "1"},
+        )
 
 
 # -------------------------
@@ -65,7 +115,8 @@ async def register(user_in: UserCreate):
     if await user_repo.get_by_email(db, user_in.email):
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_pw = auth_service.hash_password(user_in.password)
+    with password_hashing_admission():
+        hashed_pw = await auth_service.hash_password(user_in.password)
 
     user = await user_repo.create(
         db,
@@ -75,7 +126,9 @@ async def register(user_in: UserCreate):
         role=user_in.role,
     )
 
-    access_token = auth_service.create_access_token(user.id)
+    access_token = auth_service.create_access_token(
+        user.id, claims=auth_service.user_claims(user)
+    )
     refresh_token = auth_service.create_refresh_token(user.id)
 
     return UserWithTokens(
@@ -96,12 +149,19 @@ async def register(user_in: UserCreate):
 @router.post("/login")
 async def login_oauth(form_data: OAuth2PasswordRequestForm = Depends()):
     user = await user_repo.get_by_email(db, form_data.username)
-    if not user or not auth_service.verify_password(
-        form_data.password, user.hashed_password
-    ):
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    access_token = auth_service.create_access_token(user.id)
+    with password_hashing_admission():
+        verified = await auth_service.verify_password(
+            form_data.password, user.hashed_password
+        )
+    if not verified:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    access_token = auth_service.create_access_token(
+        user.id, claims=auth_service.user_claims(user)
+    )
 
     return {
         "access_token": access_token,
@@ -115,10 +175,16 @@ async def login_full(form_data: OAuth2PasswordRequestForm = Depends()):
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    if not auth_service.verify_password(form_data.password, user.hashed_password):
+    with password_hashing_admission():
+        verified = await auth_service.verify_password(
+            form_data.password, user.hashed_password
+        )
+    if not verified:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    access_token = auth_service.create_access_token(user.id)
+    access_token = auth_service.create_access_token(
+        user.id, claims=auth_service.user_claims(user)
+    )
     refresh_token = auth_service.create_refresh_token(user.id)
 
     return UserWithTokens(
@@ -156,7 +222,9 @@ async def refresh_tokens(body: RefreshTokenRequest):
             role=Role(user.role),
         ),
         tokens=Token(
-            access_token=auth_service.create_access_token(user.id),
+            access_token=auth_service.create_access_token(
+                user.id, claims=auth_service.user_claims(user)
+            ),
             refresh_token=auth_service.create_refresh_token(user.id),
             token_type="bearer",
         ),
@@ -164,8 +232,19 @@ async def refresh_tokens(body: RefreshTokenRequest):
 
 
 @router.post("/logout", response_model=LogoutResponse)
-async def logout():
-    """Stateless logout. Client discards tokens."""
+async def logout(token: Optional[str] = Security(optional_oauth2_scheme)):
+    """
+    Logout. Client discards tokens.
+
+    A presented access token is also revoked by `jti` on this worker.
+    """
+    if token:
+        try:
+            auth_service.revoke_token(auth_service.require_access_token(token))
+        except (InvalidTokenError, ExpiredTokenError, WrongTokenTypeError):
+            # Nothing to revoke; the client discards the token anyway
+            pass
+
     return LogoutResponse(
         message="Successfully logged out. Please discard your tokens on the client."
     )
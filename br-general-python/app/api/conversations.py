@@ -4,13 +4,25 @@ API endpoints for conversations and messages.
 
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status, Security
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Response,
+    Security,
+    status,
+)
 
-from app.api.access_control import can_user_access_conversation
+from app.api.access_control import get_accessible_conversation
 from app.api.auth import oauth2_scheme
 from app.api.users import get_current_user
 from app.db import db
 from app.logging import logger
+from app.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from app.repositories.conversation_participant_repository import (
+    conversation_participant_repository,
+)
 from app.repositories.conversation_repository import conversation_repo
 from app.repositories.message_repository import message_repo
 from app.repositories.contact_repository import contact_repo
@@ -20,11 +32,14 @@ from app.schemas.source import Source
 from app.schemas.suggestion import SuggestionOut
 from app.services.message_service import message_service
 from app.services.meta_service import meta_service
+from app.services.outbox_relay import outbox_relay
 from app.settings import settings
+from app.ws.dispatcher import conversation_updates
 from app.schemas.conversation import (
     ConversationStatus,
     ConversationListResponse,
     ConversationWithContact,
+    InboxResponse,
     SendMessageRequest,
     SendMessageResponse,
     MessageOut,
@@ -45,40 +60,88 @@ router = APIRouter(dependencies=[Security(oauth2_scheme)])
 @router.get("", response_model=ConversationListResponse)
 async def list_conversations(
     status: Optional[ConversationStatus] = None,
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user=Depends(get_current_user),
 ):
     """
     List conversations visible to the current user.
+
+    Pass `nextCursor` of the previous response as `cursor` to page; `offset`
+    is only honoured without a cursor. `total` is counted on request.
     """
-    conversations, total = await conversation_repo.list_conversations(
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor)
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        offset = 0
+
+    items = await conversation_repo.list_conversations(
         db,
         user_id=current_user.id,
         status=status,
         limit=limit,
+        after=after,
         offset=offset,
     )
 
-    items = [
-        ConversationWithContact(
-            id=conv.id,
-            contactId=conv.contactId,
-            status=ConversationStatus(conv.status),
-            lastMessageAt=conv.lastMessageAt,
-            createdAt=conv.createdAt,
-            contact=conv.contact,
+    total = None
+    if include_total:
+        total = await conversation_repo.count_conversations(
+            db,
+            user_id=current_user.id,
+            status=status,
         )
-        for conv in conversations
-    ]
+
+    next_cursor = None
+    if len(items) == limit:
+        next_cursor = encode_cursor(items[-1].last_message_at, items[-1].id)
 
     return ConversationListResponse(
         items=items,
         total=total,
         limit=limit,
         offset=offset,
+        nextCursor=next_cursor,
+    )
+
+
+@router.get("/inbox", response_model=InboxResponse)
+async def get_inbox(
+    status: Optional[ConversationStatus] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    current_user=Depends(get_current_user),
+):
+    """
+    Inbox of the current user: conversations with contact, last message
+    preview, unread count and assignees, one query per page.
+    """
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor)
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    items = await conversation_repo.list_inbox(
+        db,
+        user_id=current_user.id,
+        status=status,
+        limit=limit,
+        after=after,
     )
 
+    next_cursor = None
+    if len(items) == limit:
+        next_cursor = encode_cursor(items[-1].last_message_at, items[-1].id)
+
+    return InboxResponse(items=items, limit=limit, nextCursor=next_cursor)
+
 
 @router.get("/{conversation_id}", response_model=ConversationWithContact)
 async def get_conversation(
@@ -88,14 +151,9 @@ async def get_conversation(
     """
     Get a single conversation.
     """
-    conversation = await conversation_repo.get_by_id(db, conversation_id)
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-
-    if not await can_user_access_conversation(
+    conversation = await get_accessible_conversation(
         user_id=current_user.id, conversation_id=conversation_id
-    ):
-        raise HTTPException(status_code=403, detail="Access denied")
+    )
 
     return ConversationWithContact(
         id=conversation.id,
@@ -103,6 +161,10 @@ async def get_conversation(
         status=ConversationStatus(conversation.status),
         lastMessageAt=conversation.lastMessageAt,
         createdAt=conversation.createdAt,
+        messageCount=conversation.messageCount,
+        inboundCount=conversation.inboundCount,
+        lastInboundAt=conversation.lastInboundAt,
+        lastOutboundAt=conversation.lastOutboundAt,
         contact=conversation.contact,
     )
 
@@ -115,14 +177,34 @@ async def close_conversation(
     """
     Close a conversation.
     """
-    conversation = await conversation_repo.get_by_id(db, conversation_id)
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
+    await get_accessible_conversation(
+        user_id=current_user.id, conversation_id=conversation_id
+    )
 
-    if not await can_user_access_conversation(current_user.id, conversation_id):
-        raise HTTPException(status_code=403, detail="Access denied")
+    conversation = await conversation_repo.close(db, conversation_id)
+    conversation_updates.update(
+        conversation_id,
+        {"status": ConversationStatus.CLOSED.value},
+        seq=conversation.changeSeq,
+    )
 
-    await conversation_repo.close(db, conversation_id)
+
+@router.post("/{conversation_id}/read", status_code=status.HTTP_204_NO_CONTENT)
+async def mark_conversation_read(
+    conversation_id: str,
+    current_user=Depends(get_current_user),
+):
+    """
+    Mark the conversation as read up to now for the current user.
+    """
+    await get_accessible_conversation(
+        user_id=current_user.id, conversation_id=conversation_id
+    )
+
+    await conversation_participant_repository.mark_read(
+        conversation_id=conversation_id,
+        user_id=current_user.id,
+    )
 
 
 # -------------------------------------------------------------------
@@ -133,29 +215,64 @@ async def close_conversation(
 @router.get("/{conversation_id}/messages", response_model=list[MessageOut])
 async def get_messages(
     conversation_id: str,
-    limit: int = 50,
-    cursor: Optional[str] = None,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    cursor: Optional[str] = Query(
+        None, deprecated=True, description="Message id; use `before` instead"
+    ),
     current_user=Depends(get_current_user),
 ):
     """
-    Get messages for a conversation.
+    Get messages for a conversation, newest first.
+
+    `before` pages back in history and `after` catches up on newer
+    messages (e.g. after a WebSocket reconnect). Cursors for the older and
+    newer neighbours of the page are returned in the X-Next-Cursor and
+    X-Prev-Cursor headers.
     """
-    conversation = await conversation_repo.get_by_id(db, conversation_id)
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
+    if before is not None and after is not None:
+        raise HTTPException(
+            status_code=400, detail="Use either before or after, not both"
+        )
 
-    if not await can_user_access_conversation(
+    await get_accessible_conversation(
         user_id=current_user.id, conversation_id=conversation_id
-    ):
-        raise HTTPException(status_code=403, detail="Access denied")
+    )
+
+    try:
+        before_key = decode_cursor(before) if before is not None else None
+        after_key = decode_cursor(after) if after is not None else None
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if cursor is not None and before_key is None and after_key is None:
+        anchor = await message_repo.get_by_id(db, cursor)
+        if anchor is None or anchor.conversationId != conversation_id:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        before_key = (anchor.createdAt, anchor.id)
 
     messages = await message_repo.get_by_conversation(
         db,
         conversation_id=conversation_id,
         limit=limit,
-        cursor=cursor,
+        before=before_key,
+        after=after_key,
     )
 
+    if messages:
+        newest, oldest = messages[0], messages[-1]
+        # Older history exists unless a backwards page came back short
+        if after_key is not None or len(messages) == limit:
+            response.headers["X-Next-Cursor"] = encode_cursor(
+                oldest.createdAt, oldest.id
+            )
+        response.headers["X-Prev-Cursor"] = encode_cursor(newest.createdAt, newest.id)
+    elif after_key is not None:
+        # Nothing new yet: poll again from the same point
+        response.headers["X-Prev-Cursor"] = after
+
     return [MessageOut.from_orm(msg) for msg in messages]
 
 
@@ -173,26 +290,20 @@ async def send_message(
             detail="Message must contain text or image",
         )
 
-    conversation = await conversation_repo.get_by_id(db, payload.conversation_id)
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-
-    if not await can_user_access_conversation(
+    conversation = await get_accessible_conversation(
         user_id=current_user.id, conversation_id=payload.conversation_id
-    ):
-        raise HTTPException(status_code=403, detail="Access denied")
+    )
 
     result = await message_service.send_outbound_message(
         conversation_id=payload.conversation_id,
         text=payload.text,
         image_url=payload.image_url,
         agent_user_id=current_user.id,
+        conversation=conversation,
     )
 
-    message = await message_repo.get_by_id(db, result["message_id"])
-
     return SendMessageResponse(
-        message=MessageOut.from_orm(message),
+        message=MessageOut.from_orm(result["message"]),
         remoteMessageId=result.get("remote_message_id"),
     )
 
@@ -241,12 +352,9 @@ async def send_product_to_conversation(
     """
     Send a product card into a conversation.
     """
-    conversation = await conversation_repo.get_by_id(db, conversation_id)
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-
-    if not await can_user_access_conversation(current_user.id, conversation_id):
-        raise HTTPException(status_code=403, detail="Access denied")
+    conversation = await get_accessible_conversation(
+        user_id=current_user.id, conversation_id=conversation_id
+    )
 
     product = await product_repo.get_by_id(db, product_id)
     if not product:
@@ -284,7 +392,7 @@ async def send_product_to_conversation(
             detail="Failed to send product card",
         )
 
-    message = await message_repo.create(
+    message = await message_repo.create_outbound(
         db,
         conversation_id=conversation_id,
         platform=platform,
@@ -294,7 +402,16 @@ async def send_product_to_conversation(
         source=Source.AGENT,
     )
 
-    await conversation_repo.update_last_message_at(db, conversation_id)
+    # The new_message event was committed to the outbox; wake the relay
+    outbox_relay.notify()
+    conversation_updates.update(
+        conversation_id,
+        {
+            "last_message_id": message.id,
+            "last_message_at": message.createdAt.isoformat(),
+        },
+        seq=message.changeSeq,
+    )
 
     return {
         "message_id": message.id,
@@ -328,15 +445,9 @@ async def get_suggestions(
             detail="Only agents or admins can access suggestions",
         )
 
-    conversation = await conversation_repo.get_by_id(db, conversation_id)
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-
-    if not await can_user_access_conversation(
-        user_id=current_user.id,
-        conversation_id=conversation_id,
-    ):
-        raise HTTPException(status_code=403, detail="Access denied")
+    await get_accessible_conversation(
+        user_id=current_user.id, conversation_id=conversation_id
+    )
 
     return await suggestion_repo.list_by_conversation(
         db,
@@ -356,21 +467,14 @@ async def create_suggestions(
     if current_user.role not in {Role.ADMIN, Role.AGENT}:
         raise HTTPException(status_code=403, detail="Forbidden")
 
-    conversation = await conversation_repo.get_by_id(db, conversation_id)
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-
-    if not await can_user_access_conversation(
-        user_id=current_user.id,
-        conversation_id=conversation_id,
-    ):
-        raise HTTPException(status_code=403, detail="Access denied")
+    await get_accessible_conversation(
+        user_id=current_user.id, conversation_id=conversation_id
+    )
 
     messages = await message_repo.get_by_conversation(
         db,
         conversation_id=conversation_id,
         limit=30,
-        cursor=None,
     )
 
     # map to AI format
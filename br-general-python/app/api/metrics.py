@@ -0,0 +1,16 @@
+from datetime import datetime, timezone
+
+from fastapi import APIRouter
+
+from app.metrics import metrics
+
+router = APIRouter()
+
+
+@router.get("")
+async def get_metrics():
+    # In-process metrics of this worker
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "metrics": metrics.snapshot(),
+    }
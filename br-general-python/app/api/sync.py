@@ -0,0 +1,55 @@
+"""
+API endpoint for delta sync after a WebSocket reconnect.
+"""
+
+from fastapi import APIRouter, Depends, Query, Security
+
+from app.api.auth import oauth2_scheme
+from app.api.users import get_current_user
+from app.db import db
+from app.repositories.sync_repository import sync_repo
+from app.schemas.conversation import ConversationStatus, ConversationWithContact
+from app.schemas.sync import SyncResponse
+
+router = APIRouter(dependencies=[Security(oauth2_scheme)])
+
+
+@router.get("", response_model=SyncResponse)
+async def sync_changes(
+    since: int = Query(0, ge=0, description="Last `seq` the client has seen"),
+    limit: int = Query(200, ge=1, le=1000),
+    current_user=Depends(get_current_user),
+):
+    """
+    Conversations, messages, orders and suggestions of the current user that
+    changed after `since`. Every WS event carries the `seq` of its change.
+    """
+    batch = await sync_repo.changes_since(
+        db,
+        user_id=current_user.id,
+        since=since,
+        limit=limit,
+    )
+
+    return SyncResponse(
+        conversations=[
+            ConversationWithContact(
+                id=conv.id,
+                contactId=conv.contactId,
+                status=ConversationStatus(conv.status),
+                lastMessageAt=conv.lastMessageAt,
+                createdAt=conv.createdAt,
+                messageCount=conv.messageCount,
+                inboundCount=conv.inboundCount,
+                lastInboundAt=conv.lastInboundAt,
+                lastOutboundAt=conv.lastOutboundAt,
+                contact=conv.contact,
+            )
+            for conv in batch.conversations
+        ],
+        messages=batch.messages,
+        orders=batch.orders,
+        suggestions=batch.suggestions,
+        seq=batch.seq,
+        hasMore=batch.has_more,
+    )
@@ -27,16 +27,7 @@ async def get_current_user_profile(
     current_user=Depends(get_current_user),
 ) -> UserOut:
     """Get current user profile."""
-    user = await user_repo.get_by_id(db, current_user.id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    return UserOut(
-        id=user.id,
-        email=user.email,
-        name=user.name,
-        role=Role(user.role),
-    )
+    return current_user
 
 
 @router.patch("/me", response_model=UserOut)
@@ -45,10 +36,6 @@ async def update_current_user_profile(
     current_user=Depends(get_current_user),
 ) -> UserOut:
     """Update current user profile."""
-    user = await user_repo.get_by_id(db, current_user.id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
     update_data: dict = {}
 
     if payload.name is not None:
@@ -56,7 +43,7 @@ async def update_current_user_profile(
 
     if payload.email is not None:
         existing = await user_repo.get_by_email(db, payload.email)
-        if existing and existing.id != user.id:
+        if existing and existing.id != current_user.id:
             raise HTTPException(
                 status_code=400,
                 detail="Email already in use",
@@ -64,16 +51,11 @@ async def update_current_user_profile(
         update_data["email"] = payload.email
 
     if not update_data:
-        return UserOut(
-            id=user.id,
-            email=user.email,
-            name=user.name,
-            role=Role(user.role),
-        )
+        return current_user
 
     updated = await user_repo.update(
         db,
-        user_id=user.id,
+        user_id=current_user.id,
         data=update_data,
     )
 
@@ -12,11 +12,13 @@ from app.settings import settings
 from app.services.meta_service import meta_service
 from app.services.stripe_service import stripe_service
 from app.services.message_service import message_service
+from app.services.inbound_queue import inbound_queue
+from app.services.outbox_relay import outbox_relay
 from app.repositories.order_repository import order_repo
+from app.repositories.outbox_repository import outbox_repo
 from app.repositories.product_repository import product_repo
 from app.repositories.conversation_repository import conversation_repo
 from app.schemas.order import OrderStatus
-from app.ws.dispatcher import emit
 from app.ws.event_types import WSEventType
 
 router = APIRouter()
@@ -65,19 +67,29 @@ async def handle_meta_webhook(request: Request) -> dict:
         logger.error(f"Failed to parse Meta webhook payload: {e}")
         raise HTTPException(status_code=400, detail="Invalid JSON")
 
-    normalized = meta_service.normalize_webhook(payload)
+    if settings.meta_webhook_mode == "queued":
+        # Ack first: workers drain the durable queue (see inbound_queue)
+        await inbound_queue.enqueue(payload)
+        return {"status": "queued"}
 
-    if normalized is None:
+    messages = list(meta_service.normalize_webhook(payload))
+
+    if not messages:
         return {"status": "ignored"}
 
     try:
-        await message_service.handle_inbound(normalized)
-        logger.info(
-            "Inbound message '%s' from '%s' platform %s",
-            normalized.text,
-            normalized.from_number,
-            Platform(normalized.platform).name,
-        )
+        if len(messages) == 1:
+            await message_service.handle_inbound(messages[0])
+        else:
+            await message_service.handle_inbound_batch(messages)
+
+        for normalized in messages:
+            logger.info(
+                "Inbound message '%s' from '%s' platform %s",
+                normalized.text,
+                normalized.from_number,
+                Platform(normalized.platform).name,
+            )
     except Exception:
         logger.exception("Error processing inbound Meta message")
 
@@ -164,30 +176,35 @@ async def _handle_checkout_completed(session: dict) -> None:
         logger.info(f"Order for session {session_id} already exists")
         return
 
-    order = await order_repo.create(
-        db,
-        contact_id=contact_id,
-        product_id=product_id,
-        amount_cents=product.priceCents,
-        currency=product.currency,
-        stripe_session_id=session_id,
-        conversation_id=conversation_id,
-    )
+    # The order_created event commits (or rolls back) with the order
+    async with db.tx() as tx:
+        order = await order_repo.create(
+            tx,
+            contact_id=contact_id,
+            product_id=product_id,
+            amount_cents=product.priceCents,
+            currency=product.currency,
+            stripe_session_id=session_id,
+            conversation_id=conversation_id,
+        )
 
-    order = await order_repo.update_status(db, order.id, OrderStatus.PAID)
+        order = await order_repo.update_status(tx, order.id, OrderStatus.PAID)
+
+        await outbox_repo.append(
+            tx,
+            WSEventType.ORDER_CREATED.value,
+            {
+                "order_id": order.id,
+                "product_title": product.title,
+                "amount_cents": product.priceCents,
+                "currency": product.currency,
+            },
+            seq=order.changeSeq,
+        )
 
+    outbox_relay.notify()
     logger.info(f"Created order {order.id} for session {session_id}")
 
-    await emit(
-        WSEventType.ORDER_CREATED,
-        {
-            "order_id": order.id,
-            "product_title": product.title,
-            "amount_cents": product.priceCents,
-            "currency": product.currency,
-        },
-    )
-
     if conversation_id:
         amount_str = f"{product.priceCents / 100:.2f} {product.currency}"
         await message_service.send_order_confirmation(
@@ -1,29 +1,96 @@
-from datetime import timedelta, datetime, timezone
-from time import time
+from time import monotonic, time
+from typing import List, Optional, Set
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
-from app.api.access_control import can_user_access_conversation
+from app.api.access_control import (
+    can_user_access_conversation,
+    filter_accessible_conversations,
+)
 from app.api.auth import auth_service
-from app.ws.manager import ws_manager
+from app.ws.manager import WSConnection, ws_manager
 
 from app.ws.events import ws_event
+from app.ws.scopes import (
+    CONVERSATION,
+    ORDERS,
+    WILDCARD_SCOPES,
+    conversation_scope,
+    scope_key,
+    scope_ref,
+    user_conversations_scope,
+)
 
 from app.settings import settings
 
 router = APIRouter()
 
-IDLE_TIMEOUT = timedelta(seconds=settings.ws_idle_timeout_seconds)
+IDLE_TIMEOUT_SECONDS = settings.ws_idle_timeout_seconds
 
+# Most ids accepted in one subscribe_many / unsubscribe_many frame
+MAX_BATCH_IDS = 500
 
-def is_idle_expired(last_seen: datetime) -> bool:
-    return datetime.now(timezone.utc) - last_seen > IDLE_TIMEOUT
+
+def is_idle_expired(last_seen: float) -> bool:
+    """`last_seen` is a time.monotonic() reading."""
+    return monotonic() - last_seen > IDLE_TIMEOUT_SECONDS
 
 
 def is_token_expired(token_exp: int) -> bool:
     return token_exp <= int(time())
 
 
+def _batch_ids(payload: dict) -> Optional[List[str]]:
+    """Distinct ids of a *_many frame in order, or None if malformed."""
+    ids = payload.get("ids")
+    if not isinstance(ids, list) or not 0 < len(ids) <= MAX_BATCH_IDS:
+        return None
+    if not all(isinstance(i, str) and i for i in ids):
+        return None
+    return list(dict.fromkeys(ids))
+
+
+async def authorize_resumed_scopes(conn: WSConnection, scopes: Set[str]) -> Set[str]:
+    """
+    Scopes of a resumed session the user may still hold.
+
+    Checked like subscribe frames: access to a conversation or to orders
+    may have been revoked while the session was detached.
+    """
+    if conn.is_admin:
+        return scopes
+
+    allowed = set()
+    conversation_ids = {}
+    for scope in scopes:
+        ref = scope_ref(scope)
+        if ref["scope"] == CONVERSATION:
+            conversation_ids[ref["id"]] = scope
+        elif scope == user_conversations_scope(conn.user_id):
+            allowed.add(scope)
+
+    if conversation_ids:
+        accessible = await filter_accessible_conversations(
+            user_id=conn.user_id,
+            conversation_ids=list(conversation_ids),
+        )
+        allowed |= {conversation_ids[i] for i in accessible}
+    return allowed
+
+
+async def _close(connection_id: int, code: int, reason: str) -> None:
+    """
+    Send the error event and close through the connection's writer.
+
+    Once accepted, only the writer task touches the socket; this waits for
+    it to flush the close before the endpoint returns.
+    """
+    conn = ws_manager.connections.get(connection_id)
+    ws_manager.close(connection_id, code, reason)
+    if conn is not None:
+        await conn.send_queue.drain()
+
+
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     token = websocket.query_params.get("token")
@@ -47,6 +114,8 @@ async def websocket_endpoint(websocket: WebSocket):
         return
 
     role = payload.get("role")
+    # admin bypass (case-insensitive, tolerant of missing/None role)
+    is_admin = isinstance(role, str) and role.lower() == "admin"
 
     await websocket.accept()
 
@@ -54,21 +123,27 @@ async def websocket_endpoint(websocket: WebSocket):
         websocket=websocket,
         user_id=str(user_id),
         token_exp=token_exp,
+        is_admin=is_admin,
     )
 
+    # Resume: ?session=<session_id>&last_seq=<last stream_seq seen>
+    try:
+        last_stream_seq = int(websocket.query_params.get("last_seq") or 0)
+    except ValueError:
+        last_stream_seq = 0
     try:
+        await ws_manager.start_session(
+            connection_id,
+            authorize=authorize_resumed_scopes,
+            resume_session_id=websocket.query_params.get("session"),
+            last_stream_seq=last_stream_seq,
+        )
+
         while True:
             try:
                 data = await websocket.receive_json()
             except ValueError:
-                await websocket.send_json(
-                    ws_event(
-                        "error",
-                        {"code": "invalid_json"},
-                    )
-                )
-                await websocket.close(code=1003)  # unsupported data
-                ws_manager.disconnect(connection_id)
+                await _close(connection_id, 1003, "invalid_json")
                 break
 
             conn = ws_manager.connections.get(connection_id)
@@ -77,26 +152,12 @@ async def websocket_endpoint(websocket: WebSocket):
 
             # 0. JWT expiration check
             if is_token_expired(conn.token_exp):
-                await websocket.send_json(
-                    ws_event(
-                        "error",
-                        {"code": "token_expired"},
-                    )
-                )
-                await websocket.close(code=1008)
-                ws_manager.disconnect(connection_id)
+                await _close(connection_id, 1008, "token_expired")
                 break
 
             # 1. Idle timeout check
             if is_idle_expired(conn.last_seen):
-                await websocket.send_json(
-                    ws_event(
-                        "error",
-                        {"code": "idle_timeout"},
-                    )
-                )
-                await websocket.close(code=1001)
-                ws_manager.disconnect(connection_id)
+                await _close(connection_id, 1001, "idle_timeout")
                 break
 
             msg_type = data.get("type")
@@ -106,62 +167,142 @@ async def websocket_endpoint(websocket: WebSocket):
                 continue
 
             # 3. Real activity updates last_seen
-            conn.last_seen = datetime.now(timezone.utc)
+            conn.last_seen = monotonic()
 
             # 4. Handle subscribe
             if msg_type == "subscribe":
-                scope = data["data"]["scope"]
-                scope_id = data["data"]["id"]
-
-                if scope != "conversation" or not scope_id:
-                    await websocket.send_json(
+                payload = data.get("data") or {}
+                scope = payload.get("scope")
+                scope_id = payload.get("id")
+
+                if scope in WILDCARD_SCOPES:
+                    allowed = scope != ORDERS or conn.is_admin
+                elif scope != CONVERSATION or not scope_id:
+                    ws_manager.send(
+                        connection_id,
                         ws_event(
                             "error",
                             {"code": "invalid_subscribe"},
-                        )
+                        ),
                     )
                     continue
-
-                # Per-connection ACL cache to avoid repeated DB lookups
-                acl_cache = getattr(conn, "acl_cache", None)
-                if acl_cache is None:
-                    acl_cache = {}
-                    setattr(conn, "acl_cache", acl_cache)
-                cache_key = scope_id
-
-                # admin bypass (case-insensitive, tolerant of missing/None role)
-                if isinstance(role, str) and role.lower() == "admin":
+                elif conn.is_admin:
                     allowed = True
-                    acl_cache[cache_key] = True
                 else:
-                    if cache_key in acl_cache:
-                        allowed = acl_cache[cache_key]
-                    else:
-                        allowed = await can_user_access_conversation(
-                            user_id=str(user_id),
-                            conversation_id=scope_id,
-                        )
-                        acl_cache[cache_key] = allowed
+                    # Backed by the process-wide ACL cache shared with REST
+                    allowed = await can_user_access_conversation(
+                        user_id=str(user_id),
+                        conversation_id=scope_id,
+                    )
 
                 if not allowed:
-                    await websocket.send_json(
+                    await _close(connection_id, 1008, "forbidden")
+                    break
+
+                full_scope = scope_key(scope, scope_id, conn.user_id)
+                ws_manager.subscribe(connection_id, full_scope)
+
+                ws_manager.send(
+                    connection_id,
+                    ws_event(
+                        "subscribed",
+                        scope_ref(full_scope),
+                    ),
+                )
+
+            # 5. Batch subscribe: one ACL query and one ack for all ids
+            elif msg_type == "subscribe_many":
+                payload = data.get("data") or {}
+                scope_ids = _batch_ids(payload)
+
+                if payload.get("scope") != CONVERSATION or scope_ids is None:
+                    ws_manager.send(
+                        connection_id,
                         ws_event(
                             "error",
-                            {"code": "forbidden"},
+                            {"code": "invalid_subscribe"},
+                        ),
+                    )
+                    continue
+
+                if conn.is_admin:
+                    allowed_ids = set(scope_ids)
+                else:
+                    allowed_ids = await filter_accessible_conversations(
+                        user_id=str(user_id),
+                        conversation_ids=scope_ids,
+                    )
+
+                for scope_id in scope_ids:
+                    if scope_id in allowed_ids:
+                        ws_manager.subscribe(
+                            connection_id, conversation_scope(scope_id)
                         )
+
+                ws_manager.send(
+                    connection_id,
+                    ws_event(
+                        "subscribed_many",
+                        {
+                            "scope": CONVERSATION,
+                            "ids": [i for i in scope_ids if i in allowed_ids],
+                            "denied": [i for i in scope_ids if i not in allowed_ids],
+                        },
+                    ),
+                )
+
+            # 6. Handle unsubscribe
+            elif msg_type == "unsubscribe":
+                payload = data.get("data") or {}
+                scope = payload.get("scope")
+                scope_id = payload.get("id")
+
+                if scope not in WILDCARD_SCOPES and (
+                    scope != CONVERSATION or not scope_id
+                ):
+                    ws_manager.send(
+                        connection_id,
+                        ws_event(
+                            "error",
+                            {"code": "invalid_unsubscribe"},
+                        ),
                     )
-                    await websocket.close(code=1008)
-                    ws_manager.disconnect(connection_id)
-                    break
+                    continue
 
-                full_scope = f"ws:conversation:{scope_id}"
-                ws_manager.subscribe(connection_id, full_scope)
+                full_scope = scope_key(scope, scope_id, conn.user_id)
+                ws_manager.unsubscribe(connection_id, full_scope)
 
-                await websocket.send_json(
+                ws_manager.send(
+                    connection_id,
                     ws_event(
-                        "subscribed",
-                        {"scope": scope, "id": scope_id},
+                        "unsubscribed",
+                        scope_ref(full_scope),
+                    ),
+                )
+
+            elif msg_type == "unsubscribe_many":
+                payload = data.get("data") or {}
+                scope_ids = _batch_ids(payload)
+
+                if payload.get("scope") != CONVERSATION or scope_ids is None:
+                    ws_manager.send(
+                        connection_id,
+                        ws_event(
+                            "error",
+                            {"code": "invalid_unsubscribe"},
+                        ),
                     )
+                    continue
+
+                for scope_id in scope_ids:
+                    ws_manager.unsubscribe(connection_id, conversation_scope(scope_id))
+
+                ws_manager.send(
+                    connection_id,
+                    ws_event(
+                        "unsubscribed_many",
+                        {"scope": CONVERSATION, "ids": scope_ids},
+                    ),
                 )
 
     except WebSocketDisconnect:
@@ -0,0 +1,112 @@
+"""
+Process-wide TTL + LRU cache.
+
+Used for hot read paths (authenticated users, verified tokens, ACL checks)
+where every worker keeps its own copy and writes invalidate explicitly.
+Hit/miss counters are exported through the metrics registry.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Optional, Set, Tuple, TypeVar
+
+from app.metrics import metrics
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[K, V]):
+    """
+    `group_by` maps a key to a group (e.g. the conversation of a
+    (user, conversation) key) so `invalidate_group` drops a whole group
+    without scanning every entry.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        max_size: int,
+        ttl_seconds: float,
+        group_by: Optional[Callable[[K], Hashable]] = None,
+    ) -> None:
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self._group_by = group_by
+        self._groups: Dict[Hashable, Set[K]] = {}
+
+        self._hits = metrics.counter(
+            "cache_hits_total", "Cache lookups served from memory", {"cache": name}
+        )
+        self._misses = metrics.counter(
+            "cache_misses_total", "Cache lookups that fell through", {"cache": name}
+        )
+        self._evictions = metrics.counter(
+            "cache_evictions_total", "Entries dropped by size limit", {"cache": name}
+        )
+        metrics.gauge(
+            "cache_entries",
+            "Entries currently cached",
+            {"cache": name},
+            fn=lambda: len(self._entries),
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K, default=None):
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            self._misses.inc()
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._drop(key)
+            self._misses.inc()
+            return default
+
+        self._entries.move_to_end(key)
+        self._hits.inc()
+        return value
+
+    def set(self, key: K, value: V, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        if self._group_by is not None:
+            self._groups.setdefault(self._group_by(key), set()).add(key)
+
+        while len(self._entries) > self.max_size:
+            self._drop(next(iter(self._entries)))
+            self._evictions.inc()
+
+    def invalidate(self, key: K) -> None:
+        self._drop(key)
+
+    def invalidate_group(self, group: Hashable) -> None:
+        for key in self._groups.pop(group, ()):
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._groups.clear()
+
+    def _drop(self, key: K) -> None:
+        if self._entries.pop(key, _MISSING) is _MISSING or self._group_by is None:
+            return
+
+        group = self._group_by(key)
+        keys = self._groups.get(group)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._groups[group]
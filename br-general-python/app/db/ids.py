@@ -0,0 +1,39 @@
+"""
+Client-side id generation for rows inserted with raw SQL.
+
+Prisma fills `@default(cuid())` on the client, so statements that bypass the
+query builder must supply ids themselves. The format mirrors cuid v1:
+"c" + timestamp + counter + fingerprint + random, all base36.
+"""
+
+import itertools
+import os
+import secrets
+import socket
+import time
+
+BASE36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+_counter = itertools.count()
+
+
+def _base36(value: int, width: int) -> str:
+    digits = []
+    while value:
+        value, rem = divmod(value, 36)
+        digits.append(BASE36[rem])
+    return "".join(reversed(digits)).rjust(width, "0")[-width:]
+
+
+_FINGERPRINT = _base36(os.getpid() * 36**2 + sum(socket.gethostname().encode()), 4)
+
+
+def new_id() -> str:
+    """Return a 25-character cuid-like id."""
+    return (
+        "c"
+        + _base36(int(time.time() * 1000), 8)
+        + _base36(next(_counter) % 36**4, 4)
+        + _FINGERPRINT
+        + _base36(secrets.randbits(48), 8)
+    )
@@ -0,0 +1,56 @@
+"""
+SQL fragments shared by raw queries.
+
+The inbound webhook queue and the event outbox are both tables used as
+leased work queues: a worker claims rows by pushing their "locked_until"
+into the future. SKIP LOCKED gives concurrent workers disjoint batches and
+an expired lease makes a row claimable again if its worker dies.
+"""
+
+from typing import Optional
+
+# Columns are "timestamp without time zone" holding UTC, like every
+# Prisma-managed DateTime.
+NOW_UTC = "timezone('utc', now())"
+
+
+def lease_until(seconds_param: str) -> str:
+    """End of a lease of `seconds_param` (a "$n" placeholder) seconds."""
+    return f"{NOW_UTC} + make_interval(secs => {seconds_param})"
+
+
+def claim_sql(
+    table: str,
+    *,
+    order_by: str,
+    created_column: str,
+    returning: str,
+    pending: Optional[str] = None,
+) -> str:
+    """
+    UPDATE leasing the first `$1` claimable rows of `table` for `$2` seconds.
+
+    A row is claimable when its lease is unset or expired and, if given,
+    `pending` holds. Claiming bumps "attempts". Rows come back with
+    `returning` plus "age_seconds" since `created_column`, in no particular
+    order: UPDATE ... RETURNING does not keep the subquery order.
+    """
+    claimable = f'("locked_until" IS NULL OR "locked_until" < {NOW_UTC})'
+    if pending is not None:
+        claimable = f"{pending}\n  AND {claimable}"
+
+    return f"""
+    UPDATE "{table}"
+    SET "locked_until" = {lease_until("$2")},
+        "attempts" = "attempts" + 1
+    WHERE "id" IN (
+        SELECT "id" FROM "{table}"
+        WHERE {claimable}
+        ORDER BY {order_by}
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING {returning},
+              EXTRACT(EPOCH FROM ({NOW_UTC} - "{created_column}"))::float8
+                  AS "age_seconds"
+    """
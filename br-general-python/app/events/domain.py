@@ -1,38 +1,189 @@
-from typing import Any, Callable, List, Tuple
+"""
+In-process domain event bus.
+
+`publish_event` puts an event on a bounded queue and returns; a few consumer
+tasks hand each event to every subscriber. A failing subscriber is logged
+and counted without affecting the others. When the queue is full the
+publisher waits, which bounds memory under a burst.
+
+The bus is started and drained by the FastAPI lifespan. Without a running
+bus (scripts, unit tests) events are delivered inline. The outbox relay
+uses `deliver`, which always runs the subscribers before returning, so an
+outbox row is only deleted once its event was handed out.
+
+Recording published events is opt-in for tests: `start_recording()`,
+`get_published_events()`, `stop_recording()`.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
 from app.logging import logger
+from app.metrics import metrics
+from app.settings import settings
 
 # type: (event_type, payload)
 Event = Tuple[str, dict[str, Any]]
 
-# In-memory sink (used for tests)
-_event_sink: List[Event] = []
 
-# Optional subscribers (adapters attach here)
-_subscribers: List[Callable[[str, dict[str, Any]], None]] = []
+@dataclass(frozen=True, slots=True)
+class DomainEvent:
+    event_type: str
+    payload: dict[str, Any]
+    # time.monotonic() when published, for queue lag
+    published_at: float = field(default_factory=time.monotonic)
+    # Outbox id of a relayed event; a redelivery carries the same id
+    event_id: Optional[str] = None
+    # Change sequence of the row the event reports, if any
+    seq: Optional[int] = None
 
 
-def subscribe(handler: Callable[[str, dict[str, Any]], None]) -> None:
-    _subscribers.append(handler)
+Handler = Callable[[DomainEvent], Awaitable[None]]
 
 
-def clear_event_sink() -> None:
-    _event_sink.clear()
+class EventBus:
+    def __init__(self, max_size: int, workers: int) -> None:
+        self.max_size = max(max_size, 1)
+        self.workers = max(workers, 1)
+        self._subscribers: List[Handler] = []
+        self._queue: Optional[asyncio.Queue[DomainEvent]] = None
+        self._tasks: List[asyncio.Task] = []
+        self._recorded: Optional[List[Event]] = None
 
+        self._published = metrics.counter(
+            "domain_events_published_total", "Domain events published"
+        )
+        self._handled = metrics.counter(
+            "domain_events_handled_total", "Domain events passed to all subscribers"
+        )
+        self._lag = metrics.histogram(
+            "domain_event_lag_seconds", "Time an event waited in the bus queue"
+        )
+        metrics.gauge(
+            "domain_event_queue_depth",
+            "Domain events waiting for a consumer",
+            fn=lambda: self._queue.qsize() if self._queue is not None else 0,
+        )
 
-def get_published_events() -> List[Event]:
-    return list(_event_sink)
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def subscribe(self, handler: Handler) -> None:
+        if handler not in self._subscribers:
+            self._subscribers.append(handler)
+
+    async def publish(self, event: DomainEvent) -> None:
+        self._published.inc()
+        if self._recorded is not None:
+            self._recorded.append((event.event_type, event.payload))
+
+        if self._queue is None:
+            await self._dispatch(event)
+            return
+
+        await self._queue.put(event)
+
+    async def deliver(self, event: DomainEvent) -> None:
+        """Hand `event` to every subscriber now, bypassing the queue."""
+        self._published.inc()
+        if self._recorded is not None:
+            self._recorded.append((event.event_type, event.payload))
+        await self._dispatch(event)
+
+    def start(self) -> None:
+        if self.running:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [
+            asyncio.create_task(self._consume(self._queue)) for _ in range(self.workers)
+        ]
+        logger.info("Domain event bus started with %s workers", self.workers)
+
+    async def stop(self, timeout: float) -> None:
+        """Deliver what is queued (up to `timeout` seconds), then stop."""
+        if not self.running:
+            return
+
+        queue = self._queue
+        try:
+            await asyncio.wait_for(queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(
+                "Domain event bus stopped with %s undelivered events", queue.qsize()
+            )
+
+        # New events are delivered inline from here on
+        self._queue = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def start_recording(self) -> None:
+        self._recorded = []
+
+    def stop_recording(self) -> None:
+        self._recorded = None
+
+    def recorded(self) -> List[Event]:
+        return list(self._recorded or [])
+
+    async def _consume(self, queue: "asyncio.Queue[DomainEvent]") -> None:
+        while True:
+            event = await queue.get()
+            try:
+                self._lag.observe(time.monotonic() - event.published_at)
+                await self._dispatch(event)
+            finally:
+                queue.task_done()
+
+    async def _dispatch(self, event: DomainEvent) -> None:
+        for handler in list(self._subscribers):
+            try:
+                await handler(event)
+            except Exception:
+                metrics.counter(
+                    "domain_event_handler_errors_total",
+                    "Subscriber calls that raised",
+                    {"handler": getattr(handler, "__qualname__", repr(handler))},
+                ).inc()
+                logger.exception(
+                    "Domain event subscriber failed for %s", event.event_type
+                )
+        self._handled.inc()
+
+
+# singleton instance
+event_bus = EventBus(
+    max_size=settings.event_bus_max_size,
+    workers=settings.event_bus_workers,
+)
+
+
+def subscribe(handler: Handler) -> None:
+    event_bus.subscribe(handler)
 
 
 async def publish_event(event_type: str, payload: dict[str, Any]) -> None:
     """
     Pure domain event publisher.
-    No transport, no async side effects.
+    No transport; subscribers run on the bus consumers.
     """
     logger.info("Domain event published: %s", event_type)
+    await event_bus.publish(DomainEvent(event_type=event_type, payload=payload))
+
+
+def start_recording() -> None:
+    event_bus.start_recording()
 
-    # record fact (testable)
-    _event_sink.append((event_type, payload))
 
-    # notify subscribers (adapters)
-    for handler in _subscribers:
-        handler(event_type, payload)
+def stop_recording() -> None:
+    event_bus.stop_recording()
+
+
+def get_published_events() -> List[Event]:
+    return event_bus.recorded()
@@ -9,6 +9,16 @@ from fastapi import FastAPI
 
 from app.db import db
 from app.logging import logger
+from app.services.inbound_queue import inbound_queue
+from app.services.meta_graph_client import meta_graph_client
+from app.services.outbox_relay import outbox_relay
+from app.services.password_hasher import password_hasher
+from app.services.scheduler import scheduler
+from app.events.domain import event_bus
+from app.events import ws_publisher  # noqa: F401  (registers the WS subscriber)
+from app.ws.backplane import backplane
+from app.ws.dispatcher import conversation_updates, deliver_from_backplane
+from app.ws.manager import ws_manager
 
 from prisma.engine.errors import AlreadyConnectedError
 
@@ -28,9 +38,28 @@ async def lifespan(app: FastAPI):
             # This happens in tests when another TestClient/transport already started the app.
             logger.info("DB already connected, skipping connect()")
 
+        meta_graph_client.open()
+        await backplane.start(deliver_from_backplane)
+        ws_manager.start()
+        event_bus.start()
+        outbox_relay.start()
+
+        if settings.meta_webhook_mode == "queued":
+            inbound_queue.start()
+
         yield
 
     finally:
+        await inbound_queue.stop()
+        await scheduler.shutdown()
+        await outbox_relay.stop()
+        await event_bus.stop(timeout=settings.event_bus_drain_timeout_seconds)
+        await conversation_updates.flush_all()
+        await ws_manager.stop()
+        await backplane.stop()
+        await meta_graph_client.close()
+        password_hasher.shutdown()
+
         # Only disconnect if THIS lifespan instance did the connect.
         if connected_by_app:
             try:
@@ -67,6 +96,7 @@ app.add_middleware(
         "x-refresh-token",  # custom header now allowed
         "X-Requested-With",
     ],
+    expose_headers=["X-Next-Cursor", "X-Prev-Cursor"],
 )
 
 app.include_router(api_router)
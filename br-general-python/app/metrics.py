@@ -0,0 +1,192 @@
+"""
+In-process metrics registry.
+
+Counters, gauges and histograms live in memory per worker and are exposed
+as JSON by the `/metrics` endpoint. Gauges may be backed by a callback so
+they always report the current value of the structure they observe.
+"""
+
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Optional, Tuple
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels_key(labels: Optional[Dict[str, str]]) -> Labels:
+    return tuple(sorted((labels or {}).items()))
+
+
+class Counter:
+    """Monotonically increasing counter."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Labels) -> None:
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def sample(self) -> Dict[str, Any]:
+        return {"value": self.value}
+
+
+class Gauge:
+    """Point-in-time value, either set explicitly or read from a callback."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Labels,
+        fn: Optional[Callable[[], float]] = None,
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._fn = fn
+        self._value = 0.0
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._value -= amount
+
+    @property
+    def value(self) -> float:
+        if self._fn is not None:
+            return float(self._fn())
+        return self._value
+
+    def sample(self) -> Dict[str, Any]:
+        return {"value": self.value}
+
+
+class Histogram:
+    """Cumulative bucketed histogram of observed values."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Labels,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def sample(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets: Dict[str, int] = {}
+        for bound, bucket_count in zip(self.buckets, self._counts):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+
+        return {"count": self.count, "sum": self.sum, "buckets": buckets}
+
+
+class MetricsRegistry:
+    """Get-or-create registry keyed by metric name and labels."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[Tuple[str, Labels], Any] = {}
+
+    def counter(
+        self,
+        name: str,
+        description: str = "",
+        labels: Optional[Dict[str, str]] = None,
+    ) -> Counter:
+        key = (name, _labels_key(labels))
+        if key not in self._metrics:
+            self._metrics[key] = Counter(name, description, key[1])
+        return self._metrics[key]
+
+    def gauge(
+        self,
+        name: str,
+        description: str = "",
+        labels: Optional[Dict[str, str]] = None,
+        fn: Optional[Callable[[], float]] = None,
+    ) -> Gauge:
+        key = (name, _labels_key(labels))
+        if key not in self._metrics:
+            self._metrics[key] = Gauge(name, description, key[1], fn=fn)
+        elif fn is not None:
+            self._metrics[key]._fn = fn
+        return self._metrics[key]
+
+    def histogram(
+        self,
+        name: str,
+        description: str = "",
+        labels: Optional[Dict[str, str]] = None,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        key = (name, _labels_key(labels))
+        if key not in self._metrics:
+            self._metrics[key] = Histogram(name, description, key[1], buckets)
+        return self._metrics[key]
+
+    def remove(self, name: str, labels: Optional[Dict[str, str]] = None) -> None:
+        """Drop one series, e.g. a per-connection gauge once it is gone."""
+        self._metrics.pop((name, _labels_key(labels)), None)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return every metric grouped by name."""
+        result: Dict[str, Dict[str, Any]] = {}
+
+        for (name, labels), metric in sorted(
+            self._metrics.items(), key=lambda item: item[0]
+        ):
+            entry = result.setdefault(
+                name,
+                {
+                    "type": metric.kind,
+                    "description": metric.description,
+                    "samples": [],
+                },
+            )
+            entry["samples"].append({"labels": dict(labels), **metric.sample()})
+
+        return result
+
+
+# singleton instance
+metrics = MetricsRegistry()
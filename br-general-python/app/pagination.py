@@ -0,0 +1,38 @@
+"""
+Opaque keyset cursors.
+
+A cursor carries the sort key of the last row of a page, (timestamp, id),
+encoded as URL-safe base64 so clients treat it as an opaque token.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime, timezone
+from typing import Tuple
+
+
+class InvalidCursorError(ValueError):
+    """Cursor was not produced by `encode_cursor`."""
+
+
+def db_timestamp(at: datetime) -> str:
+    """Format a sort key for a `$n::timestamp(3)` query parameter (UTC)."""
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    return at.isoformat(timespec="milliseconds")
+
+
+def encode_cursor(at: datetime, row_id: str) -> str:
+    raw = json.dumps([db_timestamp(at), row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Return the (naive UTC timestamp, id) sort key of a cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(at), str(row_id)
+    except (binascii.Error, ValueError, TypeError) as exc:
+        raise InvalidCursorError("Invalid cursor") from exc
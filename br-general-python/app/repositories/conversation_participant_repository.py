@@ -1,4 +1,74 @@
+"""
+Conversation participants, and the caches of who may see a conversation.
+
+The caches are per worker. A participant write drops the affected entries
+here at once and on the other workers through the WS backplane (see
+`ACL_INVALIDATION_CHANNEL`). An invalidation lost with a backplane
+connection is only covered by the cache TTL (ACL_CACHE_TTL_SECONDS).
+"""
+
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Set, Tuple
+
+from app.cache import TTLCache
 from app.db import db
+from app.logging import logger
+from app.settings import settings
+from app.ws.backplane import ACL_INVALIDATION_CHANNEL, backplane
+
+# Conversation access by (user id, conversation id), shared by REST and WS.
+# Denials are cached too, for a shorter time. Every participant write below
+# drops the affected entries.
+conversation_acl_cache: TTLCache[Tuple[str, str], bool] = TTLCache(
+    "conversation_acl",
+    max_size=settings.acl_cache_max_size,
+    ttl_seconds=settings.acl_cache_ttl_seconds,
+    group_by=lambda key: key[1],
+)
+
+
+# Participant user ids by conversation id, for routing WS events to the
+# participants' my_conversations scopes
+conversation_participants_cache: TTLCache[str, List[str]] = TTLCache(
+    "conversation_participants",
+    max_size=settings.acl_cache_max_size,
+    ttl_seconds=settings.acl_cache_ttl_seconds,
+)
+
+
+def drop_cached_acl(
+    conversation_id: str,
+    user_ids: Optional[Iterable[str]] = None,
+) -> None:
+    """Drop this worker's cached access for some or all users of a conversation."""
+    conversation_participants_cache.invalidate(conversation_id)
+    if user_ids is None:
+        conversation_acl_cache.invalidate_group(conversation_id)
+        return
+
+    for user_id in user_ids:
+        conversation_acl_cache.invalidate((user_id, conversation_id))
+
+
+async def invalidate_conversation_acl(
+    conversation_id: str,
+    user_ids: Optional[Iterable[str]] = None,
+) -> None:
+    """Drop cached access on this worker and on the others."""
+    user_ids = None if user_ids is None else list(user_ids)
+    drop_cached_acl(conversation_id, user_ids)
+
+    # The write is done; a backplane outage leaves the others to the TTL
+    try:
+        await backplane.publish(
+            [ACL_INVALIDATION_CHANNEL],
+            {
+                "type": "acl_invalidated",
+                "data": {"conversation_id": conversation_id, "user_ids": user_ids},
+            },
+        )
+    except Exception:
+        logger.exception("[ACL] failed to publish invalidation of %s", conversation_id)
 
 
 class ConversationParticipantRepository:
@@ -16,6 +86,35 @@ class ConversationParticipantRepository:
         )
         return count > 0
 
+    async def accessible_conversation_ids(
+        self,
+        *,
+        user_id: str,
+        conversation_ids: Iterable[str],
+    ) -> Set[str]:
+        """The subset of `conversation_ids` the user participates in."""
+        ids = list(set(conversation_ids))
+        if not ids:
+            return set()
+
+        rows = await db.conversationparticipant.find_many(
+            where={"userId": user_id, "conversationId": {"in": ids}},
+        )
+        return {row.conversationId for row in rows}
+
+    async def user_ids_for_conversation(self, conversation_id: str) -> List[str]:
+        """Participant user ids, cached until the next participant write."""
+        user_ids = conversation_participants_cache.get(conversation_id)
+        if user_ids is not None:
+            return user_ids
+
+        rows = await db.conversationparticipant.find_many(
+            where={"conversationId": conversation_id},
+        )
+        user_ids = [row.userId for row in rows]
+        conversation_participants_cache.set(conversation_id, user_ids)
+        return user_ids
+
     async def add(
         self,
         *,
@@ -28,6 +127,7 @@ class ConversationParticipantRepository:
                 "userId": user_id,
             }
         )
+        await invalidate_conversation_acl(conversation_id, [user_id])
 
     async def replace_assignee(
         self,
@@ -51,6 +151,22 @@ class ConversationParticipantRepository:
                 "userId": new_user_id,
             }
         )
+        await invalidate_conversation_acl(conversation_id)
+
+    async def mark_read(
+        self,
+        *,
+        conversation_id: str,
+        user_id: str,
+    ) -> None:
+        """Move the user's read marker of a conversation to now."""
+        await db.conversationparticipant.update_many(
+            where={
+                "conversationId": conversation_id,
+                "userId": user_id,
+            },
+            data={"lastReadAt": datetime.now(timezone.utc)},
+        )
 
     async def count_conversations_for_user(
         self,
@@ -85,6 +201,7 @@ class ConversationParticipantRepository:
             ],
             skip_duplicates=True,
         )
+        await invalidate_conversation_acl(conversation_id, user_ids)
 
 
 conversation_participant_repository = ConversationParticipantRepository()
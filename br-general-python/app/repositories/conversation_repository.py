@@ -2,16 +2,68 @@
 Repository for Conversation database operations.
 """
 
+import json
 from datetime import datetime, timezone
-from typing import Optional, Tuple, List
+from typing import Dict, Optional, Tuple, List
 
 from prisma import Prisma
 from prisma.models import Conversation
 
-from app.schemas.conversation import ConversationStatus
+from app.pagination import db_timestamp
+from app.schemas.contact import ContactOut
+from app.schemas.conversation import (
+    ConversationStatus,
+    ConversationWithContact,
+    InboxItem,
+    LastMessagePreview,
+)
 from app.schemas.source import Source
 
 
+# Columns of `ConversationWithContact` for raw inbox queries over
+# "conversations" c JOIN "contacts" ct
+INBOX_COLUMNS = """
+    c."id", c."contact_id", c."status"::text AS "status",
+    c."last_message_at", c."created_at", c."message_count",
+    c."inbound_count", c."last_inbound_at", c."last_outbound_at",
+    ct."platform"::text AS "contact_platform",
+    ct."platform_user_id" AS "contact_platform_user_id",
+    ct."phone" AS "contact_phone",
+    ct."name" AS "contact_name",
+    ct."opt_out" AS "contact_opt_out",
+    ct."created_at" AS "contact_created_at",
+    ct."updated_at" AS "contact_updated_at"
+"""
+
+# Length of the last-message preview in the inbox summary
+INBOX_SNIPPET_LENGTH = 140
+
+
+def _inbox_fields(row: dict) -> dict:
+    """Keyword arguments of `ConversationWithContact` for an INBOX_COLUMNS row."""
+    return {
+        "id": row["id"],
+        "contactId": row["contact_id"],
+        "status": ConversationStatus(row["status"]),
+        "lastMessageAt": row["last_message_at"],
+        "createdAt": row["created_at"],
+        "messageCount": row["message_count"],
+        "inboundCount": row["inbound_count"],
+        "lastInboundAt": row["last_inbound_at"],
+        "lastOutboundAt": row["last_outbound_at"],
+        "contact": ContactOut(
+            id=row["contact_id"],
+            platform=row["contact_platform"],
+            platformUserId=row["contact_platform_user_id"],
+            phone=row["contact_phone"],
+            name=row["contact_name"],
+            optOut=row["contact_opt_out"],
+            createdAt=row["contact_created_at"],
+            updatedAt=row["contact_updated_at"],
+        ),
+    }
+
+
 class ConversationRepository:
     """Repository for Conversation CRUD operations."""
 
@@ -26,6 +78,32 @@ class ConversationRepository:
             include={"contact": True},
         )
 
+    async def get_for_participant(
+        self,
+        db: Prisma,
+        conversation_id: str,
+        *,
+        user_id: str,
+    ) -> Tuple[Optional[Conversation], bool]:
+        """
+        Get conversation by ID with contact and whether `user_id` is one of
+        its participants, in one query.
+        """
+        conversation = await db.conversation.find_unique(
+            where={"id": conversation_id},
+            include={
+                "contact": True,
+                "conversationParticipants": {
+                    "where": {"userId": user_id},
+                    "take": 1,
+                },
+            },
+        )
+        if conversation is None:
+            return None, False
+
+        return conversation, bool(conversation.conversationParticipants)
+
     async def get_by_contact(
         self,
         db: Prisma,
@@ -44,30 +122,196 @@ class ConversationRepository:
         user_id: Optional[str] = None,
         status: Optional[ConversationStatus] = None,
         limit: int = 50,
+        after: Optional[Tuple[datetime, str]] = None,
         offset: int = 0,
-    ) -> Tuple[List[Conversation], int]:
-        where: dict = {}
+    ) -> List[ConversationWithContact]:
+        """
+        Inbox page ordered by (lastMessageAt, id) descending.
+
+        `after` is the sort key of the last row of the previous page and
+        seeks straight to the next one through the
+        (last_message_at DESC, id DESC) index; `offset` is kept for older
+        clients. Only the columns of `ConversationWithContact` are read.
+        """
+        where, params = self._inbox_filter(user_id=user_id, status=status)
+        self._seek_after(where, params, after)
+
+        n = len(params)
+        params.extend([limit, offset])
+
+        rows = await db.query_raw(
+            f"""
+            SELECT {INBOX_COLUMNS}
+            FROM "conversations" c
+            JOIN "contacts" ct ON ct."id" = c."contact_id"
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY c."last_message_at" DESC, c."id" DESC
+            LIMIT ${n + 1} OFFSET ${n + 2}
+            """,
+            *params,
+        )
+
+        return [ConversationWithContact(**_inbox_fields(row)) for row in rows]
+
+    async def list_inbox(
+        self,
+        db: Prisma,
+        *,
+        user_id: str,
+        status: Optional[ConversationStatus] = None,
+        limit: int = 50,
+        after: Optional[Tuple[datetime, str]] = None,
+    ) -> List[InboxItem]:
+        """
+        Inbox page of a participant in one query.
+
+        Each row carries the contact, a preview of the latest message, the
+        customer messages newer than the user's lastReadAt and the
+        assignees. Lateral subqueries run once per returned row, using the
+        (conversation_id, created_at) message index.
+        """
+        params: list = [user_id, INBOX_SNIPPET_LENGTH]
+        where: List[str] = []
 
         if status is not None:
-            where["status"] = status.value
+            params.append(status.value)
+            where.append(f'c."status" = ${len(params)}::"ConversationStatus"')
 
-        if user_id is not None:
-            where["conversationParticipants"] = {
-                "some": {
-                    "userId": user_id,
-                }
-            }
+        self._seek_after(where, params, after)
 
-        conversations = await db.conversation.find_many(
-            where=where if where else None,
-            include={"contact": True},
-            order={"lastMessageAt": "desc"},
-            take=limit,
-            skip=offset,
+        params.append(limit)
+
+        rows = await db.query_raw(
+            f"""
+            SELECT {INBOX_COLUMNS},
+                   lm."id" AS "last_message_id",
+                   lm."source"::text AS "last_message_source",
+                   left(lm."text", $2) AS "last_message_text",
+                   lm."media_url" IS NOT NULL AS "last_message_has_media",
+                   lm."created_at" AS "last_message_created_at",
+                   CASE
+                       WHEN p."lastReadAt" IS NULL THEN c."inbound_count"
+                       ELSE unread."count"
+                   END AS "unread_count",
+                   assignees."list" AS "assignees"
+            FROM "conversation_participants" p
+            JOIN "conversations" c ON c."id" = p."conversationId"
+            JOIN "contacts" ct ON ct."id" = c."contact_id"
+            LEFT JOIN LATERAL (
+                SELECT m."id", m."source", m."text", m."media_url", m."created_at"
+                FROM "messages" m
+                WHERE m."conversation_id" = c."id"
+                ORDER BY m."created_at" DESC, m."id" DESC
+                LIMIT 1
+            ) lm ON TRUE
+            LEFT JOIN LATERAL (
+                SELECT COUNT(*)::int AS "count"
+                FROM "messages" m
+                WHERE m."conversation_id" = c."id"
+                  AND m."created_at" > p."lastReadAt"
+                  AND m."source" = 'CUSTOMER'
+            ) unread ON p."lastReadAt" IS NOT NULL
+            CROSS JOIN LATERAL (
+                SELECT COALESCE(
+                    json_agg(json_build_object('id', u."id", 'name', u."name")
+                             ORDER BY u."name"),
+                    '[]'::json
+                ) AS "list"
+                FROM "conversation_participants" a
+                JOIN "users" u ON u."id" = a."userId"
+                WHERE a."conversationId" = c."id"
+            ) assignees
+            WHERE p."userId" = $1
+            {"AND " + " AND ".join(where) if where else ""}
+            ORDER BY c."last_message_at" DESC, c."id" DESC
+            LIMIT ${len(params)}
+            """,
+            *params,
+        )
+
+        items = []
+        for row in rows:
+            assignees = row["assignees"]
+            if isinstance(assignees, str):
+                assignees = json.loads(assignees)
+
+            last_message = None
+            if row["last_message_id"] is not None:
+                last_message = LastMessagePreview(
+                    id=row["last_message_id"],
+                    source=row["last_message_source"],
+                    text=row["last_message_text"],
+                    hasMedia=row["last_message_has_media"],
+                    createdAt=row["last_message_created_at"],
+                )
+
+            items.append(
+                InboxItem(
+                    **_inbox_fields(row),
+                    lastMessage=last_message,
+                    unreadCount=row["unread_count"] or 0,
+                    assignees=assignees,
+                )
+            )
+        return items
+
+    async def count_conversations(
+        self,
+        db: Prisma,
+        *,
+        user_id: Optional[str] = None,
+        status: Optional[ConversationStatus] = None,
+    ) -> int:
+        where, params = self._inbox_filter(user_id=user_id, status=status)
+        row = await db.query_first(
+            f"""
+            SELECT COUNT(*)::int AS "total"
+            FROM "conversations" c
+            {"WHERE " + " AND ".join(where) if where else ""}
+            """,
+            *params,
         )
+        return row["total"]
 
-        total = await db.conversation.count(where=where if where else None)
-        return conversations, total
+    @staticmethod
+    def _seek_after(
+        where: List[str],
+        params: list,
+        after: Optional[Tuple[datetime, str]],
+    ) -> None:
+        """Keyset condition for rows after `after` in descending order."""
+        if after is None:
+            return
+
+        n = len(params)
+        where.append(
+            f'(c."last_message_at", c."id") < (${n + 1}::timestamp(3), ${n + 2})'
+        )
+        params.extend([db_timestamp(after[0]), after[1]])
+
+    @staticmethod
+    def _inbox_filter(
+        *,
+        user_id: Optional[str],
+        status: Optional[ConversationStatus],
+    ) -> Tuple[List[str], list]:
+        where: List[str] = []
+        params: list = []
+
+        if user_id is not None:
+            params.append(user_id)
+            where.append(
+                f"""EXISTS (
+                SELECT 1 FROM "conversation_participants" p
+                WHERE p."conversationId" = c."id" AND p."userId" = ${len(params)}
+            )"""
+            )
+
+        if status is not None:
+            params.append(status.value)
+            where.append(f'c."status" = ${len(params)}::"ConversationStatus"')
+
+        return where, params
 
     async def create(
         self,
@@ -115,6 +359,43 @@ class ConversationRepository:
             data={"lastMessageAt": datetime.now(timezone.utc)},
         )
 
+    async def record_inbound_many(
+        self,
+        db: Prisma,
+        inbound_counts: Dict[str, int],
+    ) -> Dict[str, int]:
+        """
+        Bump lastMessageAt and counters for newly stored customer messages.
+
+        `inbound_counts` maps conversation id to the number of inserted
+        messages. Returns the new messageCount of each conversation.
+        """
+        if not inbound_counts:
+            return {}
+
+        values = []
+        params: list = []
+        for conversation_id, count in inbound_counts.items():
+            n = len(params)
+            values.append(f"(${n + 1}, ${n + 2}::int)")
+            params.extend([conversation_id, count])
+
+        rows = await db.query_raw(
+            f"""
+            UPDATE "conversations" c
+            SET "last_message_at" = timezone('utc', now()),
+                "last_inbound_at" = timezone('utc', now()),
+                "message_count" = c."message_count" + v."count",
+                "inbound_count" = c."inbound_count" + v."count",
+                "updated_at" = timezone('utc', now())
+            FROM (VALUES {", ".join(values)}) AS v("id", "count")
+            WHERE c."id" = v."id"
+            RETURNING c."id", c."message_count"
+            """,
+            *params,
+        )
+        return {row["id"]: row["message_count"] for row in rows}
+
     async def close(
         self,
         db: Prisma,
@@ -0,0 +1,155 @@
+"""
+Repository for the durable inbound webhook queue.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from prisma import Json, Prisma
+
+from app.db.sql import NOW_UTC, claim_sql, lease_until
+
+CLAIM_SQL = claim_sql(
+    "inbound_events",
+    pending='"processed_at" IS NULL',
+    order_by='"received_at"',
+    created_column="received_at",
+    returning='"id", "payload"::text AS "payload", "attempts"',
+)
+
+
+@dataclass
+class ClaimedInboundEvent:
+    id: str
+    payload: dict[str, Any]
+    attempts: int
+    age_seconds: float
+
+
+@dataclass
+class InboundQueueStats:
+    depth: int
+    oldest_age_seconds: float
+
+
+class InboundEventRepository:
+    """Repository for InboundEvent queue operations."""
+
+    async def enqueue(self, db: Prisma, payload: dict[str, Any]) -> str:
+        """Append a raw webhook payload to the queue."""
+        event = await db.inboundevent.create(data={"payload": Json(payload)})
+        return event.id
+
+    async def claim_batch(
+        self,
+        db: Prisma,
+        *,
+        limit: int,
+        lease_seconds: int,
+    ) -> List[ClaimedInboundEvent]:
+        """Lease the oldest unprocessed events."""
+        rows = await db.query_raw(CLAIM_SQL, limit, lease_seconds)
+
+        events = [
+            ClaimedInboundEvent(
+                id=row["id"],
+                payload=json.loads(row["payload"]),
+                attempts=row["attempts"],
+                age_seconds=row["age_seconds"],
+            )
+            for row in rows
+        ]
+        events.sort(key=lambda event: event.age_seconds, reverse=True)
+        return events
+
+    async def mark_processed(
+        self,
+        db: Prisma,
+        event_id: str,
+        error: Optional[str] = None,
+    ) -> None:
+        """
+        Settle an event.
+
+        Processed events are deleted so the table only holds the backlog;
+        an event given up on (`error`) is kept for inspection.
+        """
+        if error is None:
+            await db.execute_raw(
+                'DELETE FROM "inbound_events" WHERE "id" = $1',
+                event_id,
+            )
+            return
+
+        await db.execute_raw(
+            f"""
+            UPDATE "inbound_events"
+            SET "processed_at" = {NOW_UTC}, "locked_until" = NULL, "last_error" = $2
+            WHERE "id" = $1
+            """,
+            event_id,
+            error,
+        )
+
+    async def renew(
+        self,
+        db: Prisma,
+        event_ids: List[str],
+        *,
+        lease_seconds: int,
+    ) -> None:
+        """Extend the lease of events that are still being processed."""
+        if not event_ids:
+            return
+
+        placeholders = ", ".join(f"${i + 2}" for i in range(len(event_ids)))
+        await db.execute_raw(
+            f"""
+            UPDATE "inbound_events"
+            SET "locked_until" = {lease_until("$1")}
+            WHERE "id" IN ({placeholders}) AND "processed_at" IS NULL
+            """,
+            lease_seconds,
+            *event_ids,
+        )
+
+    async def release(
+        self,
+        db: Prisma,
+        event_id: str,
+        *,
+        error: str,
+        retry_in_seconds: int,
+    ) -> None:
+        """Record a failure and make the event claimable again later."""
+        await db.execute_raw(
+            f"""
+            UPDATE "inbound_events"
+            SET "locked_until" = {lease_until("$3")},
+                "last_error" = $2
+            WHERE "id" = $1
+            """,
+            event_id,
+            error,
+            retry_in_seconds,
+        )
+
+    async def stats(self, db: Prisma) -> InboundQueueStats:
+        row = await db.query_first(
+            f"""
+            SELECT COUNT(*)::int AS "depth",
+                   COALESCE(
+                       EXTRACT(EPOCH FROM ({NOW_UTC} - MIN("received_at"))), 0
+                   )::float8 AS "oldest_age_seconds"
+            FROM "inbound_events"
+            WHERE "processed_at" IS NULL
+            """
+        )
+        return InboundQueueStats(
+            depth=row["depth"] if row else 0,
+            oldest_age_seconds=row["oldest_age_seconds"] if row else 0.0,
+        )
+
+
+inbound_event_repo = InboundEventRepository()
@@ -0,0 +1,338 @@
+"""
+Repository for the single-statement inbound message pipeline.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from prisma import Prisma
+
+from app.db.ids import new_id
+from app.repositories.outbox_repository import new_message_outbox_sql
+from app.schemas.platform import Platform
+
+# One statement = one round-trip and one implicit transaction. Data-modifying
+# CTEs all see the snapshot taken before the statement: "touched" cannot see
+# a conversation created by "new_conversation", so a new conversation gets
+# its counters on insert and an existing one through the UPDATE. The
+# new_message event goes to the outbox in the same statement.
+INGEST_INBOUND_SQL = f"""
+WITH contact AS (
+    INSERT INTO "contacts"
+        ("id", "platform", "platform_user_id", "phone", "name", "opt_out",
+         "updated_at")
+    VALUES ($1, $2::"Platform", $3, $4, $5, $6, timezone('utc', now()))
+    ON CONFLICT ("platform", "platform_user_id") DO UPDATE
+    SET "phone" = COALESCE(EXCLUDED."phone", "contacts"."phone"),
+        "name" = COALESCE(EXCLUDED."name", "contacts"."name"),
+        "opt_out" = "contacts"."opt_out" OR EXCLUDED."opt_out",
+        "updated_at" = EXCLUDED."updated_at"
+    RETURNING "id", "opt_out"
+),
+open_conversation AS (
+    SELECT c."id"
+    FROM "conversations" c
+    JOIN contact ON c."contact_id" = contact."id"
+    WHERE c."status" = 'OPEN'
+    ORDER BY c."last_message_at" DESC
+    LIMIT 1
+),
+duplicate AS (
+    SELECT 1 FROM "messages"
+    WHERE "platform" = $2::"Platform" AND "remote_message_id" = $10
+),
+new_conversation AS (
+    INSERT INTO "conversations"
+        ("id", "contact_id", "status", "last_message_at", "updated_at", "source",
+         "message_count", "inbound_count", "last_inbound_at")
+    SELECT $7, contact."id", 'OPEN'::"ConversationStatus",
+           timezone('utc', now()), timezone('utc', now()), 'CUSTOMER'::"Source",
+           d."count", d."count",
+           CASE WHEN d."count" = 1 THEN timezone('utc', now()) END
+    FROM contact
+    CROSS JOIN (
+        SELECT CASE WHEN EXISTS (SELECT 1 FROM duplicate) THEN 0 ELSE 1 END
+            AS "count"
+    ) d
+    WHERE NOT EXISTS (SELECT 1 FROM open_conversation)
+    RETURNING "id"
+),
+conversation AS (
+    SELECT "id", FALSE AS "is_new" FROM open_conversation
+    UNION ALL
+    SELECT "id", TRUE AS "is_new" FROM new_conversation
+),
+participants AS (
+    INSERT INTO "conversation_participants" ("id", "conversationId", "userId")
+    SELECT gen_random_uuid()::text, conversation."id", u."id"
+    FROM conversation
+    CROSS JOIN "users" u
+    WHERE u."role" = 'ADMIN'
+      AND NOT EXISTS (
+          SELECT 1 FROM "conversation_participants" p
+          WHERE p."conversationId" = conversation."id"
+      )
+    ON CONFLICT ("conversationId", "userId") DO NOTHING
+    RETURNING "userId"
+),
+message AS (
+    INSERT INTO "messages"
+        ("id", "conversation_id", "source", "platform", "text",
+         "remote_message_id", "created_at")
+    SELECT $8, conversation."id", 'CUSTOMER'::"Source", $2::"Platform", $9, $10,
+           timezone('utc', now())
+    FROM conversation
+    ON CONFLICT ("platform", "remote_message_id") DO NOTHING
+    RETURNING "id", "conversation_id", "from_user_id", "platform", "text",
+              "change_seq"
+),
+outbox AS ({new_message_outbox_sql("message")}),
+touched AS (
+    UPDATE "conversations"
+    SET "last_message_at" = timezone('utc', now()),
+        "last_inbound_at" = timezone('utc', now()),
+        "message_count" = "conversations"."message_count" + 1,
+        "inbound_count" = "conversations"."inbound_count" + 1,
+        "updated_at" = timezone('utc', now())
+    FROM message
+    WHERE "conversations"."id" = message."conversation_id"
+    RETURNING "conversations"."id", "conversations"."message_count"
+)
+SELECT contact."id" AS "contact_id",
+       contact."opt_out" AS "contact_opt_out",
+       conversation."id" AS "conversation_id",
+       conversation."is_new" AS "conversation_created",
+       message."id" AS "message_id",
+       message."change_seq" AS "change_seq",
+       COALESCE((SELECT "message_count" FROM touched), 1) = 1
+           AS "first_message",
+       (SELECT COUNT(*) FROM participants)::int AS "participants_added"
+FROM contact
+CROSS JOIN conversation
+LEFT JOIN message ON TRUE
+"""
+
+
+# Same upsert, conversation lookup and admin attachment as above, for many
+# contacts at once. Messages and counters are written by later statements.
+RESOLVE_INBOUND_CONTACTS_SQL = """
+WITH input ("id", "platform", "platform_user_id", "phone", "name", "opt_out",
+            "conversation_id") AS (
+    VALUES {values}
+),
+contact AS (
+    INSERT INTO "contacts"
+        ("id", "platform", "platform_user_id", "phone", "name", "opt_out",
+         "updated_at")
+    SELECT "id", "platform", "platform_user_id", "phone", "name", "opt_out",
+           timezone('utc', now())
+    FROM input
+    ON CONFLICT ("platform", "platform_user_id") DO UPDATE
+    SET "phone" = COALESCE(EXCLUDED."phone", "contacts"."phone"),
+        "name" = COALESCE(EXCLUDED."name", "contacts"."name"),
+        "opt_out" = "contacts"."opt_out" OR EXCLUDED."opt_out",
+        "updated_at" = EXCLUDED."updated_at"
+    RETURNING "id", "platform", "platform_user_id", "opt_out"
+),
+open_conversation AS (
+    SELECT DISTINCT ON (c."contact_id") c."contact_id", c."id"
+    FROM "conversations" c
+    JOIN contact ON c."contact_id" = contact."id"
+    WHERE c."status" = 'OPEN'
+    ORDER BY c."contact_id", c."last_message_at" DESC
+),
+new_conversation AS (
+    INSERT INTO "conversations"
+        ("id", "contact_id", "status", "last_message_at", "updated_at", "source")
+    SELECT input."conversation_id", contact."id", 'OPEN'::"ConversationStatus",
+           timezone('utc', now()), timezone('utc', now()), 'CUSTOMER'::"Source"
+    FROM contact
+    JOIN input ON input."platform" = contact."platform"
+              AND input."platform_user_id" = contact."platform_user_id"
+    WHERE NOT EXISTS (
+        SELECT 1 FROM open_conversation o WHERE o."contact_id" = contact."id"
+    )
+    RETURNING "id", "contact_id"
+),
+conversation AS (
+    SELECT "contact_id", "id", FALSE AS "is_new" FROM open_conversation
+    UNION ALL
+    SELECT "contact_id", "id", TRUE AS "is_new" FROM new_conversation
+),
+participants AS (
+    INSERT INTO "conversation_participants" ("id", "conversationId", "userId")
+    SELECT gen_random_uuid()::text, conversation."id", u."id"
+    FROM conversation
+    CROSS JOIN "users" u
+    WHERE u."role" = 'ADMIN'
+      AND NOT EXISTS (
+          SELECT 1 FROM "conversation_participants" p
+          WHERE p."conversationId" = conversation."id"
+      )
+    ON CONFLICT ("conversationId", "userId") DO NOTHING
+    RETURNING "conversationId"
+)
+SELECT contact."id" AS "contact_id",
+       contact."platform"::text AS "platform",
+       contact."platform_user_id",
+       contact."opt_out" AS "contact_opt_out",
+       conversation."id" AS "conversation_id",
+       conversation."is_new" AS "conversation_created",
+       (SELECT COUNT(*) FROM participants p
+        WHERE p."conversationId" = conversation."id")::int AS "participants_added"
+FROM contact
+JOIN conversation ON conversation."contact_id" = contact."id"
+"""
+
+ContactKey = Tuple[Platform, str]
+
+
+@dataclass
+class InboundContact:
+    platform: Platform
+    platform_user_id: str
+    phone: Optional[str] = None
+    name: Optional[str] = None
+    opt_out: bool = False
+
+
+@dataclass
+class ResolvedContact:
+    contact_id: str
+    contact_opt_out: bool
+    conversation_id: str
+    conversation_created: bool
+    participants_added: int
+
+
+@dataclass
+class InboundIngestResult:
+    contact_id: str
+    contact_opt_out: bool
+    conversation_id: str
+    conversation_created: bool
+    # None when the message is a redelivery that was already stored
+    message_id: Optional[str]
+    # Change sequence of the stored message (None for redeliveries)
+    change_seq: Optional[int]
+    is_first_message: bool
+    participants_added: int
+
+
+class IngestRepository:
+    """Repository for consolidated inbound writes."""
+
+    async def ingest_inbound(
+        self,
+        db: Prisma,
+        *,
+        platform: Platform,
+        platform_user_id: str,
+        phone: Optional[str],
+        name: Optional[str],
+        text: Optional[str],
+        remote_message_id: str,
+        opt_out: bool = False,
+    ) -> InboundIngestResult:
+        """
+        Store one customer message in a single round-trip.
+
+        Upserts the contact, finds or creates the open conversation, attaches
+        all admins to a conversation without participants, inserts the
+        message, bumps lastMessageAt and the conversation counters and
+        queues the new_message event in the outbox.
+        """
+        row = await db.query_first(
+            INGEST_INBOUND_SQL,
+            new_id(),
+            platform.value,
+            platform_user_id,
+            phone,
+            name,
+            opt_out,
+            new_id(),
+            new_id(),
+            text,
+            remote_message_id,
+        )
+
+        return InboundIngestResult(
+            contact_id=row["contact_id"],
+            contact_opt_out=row["contact_opt_out"],
+            conversation_id=row["conversation_id"],
+            conversation_created=row["conversation_created"],
+            message_id=row["message_id"],
+            change_seq=row["change_seq"],
+            is_first_message=row["message_id"] is not None and row["first_message"],
+            participants_added=row["participants_added"],
+        )
+
+    async def resolve_inbound_contacts(
+        self,
+        db: Prisma,
+        contacts: List[InboundContact],
+    ) -> Dict[ContactKey, ResolvedContact]:
+        """
+        Upsert many contacts and find or create their open conversations in
+        one round-trip.
+
+        Opt-outs are applied by the upsert; all admins are attached to
+        conversations without participants. Returns one row per contact,
+        keyed by (platform, platform_user_id).
+        """
+        # ON CONFLICT cannot touch the same row twice in one statement
+        merged: Dict[ContactKey, InboundContact] = {}
+        for contact in contacts:
+            key = (contact.platform, contact.platform_user_id)
+            previous = merged.get(key)
+            if previous is not None:
+                contact = InboundContact(
+                    platform=contact.platform,
+                    platform_user_id=contact.platform_user_id,
+                    phone=contact.phone or previous.phone,
+                    name=contact.name or previous.name,
+                    opt_out=contact.opt_out or previous.opt_out,
+                )
+            merged[key] = contact
+
+        if not merged:
+            return {}
+
+        values = []
+        params: list = []
+        for contact in merged.values():
+            n = len(params)
+            values.append(
+                f'(${n + 1}, ${n + 2}::"Platform", ${n + 3}, ${n + 4}, ${n + 5}, '
+                f"${n + 6}::boolean, ${n + 7})"
+            )
+            params.extend(
+                [
+                    new_id(),
+                    contact.platform.value,
+                    contact.platform_user_id,
+                    contact.phone,
+                    contact.name,
+                    contact.opt_out,
+                    new_id(),
+                ]
+            )
+
+        rows = await db.query_raw(
+            RESOLVE_INBOUND_CONTACTS_SQL.format(values=", ".join(values)),
+            *params,
+        )
+
+        return {
+            (Platform(row["platform"]), row["platform_user_id"]): ResolvedContact(
+                contact_id=row["contact_id"],
+                contact_opt_out=row["contact_opt_out"],
+                conversation_id=row["conversation_id"],
+                conversation_created=row["conversation_created"],
+                participants_added=row["participants_added"],
+            )
+            for row in rows
+        }
+
+
+ingest_repo = IngestRepository()
@@ -2,15 +2,52 @@
 Repository for Message database operations.
 """
 
-from typing import Optional, List
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
 
 from prisma import Prisma
 from prisma.models import Message
 
+from app.db.ids import new_id
+from app.db.sql import NOW_UTC
+from app.pagination import db_timestamp
+from app.repositories.outbox_repository import new_message_outbox_sql
 from app.schemas.platform import Platform
 from app.schemas.source import Source
 
 
+# "messages" columns aliased to `Message` field names for raw queries
+MESSAGE_COLUMNS = """
+    "id",
+    "conversation_id" AS "conversationId",
+    "from_user_id" AS "fromUserId",
+    "source"::text AS "source",
+    "platform"::text AS "platform",
+    "text",
+    "media_url" AS "mediaUrl",
+    "remote_message_id" AS "remoteMessageId",
+    "created_at" AS "createdAt",
+    "change_seq" AS "changeSeq"
+"""
+
+
+@dataclass
+class InboundMessageRow:
+    conversation_id: str
+    platform: Platform
+    text: Optional[str]
+    remote_message_id: str
+
+
+@dataclass
+class InsertedMessage:
+    id: str
+    conversation_id: str
+    remote_message_id: str
+    change_seq: int
+
+
 class MessageRepository:
     """Repository for Message CRUD operations."""
 
@@ -46,29 +83,113 @@ class MessageRepository:
             }
         )
 
+    async def create_outbound(
+        self,
+        db: Prisma,
+        *,
+        conversation_id: str,
+        platform: Platform,
+        from_user_id: Optional[str] = None,
+        text: Optional[str] = None,
+        media_url: Optional[str] = None,
+        remote_message_id: Optional[str] = None,
+        source: Source,
+    ) -> Message:
+        """
+        Store an agent or system message, bump the conversation
+        (lastMessageAt, lastOutboundAt, messageCount) and queue the
+        new_message event in the outbox, in one statement.
+        """
+        if source == Source.CUSTOMER:
+            raise ValueError("Outbound messages cannot come from the customer")
+
+        if source == Source.AGENT and from_user_id is None:
+            raise ValueError("Agent messages must have from_user_id")
+
+        message = await db.query_first(
+            f"""
+            WITH message AS (
+                INSERT INTO "messages"
+                    ("id", "conversation_id", "from_user_id", "source",
+                     "platform", "text", "media_url", "remote_message_id",
+                     "created_at")
+                VALUES ($1, $2, $3, $4::"Source", $5::"Platform", $6, $7, $8,
+                        timezone('utc', now()))
+                RETURNING *
+            ),
+            touched AS (
+                UPDATE "conversations" c
+                SET "last_message_at" = message."created_at",
+                    "last_outbound_at" = message."created_at",
+                    "message_count" = c."message_count" + 1,
+                    "updated_at" = message."created_at"
+                FROM message
+                WHERE c."id" = message."conversation_id"
+            ),
+            outbox AS ({new_message_outbox_sql("message")})
+            SELECT {MESSAGE_COLUMNS}
+            FROM message
+            """,
+            new_id(),
+            conversation_id,
+            from_user_id,
+            source.value,
+            platform.value,
+            text,
+            media_url,
+            remote_message_id,
+            model=Message,
+        )
+        if message is None:
+            raise ValueError("Failed to store outbound message")
+        return message
+
     async def get_by_conversation(
         self,
         db: Prisma,
         conversation_id: str,
         limit: int = 50,
-        cursor: Optional[str] = None,
+        before: Optional[Tuple[datetime, str]] = None,
+        after: Optional[Tuple[datetime, str]] = None,
     ) -> List[Message]:
-        """Get messages for a conversation with cursor pagination."""
-        if cursor:
-            return await db.message.find_many(
-                where={"conversationId": conversation_id},
-                order={"createdAt": "desc"},
-                take=limit,
-                cursor={"id": cursor},
-                skip=1,
-            )
+        """
+        Page of messages of a conversation, newest first.
 
-        return await db.message.find_many(
-            where={"conversationId": conversation_id},
-            order={"createdAt": "desc"},
-            take=limit,
+        Keyset pagination on (createdAt, id) over the
+        (conversation_id, created_at, id) index: `before` returns the page
+        older than that sort key, `after` the page newer than it (closest
+        to the key first, still returned newest first).
+        """
+        params: list = [conversation_id]
+        condition = ""
+        direction = "DESC"
+
+        if before is not None:
+            condition = 'AND ("created_at", "id") < ($2::timestamp(3), $3)'
+            params.extend([db_timestamp(before[0]), before[1]])
+        elif after is not None:
+            condition = 'AND ("created_at", "id") > ($2::timestamp(3), $3)'
+            params.extend([db_timestamp(after[0]), after[1]])
+            direction = "ASC"
+
+        params.append(limit)
+
+        messages = await db.query_raw(
+            f"""
+            SELECT {MESSAGE_COLUMNS}
+            FROM "messages"
+            WHERE "conversation_id" = $1 {condition}
+            ORDER BY "created_at" {direction}, "id" {direction}
+            LIMIT ${len(params)}
+            """,
+            *params,
+            model=Message,
         )
 
+        if direction == "ASC":
+            messages.reverse()
+        return messages
+
     async def get_recent(
         self,
         db: Prisma,
@@ -103,5 +224,71 @@ class MessageRepository:
 
         return await db.message.count(where=where)
 
+    async def create_many_inbound(
+        self,
+        db: Prisma,
+        rows: List[InboundMessageRow],
+    ) -> List[InsertedMessage]:
+        """
+        Insert customer messages in one statement.
+
+        Redelivered messages (same platform + remote id) are skipped, so
+        only newly stored rows are returned, in input order, and get a
+        new_message event in the outbox. Rows get the database time plus
+        their position in milliseconds, keeping their relative order.
+        """
+        if not rows:
+            return []
+
+        values = []
+        params: list = []
+        for i, row in enumerate(rows):
+            n = len(params)
+            values.append(
+                f'(${n + 1}, ${n + 2}, ${n + 3}::"Source", ${n + 4}::"Platform", '
+                f"${n + 5}, ${n + 6}, "
+                f"({NOW_UTC} + ${n + 7}::int * interval '1 millisecond')::timestamp(3))"
+            )
+            params.extend(
+                [
+                    new_id(),
+                    row.conversation_id,
+                    Source.CUSTOMER.value,
+                    row.platform.value,
+                    row.text,
+                    row.remote_message_id,
+                    i,
+                ]
+            )
+
+        inserted = await db.query_raw(
+            f"""
+            WITH message AS (
+                INSERT INTO "messages"
+                    ("id", "conversation_id", "source", "platform", "text",
+                     "remote_message_id", "created_at")
+                VALUES {", ".join(values)}
+                ON CONFLICT ("platform", "remote_message_id") DO NOTHING
+                RETURNING *
+            ),
+            outbox AS ({new_message_outbox_sql("message")})
+            SELECT "id", "conversation_id", "remote_message_id", "created_at",
+                   "change_seq"
+            FROM message
+            """,
+            *params,
+        )
+
+        inserted.sort(key=lambda row: row["created_at"])
+        return [
+            InsertedMessage(
+                id=row["id"],
+                conversation_id=row["conversation_id"],
+                remote_message_id=row["remote_message_id"],
+                change_seq=row["change_seq"],
+            )
+            for row in inserted
+        ]
+
 
 message_repo = MessageRepository()
@@ -0,0 +1,140 @@
+"""
+Repository for the transactional event outbox.
+
+Events are inserted by the statement (or transaction) that stores the change
+they report, so an event exists if and only if its change was committed.
+The outbox relay claims, publishes and deletes them.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from prisma import Prisma
+
+from app.db.sql import NOW_UTC, claim_sql
+from app.ws.event_types import WSEventType
+
+CLAIM_SQL = claim_sql(
+    "event_outbox",
+    order_by='"created_at", "seq"',
+    created_column="created_at",
+    returning='"id", "event_type", "payload"::text AS "payload", "seq", "attempts"',
+)
+
+
+def new_message_outbox_sql(source: str) -> str:
+    """
+    INSERT queueing a new_message event for every row of `source`.
+
+    Meant for a data-modifying CTE next to the message insert; `source` is
+    the CTE returning the stored "messages" rows.
+    """
+    return f"""
+    INSERT INTO "event_outbox" ("event_type", "payload", "seq", "created_at")
+    SELECT '{WSEventType.NEW_MESSAGE.value}',
+           jsonb_build_object(
+               'conversation_id', {source}."conversation_id",
+               'message_id', {source}."id",
+               'from_user_id', {source}."from_user_id",
+               'platform', {source}."platform"::text,
+               'text', {source}."text"
+           ),
+           {source}."change_seq",
+           {NOW_UTC}
+    FROM {source}
+    """
+
+
+@dataclass
+class ClaimedOutboxEvent:
+    # Dedup id, sent along with the event
+    id: str
+    event_type: str
+    payload: dict[str, Any]
+    seq: Optional[int]
+    attempts: int
+    age_seconds: float
+
+
+@dataclass
+class OutboxStats:
+    depth: int
+    oldest_age_seconds: float
+
+
+class OutboxRepository:
+    """Repository for EventOutbox operations."""
+
+    async def append(
+        self,
+        db: Prisma,
+        event_type: str,
+        payload: dict[str, Any],
+        seq: Optional[int] = None,
+    ) -> str:
+        """Queue an event; pass the transaction that stores the change."""
+        row = await db.query_first(
+            f"""
+            INSERT INTO "event_outbox" ("event_type", "payload", "seq", "created_at")
+            VALUES ($1, $2::jsonb, $3, {NOW_UTC})
+            RETURNING "id"
+            """,
+            event_type,
+            json.dumps(payload),
+            seq,
+        )
+        return row["id"]
+
+    async def claim_batch(
+        self,
+        db: Prisma,
+        *,
+        limit: int,
+        lease_seconds: int,
+    ) -> List[ClaimedOutboxEvent]:
+        """Lease the oldest events."""
+        rows = await db.query_raw(CLAIM_SQL, limit, lease_seconds)
+
+        events = [
+            ClaimedOutboxEvent(
+                id=row["id"],
+                event_type=row["event_type"],
+                payload=json.loads(row["payload"]),
+                seq=row["seq"],
+                attempts=row["attempts"],
+                age_seconds=row["age_seconds"],
+            )
+            for row in rows
+        ]
+        events.sort(key=lambda event: (-event.age_seconds, event.seq or 0))
+        return events
+
+    async def delete(self, db: Prisma, event_ids: List[str]) -> None:
+        """Drop published events."""
+        if not event_ids:
+            return
+
+        placeholders = ", ".join(f"${i + 1}" for i in range(len(event_ids)))
+        await db.execute_raw(
+            f'DELETE FROM "event_outbox" WHERE "id" IN ({placeholders})',
+            *event_ids,
+        )
+
+    async def stats(self, db: Prisma) -> OutboxStats:
+        row = await db.query_first(
+            f"""
+            SELECT COUNT(*)::int AS "depth",
+                   COALESCE(
+                       EXTRACT(EPOCH FROM ({NOW_UTC} - MIN("created_at"))), 0
+                   )::float8 AS "oldest_age_seconds"
+            FROM "event_outbox"
+            """
+        )
+        return OutboxStats(
+            depth=row["depth"] if row else 0,
+            oldest_age_seconds=row["oldest_age_seconds"] if row else 0.0,
+        )
+
+
+outbox_repo = OutboxRepository()
@@ -0,0 +1,133 @@
+"""
+Repository for delta sync over the global change sequence.
+"""
+
+from dataclasses import dataclass, field
+from typing import List
+
+from prisma import Prisma
+from prisma.models import Conversation, Message, Order, Suggestions
+
+# "orders" columns aliased to `Order` field names
+ORDER_COLUMNS = """
+    o."id",
+    o."contact_id" AS "contactId",
+    o."product_id" AS "productId",
+    o."conversation_id" AS "conversationId",
+    o."amount_cents" AS "amountCents",
+    o."currency",
+    o."stripe_session_id" AS "stripeSessionId",
+    o."status"::text AS "status",
+    o."created_at" AS "createdAt",
+    o."updated_at" AS "updatedAt",
+    o."change_seq" AS "changeSeq"
+"""
+
+
+@dataclass
+class ChangeBatch:
+    conversations: List[Conversation] = field(default_factory=list)
+    messages: List[Message] = field(default_factory=list)
+    orders: List[Order] = field(default_factory=list)
+    suggestions: List[Suggestions] = field(default_factory=list)
+    # Resume point for the next call and whether anything was cut off
+    seq: int = 0
+    has_more: bool = False
+
+
+class SyncRepository:
+    """Changes visible to a participant after a change sequence number."""
+
+    async def changes_since(
+        self,
+        db: Prisma,
+        *,
+        user_id: str,
+        since: int,
+        limit: int,
+    ) -> ChangeBatch:
+        """
+        Rows of the user's conversations with change_seq > `since`, oldest
+        change first, at most `limit` per kind.
+
+        Sequence values are drawn at write time, so a transaction can commit
+        a lower value after a higher one. Rows are only read up to the
+        watermark below which no change is still in flight, and `seq` never
+        passes it: a slow writer's change is returned by a later call instead
+        of being skipped.
+
+        A conversation gets a new change_seq when its participants change,
+        so a user added to it gets it on the next call, even with older
+        messages left for the client to load.
+
+        When a kind is cut off, `seq` stops at its last returned row, so the
+        next call picks up from there; rows of other kinds past that point
+        are simply sent again.
+        """
+        # Lowest floor of the writers in flight; never waits, see the
+        # change_seq_watermark migration
+        row = await db.query_first('SELECT "change_seq_watermark"() AS "watermark"')
+        watermark = max(int(row["watermark"]), since)
+        window = {"gt": since, "lte": watermark}
+
+        participant = {"conversationParticipants": {"some": {"userId": user_id}}}
+
+        conversations = await db.conversation.find_many(
+            where={"changeSeq": window, **participant},
+            include={"contact": True},
+            order={"changeSeq": "asc"},
+            take=limit,
+        )
+        messages = await db.message.find_many(
+            where={"changeSeq": window, "conversation": {"is": participant}},
+            order={"changeSeq": "asc"},
+            take=limit,
+        )
+        suggestions = await db.suggestions.find_many(
+            where={"changeSeq": window, "conversation": {"is": participant}},
+            order={"changeSeq": "asc"},
+            take=limit,
+        )
+        # orders.conversation_id is not a relation, filter in SQL
+        orders = await db.query_raw(
+            f"""
+            SELECT {ORDER_COLUMNS}
+            FROM "orders" o
+            WHERE o."change_seq" > $1
+              AND o."change_seq" <= $4
+              AND o."conversation_id" IN (
+                  SELECT "conversationId" FROM "conversation_participants"
+                  WHERE "userId" = $2
+              )
+            ORDER BY o."change_seq"
+            LIMIT $3
+            """,
+            since,
+            user_id,
+            limit,
+            watermark,
+            model=Order,
+        )
+
+        batch = ChangeBatch(
+            conversations=conversations,
+            messages=messages,
+            orders=orders,
+            suggestions=suggestions,
+            seq=since,
+        )
+
+        kinds = [conversations, messages, orders, suggestions]
+        truncated = [rows[-1].changeSeq for rows in kinds if len(rows) == limit]
+        if truncated:
+            batch.has_more = True
+            batch.seq = min(truncated)
+        else:
+            # Everything up to the watermark was read, including gaps left
+            # by rolled-back writes and other users' conversations
+            batch.seq = watermark
+
+        return batch
+
+
+sync_repo = SyncRepository()
@@ -7,7 +7,16 @@ from typing import Optional, List
 from prisma import Prisma
 from prisma.models import User
 
-from app.schemas.user import Role
+from app.cache import TTLCache
+from app.schemas.user import Role, UserOut
+from app.settings import settings
+
+# Authenticated users by id; dropped on every write to the user row
+user_cache: TTLCache[str, UserOut] = TTLCache(
+    "users",
+    max_size=settings.user_cache_max_size,
+    ttl_seconds=settings.user_cache_ttl_seconds,
+)
 
 
 class UserRepository:
@@ -49,10 +58,12 @@ class UserRepository:
         if "email" in data:
             update_data["email"] = data["email"]
 
-        return await db.user.update(
+        updated = await db.user.update(
             where={"id": user_id},
             data=update_data,
         )
+        user_cache.invalidate(user_id)
+        return updated
 
     async def list_users(
         self, db: Prisma, limit: int = 100, offset: int = 0
@@ -9,6 +9,7 @@ from typing import Optional, List
 from pydantic import BaseModel, Field
 
 from app.schemas.contact import ContactOut, Platform
+from app.schemas.source import Source
 
 
 class ConversationStatus(str, Enum):
@@ -39,6 +40,10 @@ class ConversationOut(BaseModel):
     status: ConversationStatus
     last_message_at: datetime = Field(..., alias="lastMessageAt")
     created_at: datetime = Field(..., alias="createdAt")
+    message_count: int = Field(default=0, alias="messageCount")
+    inbound_count: int = Field(default=0, alias="inboundCount")
+    last_inbound_at: Optional[datetime] = Field(default=None, alias="lastInboundAt")
+    last_outbound_at: Optional[datetime] = Field(default=None, alias="lastOutboundAt")
 
     model_config = {"from_attributes": True, "populate_by_name": True}
 
@@ -57,9 +62,52 @@ class ConversationListResponse(BaseModel):
     """Schema for paginated conversation list."""
 
     items: List[ConversationWithContact]
-    total: int
+    # Only counted when requested with include_total
+    total: Optional[int] = None
     limit: int
     offset: int
+    # Opaque keyset cursor for the next page; None on the last page
+    next_cursor: Optional[str] = Field(default=None, alias="nextCursor")
+
+    model_config = {"populate_by_name": True}
+
+
+class LastMessagePreview(BaseModel):
+    """Latest message of a conversation, text cut to a snippet."""
+
+    id: str
+    source: Source
+    text: Optional[str] = None
+    has_media: bool = Field(default=False, alias="hasMedia")
+    created_at: datetime = Field(..., alias="createdAt")
+
+    model_config = {"populate_by_name": True}
+
+
+class ConversationAssignee(BaseModel):
+    id: str
+    name: str
+
+
+class InboxItem(ConversationWithContact):
+    """Conversation row of the inbox with preview and read state."""
+
+    last_message: Optional[LastMessagePreview] = Field(
+        default=None, alias="lastMessage"
+    )
+    # Customer messages newer than the current user's last read
+    unread_count: int = Field(default=0, alias="unreadCount")
+    assignees: List[ConversationAssignee] = Field(default_factory=list)
+
+
+class InboxResponse(BaseModel):
+    """Schema for a page of the inbox."""
+
+    items: List[InboxItem]
+    limit: int
+    next_cursor: Optional[str] = Field(default=None, alias="nextCursor")
+
+    model_config = {"populate_by_name": True}
 
 
 class SendMessageRequest(BaseModel):
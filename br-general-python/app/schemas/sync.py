@@ -0,0 +1,25 @@
+"""
+Delta-sync schemas.
+"""
+
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from app.schemas.conversation import ConversationWithContact, MessageOut
+from app.schemas.order import OrderOut
+from app.schemas.suggestion import SuggestionOut
+
+
+class SyncResponse(BaseModel):
+    """Everything that changed after `since`, for one participant."""
+
+    conversations: List[ConversationWithContact] = Field(default_factory=list)
+    messages: List[MessageOut] = Field(default_factory=list)
+    orders: List[OrderOut] = Field(default_factory=list)
+    suggestions: List[SuggestionOut] = Field(default_factory=list)
+    # Pass back as `since`; keep calling while hasMore is true
+    seq: int
+    has_more: bool = Field(default=False, alias="hasMore")
+
+    model_config = {"populate_by_name": True}
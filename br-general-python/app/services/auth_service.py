@@ -1,10 +1,15 @@
+import hashlib
+import time
 from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from uuid import uuid4
 
+from ..cache import TTLCache
 from ..settings import settings
+from .password_hasher import password_hasher
 
 
 class InvalidTokenError(Exception):
@@ -21,6 +26,20 @@ class WrongTokenTypeError(Exception):
 
 pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 
+# Verified tokens by SHA-256 digest, each kept until its own `exp`
+verified_tokens: TTLCache[bytes, dict] = TTLCache(
+    "verified_tokens",
+    max_size=settings.token_cache_max_size,
+    ttl_seconds=0,
+)
+# Revoked `jti`s, kept until the revoked token would have expired anyway.
+# Per worker: revocation is best-effort until shared storage exists.
+revoked_jtis: TTLCache[str, bool] = TTLCache(
+    "revoked_jtis",
+    max_size=settings.token_cache_max_size,
+    ttl_seconds=0,
+)
+
 
 class AuthService:
     """Authentication and token service."""
@@ -29,11 +48,16 @@ class AuthService:
     # Password hashing
     # -------------------------
 
-    def hash_password(self, password: str) -> str:
-        return pwd_context.hash(password)
+    # argon2 runs on the bounded hasher pool; both calls may raise
+    # PasswordHasherBusyError when it is saturated.
+
+    async def hash_password(self, password: str) -> str:
+        return await password_hasher.run("hash", pwd_context.hash, password)
 
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return await password_hasher.run(
+            "verify", pwd_context.verify, plain_password, hashed_password
+        )
 
     # -------------------------
     # Token creation
@@ -44,10 +68,12 @@ class AuthService:
         subject: str,
         token_type: str,
         expires_delta: timedelta,
+        claims: Optional[dict[str, Any]] = None,
     ) -> str:
         now = datetime.now(timezone.utc)
 
         payload = {
+            **(claims or {}),
             "sub": subject,
             "type": token_type,  # "access" or "refresh"
             "iat": now,
@@ -61,11 +87,25 @@ class AuthService:
             algorithm=settings.jwt_algorithm,
         )
 
-    def create_access_token(self, user_id: str) -> str:
+    @staticmethod
+    def user_claims(user) -> dict[str, Any]:
+        """Profile claims embedded in access tokens."""
+        return {
+            "email": user.email,
+            "name": user.name,
+            "role": str(getattr(user.role, "value", user.role)),
+        }
+
+    def create_access_token(
+        self,
+        user_id: str,
+        claims: Optional[dict[str, Any]] = None,
+    ) -> str:
         return self._create_token(
             subject=user_id,
             token_type="access",
             expires_delta=timedelta(minutes=settings.access_token_expire_minutes),
+            claims=claims,
         )
 
     def create_refresh_token(self, user_id: str) -> str:
@@ -90,19 +130,39 @@ class AuthService:
         if token.startswith("Bearer "):
             token = token.removeprefix("Bearer ").strip()
 
-        try:
-            payload = jwt.decode(
-                token,
-                settings.jwt_secret_key,
-                algorithms=[settings.jwt_algorithm],
-            )
-            return payload
+        digest = hashlib.sha256(token.encode()).digest()
+        payload = verified_tokens.get(digest)
 
-        except jwt.ExpiredSignatureError:
+        if payload is None:
+            try:
+                payload = jwt.decode(
+                    token,
+                    settings.jwt_secret_key,
+                    algorithms=[settings.jwt_algorithm],
+                )
+            except jwt.ExpiredSignatureError:
+                raise ExpiredTokenError("Token has expired")
+
+            except JWTError:
+                raise InvalidTokenError("Invalid token")
+
+            verified_tokens.set(digest, payload, ttl_seconds=_seconds_left(payload))
+
+        elif _seconds_left(payload) <= 0:
+            verified_tokens.invalidate(digest)
             raise ExpiredTokenError("Token has expired")
 
-        except JWTError:
-            raise InvalidTokenError("Invalid token")
+        jti = payload.get("jti")
+        if jti is not None and revoked_jtis.get(jti):
+            raise InvalidTokenError("Token has been revoked")
+
+        return dict(payload)
+
+    def revoke_token(self, payload: dict) -> None:
+        """Reject the token with this payload's `jti` until it expires."""
+        jti = payload.get("jti")
+        if jti is not None:
+            revoked_jtis.set(jti, True, ttl_seconds=_seconds_left(payload))
 
     # -------------------------
     # Token type enforcement
@@ -125,4 +185,11 @@ class AuthService:
         return payload
 
 
+def _seconds_left(payload: dict) -> float:
+    exp = payload.get("exp")
+    if exp is None:
+        return 0.0
+    return float(exp) - time.time()
+
+
 auth_service = AuthService()
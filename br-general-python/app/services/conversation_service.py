@@ -1,3 +1,5 @@
+from datetime import datetime, timezone
+
 from app.db import db
 from app.repositories.conversation_repository import conversation_repo
 from app.repositories.conversation_participant_repository import (
@@ -6,6 +8,7 @@ from app.repositories.conversation_participant_repository import (
 from app.repositories.user_repository import user_repo
 from app.schemas.platform import Platform
 from app.schemas.source import Source
+from app.ws.dispatcher import conversation_updates
 
 
 class ConversationService:
@@ -52,10 +55,10 @@ class ConversationService:
             raise ValueError("User not found")
 
         await conversation_participant_repository.replace_assignee(
-            db,
             conversation_id=conversation_id,
             new_user_id=user_id,
         )
+        conversation_updates.update(conversation_id, {"assignee_id": user_id})
 
     async def create_with_initial_message(
         self,
@@ -67,18 +70,30 @@ class ConversationService:
         source: Source,
         platform: Platform = Platform.WHATSAPP,  # or pass explicitly
     ):
+        # One timestamp for the message and every counter, so the
+        # conversation matches what the counters backfill would compute
+        now = datetime.now(timezone.utc)
+        inbound = source == Source.CUSTOMER
+
         return await db.conversation.create(
             data={
                 # ✅ REQUIRED scalar field
                 "contactId": contact_id,
                 # ✅ REQUIRED field
                 "source": source,
+                "lastMessageAt": now,
+                # counters for the initial message
+                "messageCount": 1,
+                "inboundCount": 1 if inbound else 0,
+                "lastInboundAt": now if inbound else None,
+                "lastOutboundAt": None if inbound else now,
                 # ✅ REQUIRED initial message
                 "messages": {
                     "create": {
                         "text": text,
                         "source": source,
                         "platform": platform,
+                        "createdAt": now,
                     }
                 },
             }
@@ -0,0 +1,292 @@
+"""
+Acknowledge-first ingestion of Meta webhooks.
+
+The webhook endpoint only verifies the signature and appends the raw payload
+to the `inbound_events` table. A poller leases batches of events and routes
+every normalized message to one of N worker queues by contact, so messages
+of one conversation are handled in order while different conversations are
+processed in parallel.
+
+That order holds within one process only. Events are claimed by age, not by
+contact: with several processes (uvicorn workers, a release overlapping the
+old one) or after a retry, two processes can handle messages of the same
+contact at the same time. Redeliveries are still stored once.
+
+Leases of claimed events are renewed until they are settled, so an event
+waiting behind a full partition queue is not claimed a second time.
+"""
+
+import asyncio
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.db import db
+from app.logging import logger
+from app.metrics import metrics
+from app.repositories.inbound_event_repository import (
+    ClaimedInboundEvent,
+    inbound_event_repo,
+)
+from app.schemas.message import NormalizedMessage
+from app.services.message_service import message_service
+from app.services.meta_service import meta_service
+from app.settings import settings
+
+LEASE_SECONDS = 60
+LEASE_RENEW_INTERVAL_SECONDS = LEASE_SECONDS / 3
+MAX_ATTEMPTS = 5
+RETRY_IN_SECONDS = 10
+STATS_INTERVAL_SECONDS = 5.0
+PARTITION_QUEUE_SIZE = 100
+
+
+@dataclass
+class _EventProgress:
+    event: ClaimedInboundEvent
+    remaining: int
+    claimed_at: float  # time.monotonic()
+    error: Optional[str] = None
+
+
+_WorkItem = Optional[Tuple[_EventProgress, NormalizedMessage]]
+
+
+def partition_for(msg: NormalizedMessage, partitions: int) -> int:
+    """Stable worker index for a contact (and therefore its conversation)."""
+    key = f"{msg.platform.value}:{msg.from_number}".encode()
+    return zlib.crc32(key) % partitions
+
+
+class InboundQueue:
+    def __init__(self) -> None:
+        self._partitions: List[asyncio.Queue[_WorkItem]] = []
+        self._workers: List[asyncio.Task] = []
+        self._poller: Optional[asyncio.Task] = None
+        self._renewer: Optional[asyncio.Task] = None
+        # Claimed events not settled yet, by id
+        self._in_flight: Dict[str, _EventProgress] = {}
+        self._wakeup = asyncio.Event()
+        self._running = False
+        self._stats_refreshed_at = 0.0
+
+        self._enqueued = metrics.counter(
+            "inbound_queue_enqueued_total", "Webhook payloads appended to the queue"
+        )
+        self._processed = metrics.counter(
+            "inbound_queue_processed_total", "Queued events fully processed"
+        )
+        self._failed = metrics.counter(
+            "inbound_queue_failed_total", "Queued event attempts that failed"
+        )
+        self._dead = metrics.counter(
+            "inbound_queue_dead_total", "Queued events dropped after max attempts"
+        )
+        self._end_to_end = metrics.histogram(
+            "inbound_queue_end_to_end_seconds",
+            "Time from webhook receipt to processed",
+        )
+        self._depth = metrics.gauge(
+            "inbound_queue_depth", "Unprocessed events in the durable queue"
+        )
+        self._lag = metrics.gauge(
+            "inbound_queue_lag_seconds", "Age of the oldest unprocessed event"
+        )
+        metrics.gauge(
+            "inbound_queue_local_backlog",
+            "Messages waiting in this worker's partition queues",
+            fn=lambda: sum(queue.qsize() for queue in self._partitions),
+        )
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    async def enqueue(self, payload: dict[str, Any]) -> str:
+        event_id = await inbound_event_repo.enqueue(db, payload)
+        self._enqueued.inc()
+        self._wakeup.set()
+        return event_id
+
+    def start(self) -> None:
+        if self._running:
+            return
+
+        self._running = True
+        self._partitions = [
+            asyncio.Queue(maxsize=PARTITION_QUEUE_SIZE)
+            for _ in range(max(settings.inbound_queue_workers, 1))
+        ]
+        self._workers = [
+            asyncio.create_task(self._worker(queue)) for queue in self._partitions
+        ]
+        self._poller = asyncio.create_task(self._poll_loop())
+        self._renewer = asyncio.create_task(self._renew_loop())
+        logger.info("Inbound queue started with %s workers", len(self._workers))
+
+    async def stop(self) -> None:
+        """Stop claiming new events and drain what was already claimed."""
+        if not self._running:
+            return
+
+        self._running = False
+        self._wakeup.set()
+
+        if self._poller is not None:
+            await self._poller
+            self._poller = None
+
+        for queue in self._partitions:
+            await queue.put(None)
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+        if self._renewer is not None:
+            self._renewer.cancel()
+            await asyncio.gather(self._renewer, return_exceptions=True)
+            self._renewer = None
+
+        self._workers = []
+        self._partitions = []
+        logger.info("Inbound queue stopped")
+
+    async def _poll_loop(self) -> None:
+        while self._running:
+            events: List[ClaimedInboundEvent] = []
+
+            try:
+                events = await inbound_event_repo.claim_batch(
+                    db,
+                    limit=settings.inbound_queue_batch_size,
+                    lease_seconds=LEASE_SECONDS,
+                )
+                await self._refresh_stats()
+            except Exception:
+                logger.exception("Failed to claim inbound events")
+
+            for event in events:
+                await self._dispatch(event)
+
+            if len(events) < settings.inbound_queue_batch_size:
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(),
+                        timeout=settings.inbound_queue_poll_interval_seconds,
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def _renew_loop(self) -> None:
+        while True:
+            await asyncio.sleep(LEASE_RENEW_INTERVAL_SECONDS)
+            if not self._in_flight:
+                continue
+            try:
+                await inbound_event_repo.renew(
+                    db, list(self._in_flight), lease_seconds=LEASE_SECONDS
+                )
+            except Exception:
+                logger.exception("Failed to renew inbound event leases")
+
+    async def _refresh_stats(self) -> None:
+        now = time.monotonic()
+        if now - self._stats_refreshed_at < STATS_INTERVAL_SECONDS:
+            return
+
+        self._stats_refreshed_at = now
+        stats = await inbound_event_repo.stats(db)
+        self._depth.set(stats.depth)
+        self._lag.set(stats.oldest_age_seconds)
+
+    async def _dispatch(self, event: ClaimedInboundEvent) -> None:
+        messages = list(meta_service.normalize_webhook(event.payload))
+
+        progress = _EventProgress(
+            event=event,
+            remaining=len(messages),
+            claimed_at=time.monotonic(),
+        )
+        self._in_flight[event.id] = progress
+
+        if not messages:
+            await self._finish(progress)
+            return
+
+        for msg in messages:
+            index = partition_for(msg, len(self._partitions))
+            await self._partitions[index].put((progress, msg))
+
+    async def _worker(self, queue: "asyncio.Queue[_WorkItem]") -> None:
+        stopping = False
+
+        while not stopping:
+            item = await queue.get()
+            if item is None:
+                return
+
+            # Drain what is already waiting into one set-based batch;
+            # partition order is kept because the batch is stored in order.
+            batch = [item]
+            while len(batch) < settings.inbound_queue_batch_size:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                await message_service.handle_inbound_batch([msg for _, msg in batch])
+            except Exception as exc:
+                for progress, _ in batch:
+                    progress.error = repr(exc)
+                logger.exception("Error processing queued Meta messages")
+
+            for progress, _ in batch:
+                progress.remaining -= 1
+                if progress.remaining == 0:
+                    await self._finish(progress)
+
+    async def _finish(self, progress: _EventProgress) -> None:
+        event = progress.event
+        self._in_flight.pop(event.id, None)
+
+        try:
+            if progress.error is None:
+                await inbound_event_repo.mark_processed(db, event.id)
+                self._processed.inc()
+                self._end_to_end.observe(
+                    event.age_seconds + time.monotonic() - progress.claimed_at
+                )
+                return
+
+            self._failed.inc()
+
+            if event.attempts >= MAX_ATTEMPTS:
+                await inbound_event_repo.mark_processed(
+                    db, event.id, error=progress.error
+                )
+                self._dead.inc()
+                logger.error(
+                    "Inbound event %s dropped after %s attempts",
+                    event.id,
+                    event.attempts,
+                )
+                return
+
+            await inbound_event_repo.release(
+                db,
+                event.id,
+                error=progress.error,
+                retry_in_seconds=RETRY_IN_SECONDS,
+            )
+        except Exception:
+            # The lease expires on its own and the event is retried
+            logger.exception("Failed to settle inbound event %s", event.id)
+
+
+# singleton instance
+inbound_queue = InboundQueue()
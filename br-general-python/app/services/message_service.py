@@ -2,27 +2,45 @@
 Service for message business logic.
 """
 
-from time import sleep
-from typing import Optional
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from prisma.models import Conversation
 
 from app.db import db
 from app.logging import logger
 from app.schemas.contact import Platform
 from app.schemas.message import NormalizedMessage
-from app.repositories.contact_repository import contact_repo
+from app.repositories.conversation_participant_repository import (
+    invalidate_conversation_acl,
+)
 from app.repositories.conversation_repository import conversation_repo
-from app.repositories.message_repository import message_repo
+from app.repositories.ingest_repository import (
+    ContactKey,
+    InboundContact,
+    ingest_repo,
+)
+from app.repositories.message_repository import InboundMessageRow, message_repo
 from app.schemas.source import Source
-from app.services.conversation_service import conversation_service
 from app.services.meta_service import meta_service
-from app.ws.dispatcher import emit
-from app.ws.event_types import WSEventType
+from app.services.outbox_relay import outbox_relay
+from app.services.scheduler import scheduler
+from app.ws.dispatcher import conversation_updates
 from app.settings import settings
 
 # Opt-out keywords (case-insensitive)
 OPT_OUT_KEYWORDS = {"stop", "unsubscribe", "отписаться", "стоп"}
 
 
+def auto_greeting_job_key(conversation_id: str) -> str:
+    return f"auto_greeting:{conversation_id}"
+
+
+def is_opt_out_text(text: Optional[str]) -> bool:
+    return bool(text) and text.strip().lower() in OPT_OUT_KEYWORDS
+
+
 class MessageService:
     """Service for handling message operations."""
 
@@ -31,66 +49,183 @@ class MessageService:
         Process an inbound message from a customer.
         """
 
-        # 1. Upsert contact
-        contact = await contact_repo.upsert(
+        opt_out = is_opt_out_text(msg.text)
+
+        # 1. Upsert contact, get or create conversation, store message and
+        #    update the conversation timestamp in a single statement
+        result = await ingest_repo.ingest_inbound(
             db,
             platform=msg.platform,
             platform_user_id=msg.from_number,
             phone=msg.from_number,
             name=msg.name,
-        )
-
-        # 2. Get or create conversation
-        conversation = await conversation_service.start_for_contact(
-            contact_id=contact.id,
-        )
-
-        # 3. Check for opt-out
-        if msg.text and msg.text.strip().lower() in OPT_OUT_KEYWORDS:
-            await contact_repo.update_opt_out(db, contact.id, opt_out=True)
-            logger.info(f"Contact {contact.id} opted out")
-
-        # 4. Store inbound message (customer → agent)
-        message = await message_repo.create(
-            db,
-            conversation_id=conversation.id,
-            platform=msg.platform,
-            from_user_id=None,
             text=msg.text,
-            media_url=None,
             remote_message_id=msg.message_id,
-            source=Source.CUSTOMER,
+            opt_out=opt_out,
         )
 
-        inbound_count = await message_repo.count_by_conversation(
-            db,
-            conversation_id=conversation.id,
-        )
+        if opt_out:
+            logger.info(f"Contact {result.contact_id} opted out")
 
-        # 5. Update conversation timestamp
-        await conversation_repo.update_last_message_at(db, conversation.id)
+        if result.participants_added and not result.conversation_created:
+            # Admins were attached to an existing conversation
+            await invalidate_conversation_acl(result.conversation_id)
 
-        # 6. Emit WebSocket event
-        await emit(
-            WSEventType.NEW_MESSAGE,
+        if result.conversation_created and result.participants_added == 0:
+            logger.error(
+                f"No admin users found for conversation {result.conversation_id}"
+            )
+
+        if result.message_id is None:
+            logger.info("Duplicate inbound message ignored")
+            return {
+                "contact_id": result.contact_id,
+                "conversation_id": result.conversation_id,
+                "message_id": None,
+            }
+
+        # 2. The new_message event was committed to the outbox; wake the relay
+        outbox_relay.notify()
+        conversation_updates.update(
+            result.conversation_id,
             {
-                "conversation_id": conversation.id,
-                "message_id": message.id,
-                "from_user_id": None,
-                "platform": msg.platform.value,
-                "text": msg.text,
+                "last_message_id": result.message_id,
+                "last_message_at": datetime.now(timezone.utc).isoformat(),
             },
+            seq=result.change_seq,
         )
 
-        if inbound_count == 1 and not contact.optOut:
-            sleep(2)
-            await self._send_auto_greeting(conversation.id)
+        if (
+            result.is_first_message
+            and not result.contact_opt_out
+            and settings.auto_greeting_enabled
+        ):
+            self._schedule_auto_greeting(result.conversation_id)
 
         return {
-            "contact_id": contact.id,
-            "conversation_id": conversation.id,
-            "message_id": message.id,
+            "contact_id": result.contact_id,
+            "conversation_id": result.conversation_id,
+            "message_id": result.message_id,
+        }
+
+    async def handle_inbound_batch(self, msgs: List[NormalizedMessage]) -> List[dict]:
+        """
+        Process many inbound messages with set-based statements.
+
+        Messages are stored in input order, in one transaction; redelivered
+        ones are skipped.
+        """
+        if not msgs:
+            return []
+
+        # Steps 1-3 commit together: a failed batch leaves nothing behind,
+        # so its retry stores the messages and bumps the counters again
+        async with db.tx() as tx:
+            # 1. Upsert every contact (applying opt-outs) and get or create
+            #    one conversation per contact in one statement
+            contacts = await ingest_repo.resolve_inbound_contacts(
+                tx,
+                [
+                    InboundContact(
+                        platform=msg.platform,
+                        platform_user_id=msg.from_number,
+                        phone=msg.from_number,
+                        name=msg.name,
+                        opt_out=is_opt_out_text(msg.text),
+                    )
+                    for msg in msgs
+                ],
+            )
+            conversation_by_contact: Dict[ContactKey, str] = {
+                key: contact.conversation_id for key, contact in contacts.items()
+            }
+
+            # 2. Store inbound messages (customer → agent)
+            inserted = await message_repo.create_many_inbound(
+                tx,
+                [
+                    InboundMessageRow(
+                        conversation_id=conversation_by_contact[
+                            (msg.platform, msg.from_number)
+                        ],
+                        platform=msg.platform,
+                        text=msg.text,
+                        remote_message_id=msg.message_id,
+                    )
+                    for msg in msgs
+                ],
+            )
+
+            # 3. Update conversation timestamps and counters
+            inserted_counts = Counter(m.conversation_id for m in inserted)
+            message_counts = await conversation_repo.record_inbound_many(
+                tx, dict(inserted_counts)
+            )
+
+        # 4. Log opt-outs and participant changes
+        contact_by_conversation: Dict[str, ContactKey] = {}
+        for key, contact in contacts.items():
+            contact_by_conversation[contact.conversation_id] = key
+
+            if contact.participants_added and not contact.conversation_created:
+                await invalidate_conversation_acl(contact.conversation_id)
+            if contact.conversation_created and contact.participants_added == 0:
+                logger.error(
+                    f"No admin users found for conversation {contact.conversation_id}"
+                )
+
+        opted_out = {
+            contacts[(msg.platform, msg.from_number)].contact_id
+            for msg in msgs
+            if is_opt_out_text(msg.text)
+        }
+        for contact_id in opted_out:
+            logger.info(f"Contact {contact_id} opted out")
+
+        # 5. Wake the outbox relay for the new_message events
+        if inserted:
+            outbox_relay.notify()
+        msgs_by_remote_id = {
+            (
+                conversation_by_contact[(msg.platform, msg.from_number)],
+                msg.message_id,
+            ): msg
+            for msg in msgs
         }
+        results = []
+        for message in inserted:
+            msg = msgs_by_remote_id[
+                (message.conversation_id, message.remote_message_id)
+            ]
+            contact = contacts[(msg.platform, msg.from_number)]
+
+            conversation_updates.update(
+                message.conversation_id,
+                {
+                    "last_message_id": message.id,
+                    "last_message_at": datetime.now(timezone.utc).isoformat(),
+                },
+                seq=message.change_seq,
+            )
+            results.append(
+                {
+                    "contact_id": contact.contact_id,
+                    "conversation_id": message.conversation_id,
+                    "message_id": message.id,
+                }
+            )
+
+        # 6. Greet conversations whose first messages arrived in this batch
+        for conversation_id in inserted_counts:
+            contact = contacts[contact_by_conversation[conversation_id]]
+            if (
+                message_counts.get(conversation_id) == inserted_counts[conversation_id]
+                and not contact.contact_opt_out
+                and settings.auto_greeting_enabled
+            ):
+                self._schedule_auto_greeting(conversation_id)
+
+        return results
 
     async def send_outbound_message(
         self,
@@ -98,13 +233,17 @@ class MessageService:
         agent_user_id: Optional[str],
         text: Optional[str] = None,
         image_url: Optional[str] = None,
+        conversation: Optional[Conversation] = None,
     ) -> dict:
         """
         Send an outbound message to a customer.
+
+        Pass `conversation` (with contact) when the caller already loaded it.
         """
 
         # 1. Get conversation with contact
-        conversation = await conversation_repo.get_by_id(db, conversation_id)
+        if conversation is None:
+            conversation = await conversation_repo.get_by_id(db, conversation_id)
         if not conversation:
             raise ValueError(f"Conversation {conversation_id} not found")
 
@@ -115,6 +254,10 @@ class MessageService:
         if contact.optOut:
             raise ValueError("Cannot send message: contact has opted out")
 
+        # An agent answered first: the pending auto-greeting is obsolete
+        if agent_user_id is not None:
+            scheduler.cancel(auto_greeting_job_key(conversation_id))
+
         # 3. Send via Meta API
         remote_message_id = await meta_service.send_message(
             platform=platform,
@@ -133,9 +276,10 @@ class MessageService:
         else:
             source = Source.AGENT
 
-        # 4. Store outbound message (agent/system → customer)
+        # 4. Store outbound message (agent/system → customer) and update
+        #    conversation timestamp and counters in one statement
         try:
-            message = await message_repo.create(
+            message = await message_repo.create_outbound(
                 db,
                 conversation_id=conversation_id,
                 platform=platform,
@@ -149,23 +293,20 @@ class MessageService:
             logger.info("Duplicate inbound message ignored")
             raise ValueError("Failed to store outbound message")
 
-        # 5. Update conversation timestamp
-        await conversation_repo.update_last_message_at(db, conversation_id)
-
-        # 6. Emit WebSocket event
-        await emit(
-            WSEventType.NEW_MESSAGE,
+        # 5. The new_message event was committed to the outbox; wake the relay
+        outbox_relay.notify()
+        conversation_updates.update(
+            conversation_id,
             {
-                "conversation_id": conversation_id,
-                "message_id": message.id,
-                "from_user_id": agent_user_id,
-                "platform": platform.value,
-                "text": text,
+                "last_message_id": message.id,
+                "last_message_at": message.createdAt.isoformat(),
             },
+            seq=message.changeSeq,
         )
 
         return {
             "message_id": message.id,
+            "message": message,
             "remote_message_id": remote_message_id,
         }
 
@@ -198,6 +339,16 @@ class MessageService:
             logger.error(f"Failed to send order confirmation: {e}")
             return None
 
+    def _schedule_auto_greeting(self, conversation_id: str) -> None:
+        async def send() -> None:
+            await self._send_auto_greeting(conversation_id)
+
+        scheduler.schedule(
+            auto_greeting_job_key(conversation_id),
+            settings.auto_greeting_delay_seconds,
+            send,
+        )
+
     async def _send_auto_greeting(self, conversation_id: str) -> None:
         text = "Hi 👋 Thanks for contacting us! How can we help you?"
 
@@ -0,0 +1,120 @@
+"""
+Shared transport for the Meta Graph API.
+
+One pooled httpx client per worker, opened and closed by the FastAPI
+lifespan (and opened lazily elsewhere, e.g. scripts). Connections are kept
+alive between sends and, with HTTP/2, multiplex concurrent sends to
+graph.facebook.com over a few sockets instead of one handshake each.
+
+Every request names its endpoint, which picks its timeouts, and the
+platform it is sent for, which labels its latency.
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.metrics import metrics
+from app.schemas.platform import Platform
+from app.settings import settings
+
+META_API_VERSION = "v24.0"
+META_API_BASE = f"https://graph.facebook.com/{META_API_VERSION}"
+
+MESSAGES_ENDPOINT = "messages"
+
+
+def endpoint_timeouts() -> Dict[str, httpx.Timeout]:
+    """Timeouts per endpoint; connect and pool waits are the same for all."""
+    return {
+        MESSAGES_ENDPOINT: httpx.Timeout(
+            settings.meta_http_send_timeout_seconds,
+            connect=settings.meta_http_connect_timeout_seconds,
+            pool=settings.meta_http_pool_timeout_seconds,
+        ),
+    }
+
+
+class MetaGraphClient:
+    def __init__(self) -> None:
+        self._client: Optional[httpx.AsyncClient] = None
+        self._timeouts = endpoint_timeouts()
+        self._in_flight = 0
+
+        metrics.gauge(
+            "meta_api_in_flight_requests",
+            "Graph API requests waiting for or holding a pooled connection",
+            fn=lambda: self._in_flight,
+        )
+        metrics.gauge(
+            "meta_api_pool_utilization",
+            "In-flight Graph API requests per allowed connection",
+            fn=lambda: self._in_flight / max(settings.meta_http_max_connections, 1),
+        )
+
+    @property
+    def is_open(self) -> bool:
+        return self._client is not None
+
+    def open(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+        """Create the pooled client; `transport` replaces the network (tests)."""
+        if self._client is not None:
+            return
+
+        self._client = httpx.AsyncClient(
+            base_url=META_API_BASE,
+            transport=transport,
+            http2=settings.meta_http2_enabled,
+            limits=httpx.Limits(
+                max_connections=settings.meta_http_max_connections,
+                max_keepalive_connections=settings.meta_http_max_keepalive_connections,
+                keepalive_expiry=settings.meta_http_keepalive_expiry_seconds,
+            ),
+            timeout=self._timeouts[MESSAGES_ENDPOINT],
+        )
+
+    async def close(self) -> None:
+        if self._client is None:
+            return
+
+        client, self._client = self._client, None
+        await client.aclose()
+
+    async def post(
+        self,
+        platform: Platform,
+        endpoint: str,
+        path: str,
+        *,
+        headers: Dict[str, str],
+        json: Any,
+    ) -> httpx.Response:
+        """POST `json` to `path` (relative to META_API_BASE)."""
+        self.open()
+        labels = {"platform": platform.value}
+
+        self._in_flight += 1
+        started_at = time.perf_counter()
+        try:
+            return await self._client.post(
+                path, headers=headers, json=json, timeout=self._timeouts[endpoint]
+            )
+        except httpx.HTTPError:
+            metrics.counter(
+                "meta_api_errors_total",
+                "Graph API requests that failed without a response",
+                labels,
+            ).inc()
+            raise
+        finally:
+            self._in_flight -= 1
+            metrics.histogram(
+                "meta_api_request_seconds",
+                "Graph API request latency, including the wait for a connection",
+                labels,
+            ).observe(time.perf_counter() - started_at)
+
+
+# singleton instance
+meta_graph_client = MetaGraphClient()
@@ -5,7 +5,7 @@ Service for Meta (WhatsApp, Messenger, Instagram) API operations.
 import hmac
 import hashlib
 from app.logging import logger
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator
 
 import httpx
 
@@ -13,12 +13,10 @@ from app.schemas.source import Source
 from app.settings import settings
 from app.schemas.platform import Platform
 from app.schemas.message import NormalizedMessage
+from app.services.meta_graph_client import MESSAGES_ENDPOINT, meta_graph_client
 
-META_API_VERSION = "v24.0"
-META_API_BASE = f"https://graph.facebook.com/{META_API_VERSION}"
-WHATSAPP_API_BASE = META_API_BASE
-MESSENGER_API_BASE = f"{META_API_BASE}/me/messages"
-HTTP_TIMEOUT = 15.0
+# Paths relative to the Graph API base URL
+MESSENGER_MESSAGES_PATH = "/me/messages"
 
 
 class MetaService:
@@ -26,7 +24,6 @@ class MetaService:
 
     def __init__(self) -> None:
         self._init_config()
-        self._client = httpx.AsyncClient(timeout=HTTP_TIMEOUT)
 
     def _init_config(self) -> None:
         self.whatsapp_phone_id = settings.whatsapp_phone_number_id
@@ -37,6 +34,18 @@ class MetaService:
         )
         self.app_secret = settings.meta_app_secret
 
+        # Built once; tokens go in the Authorization header, not the URL
+        self._auth_headers = {
+            platform: {"Authorization": f"Bearer {token}"}
+            for platform, token in (
+                (Platform.WHATSAPP, self.whatsapp_token),
+                (Platform.MESSENGER, self.messenger_token),
+                (Platform.INSTAGRAM, self.instagram_token),
+            )
+            if token
+        }
+        self._whatsapp_messages_path = f"/{self.whatsapp_phone_id}/messages"
+
     @property
     def is_configured(self) -> bool:
         return settings.is_meta_configured
@@ -62,83 +71,89 @@ class MetaService:
     # Webhook normalization
     # -------------------------
 
-    def normalize_webhook(self, payload: Dict[str, Any]) -> Optional[NormalizedMessage]:
+    def normalize_webhook(self, payload: Dict[str, Any]) -> Iterator[NormalizedMessage]:
+        """
+        Yield every message of a webhook delivery.
+
+        Meta batches several entries, changes and messages into one
+        delivery under load, so nothing past the first item may be dropped.
+        """
         try:
             obj_type = payload.get("object")
 
             if obj_type == "whatsapp_business_account":
-                return self._normalize_whatsapp(payload)
+                yield from self._normalize_whatsapp(payload)
 
-            if obj_type in ("page", "instagram"):
-                return self._normalize_messenger_instagram(payload, obj_type)
-
-            return None
+            elif obj_type in ("page", "instagram"):
+                yield from self._normalize_messenger_instagram(payload, obj_type)
 
         except Exception:
             logger.exception("Error normalizing webhook")
-            return None
 
     @staticmethod
-    def _normalize_whatsapp(payload: Dict[str, Any]) -> Optional[NormalizedMessage]:
-        entry = (payload.get("entry") or [{}])[0]
-        change = (entry.get("changes") or [{}])[0]
-        value = change.get("value", {})
-
-        messages = value.get("messages")
-        contacts = value.get("contacts")
-
-        if not messages or not contacts:
-            return None
-
-        msg = messages[0]
-        contact = contacts[0]
-
-        msg_from = msg.get("from")
-        msg_id = msg.get("id")
-
-        if not msg_from or not msg_id:
-            return None
-
-        return NormalizedMessage(
-            platform=Platform.WHATSAPP,
-            from_number=msg_from,
-            wa_id=contact.get("wa_id", msg_from),
-            name=contact.get("profile", {}).get("name"),
-            message_id=msg_id,
-            timestamp=int(msg.get("timestamp", 0)),
-            type=msg.get("type", "text"),
-            text=msg.get("text", {}).get("body"),
-            phone_number_id=value.get("metadata", {}).get("phone_number_id"),
-            source=Source.CUSTOMER,
-        )
+    def _normalize_whatsapp(payload: Dict[str, Any]) -> Iterator[NormalizedMessage]:
+        for entry in payload.get("entry") or []:
+            for change in entry.get("changes") or []:
+                value = change.get("value", {})
+
+                contacts = value.get("contacts") or []
+                contacts_by_wa_id = {
+                    contact.get("wa_id"): contact for contact in contacts
+                }
+                phone_number_id = value.get("metadata", {}).get("phone_number_id") or ""
+
+                for msg in value.get("messages") or []:
+                    msg_from = msg.get("from")
+                    msg_id = msg.get("id")
+
+                    if not msg_from or not msg_id:
+                        continue
+
+                    contact = contacts_by_wa_id.get(msg_from) or (
+                        contacts[0] if contacts else {}
+                    )
+
+                    yield NormalizedMessage(
+                        platform=Platform.WHATSAPP,
+                        from_number=msg_from,
+                        wa_id=contact.get("wa_id", msg_from),
+                        name=contact.get("profile", {}).get("name"),
+                        message_id=msg_id,
+                        timestamp=int(msg.get("timestamp", 0)),
+                        type=msg.get("type", "text"),
+                        text=msg.get("text", {}).get("body"),
+                        phone_number_id=phone_number_id,
+                        source=Source.CUSTOMER,
+                    )
 
     def _normalize_messenger_instagram(
         self, payload: Dict[str, Any], obj_type: str
-    ) -> Optional[NormalizedMessage]:
+    ) -> Iterator[NormalizedMessage]:
         platform = Platform.INSTAGRAM if obj_type == "instagram" else Platform.MESSENGER
 
-        entry = (payload.get("entry") or [{}])[0]
-        event = (entry.get("messaging") or [{}])[0]
-        sender = event.get("sender", {})
-        message = event.get("message", {})
-
-        sender_id = sender.get("id")
-        message_id = message.get("mid")
-
-        if not sender_id or not message_id:
-            return None
-
-        return NormalizedMessage(
-            platform=platform,
-            from_number=sender_id,
-            wa_id=sender_id,  # reuse for non-WA platforms
-            name=None,
-            message_id=message_id,
-            timestamp=0,
-            type="text",
-            text=message.get("text"),
-            phone_number_id="",
-        )
+        for entry in payload.get("entry") or []:
+            for event in entry.get("messaging") or []:
+                sender = event.get("sender", {})
+                message = event.get("message", {})
+
+                sender_id = sender.get("id")
+                message_id = message.get("mid")
+
+                if not sender_id or not message_id:
+                    continue
+
+                yield NormalizedMessage(
+                    platform=platform,
+                    from_number=sender_id,
+                    wa_id=sender_id,  # reuse for non-WA platforms
+                    name=None,
+                    message_id=message_id,
+                    timestamp=0,
+                    type="text",
+                    text=message.get("text"),
+                    phone_number_id="",
+                    source=Source.CUSTOMER,
+                )
 
     # -------------------------
     # Sending messages
@@ -175,12 +190,6 @@ class MetaService:
         if not self.whatsapp_phone_id or not self.whatsapp_token:
             return None
 
-        url = f"{WHATSAPP_API_BASE}/{self.whatsapp_phone_id}/messages"
-        headers = {
-            "Authorization": f"Bearer {self.whatsapp_token}",
-            "Content-Type": "application/json",
-        }
-
         payload = (
             {
                 "messaging_product": "whatsapp",
@@ -197,7 +206,13 @@ class MetaService:
             }
         )
 
-        r = await self._client.post(url, headers=headers, json=payload)
+        r = await meta_graph_client.post(
+            Platform.WHATSAPP,
+            MESSAGES_ENDPOINT,
+            self._whatsapp_messages_path,
+            headers=self._auth_headers[Platform.WHATSAPP],
+            json=payload,
+        )
         if r.status_code not in (200, 201):
             logger.error("WhatsApp API error: %s", r.text)
             return None
@@ -210,8 +225,6 @@ class MetaService:
         if not self.messenger_token:
             return None
 
-        url = f"{MESSENGER_API_BASE}?access_token={self.messenger_token}"
-
         payload = (
             {
                 "recipient": {"id": to},
@@ -229,7 +242,13 @@ class MetaService:
             }
         )
 
-        r = await self._client.post(url, json=payload)
+        r = await meta_graph_client.post(
+            Platform.MESSENGER,
+            MESSAGES_ENDPOINT,
+            MESSENGER_MESSAGES_PATH,
+            headers=self._auth_headers[Platform.MESSENGER],
+            json=payload,
+        )
         if r.status_code not in (200, 201):
             logger.error("Messenger API error: %s", r.text)
             return None
@@ -240,10 +259,15 @@ class MetaService:
         if not self.instagram_token or not text:
             return None
 
-        url = f"{MESSENGER_API_BASE}?access_token={self.instagram_token}"
         payload = {"recipient": {"id": to}, "message": {"text": text}}
 
-        r = await self._client.post(url, json=payload)
+        r = await meta_graph_client.post(
+            Platform.INSTAGRAM,
+            MESSAGES_ENDPOINT,
+            MESSENGER_MESSAGES_PATH,
+            headers=self._auth_headers[Platform.INSTAGRAM],
+            json=payload,
+        )
         if r.status_code not in (200, 201):
             logger.error("Instagram API error: %s", r.text)
             return None
@@ -0,0 +1,168 @@
+"""
+Relay of the transactional event outbox.
+
+Writes that report an event (new messages, paid orders) insert it into
+`event_outbox` in the same transaction, then call `notify()` and return. The
+relay leases batches of events, hands them to the domain event bus
+subscribers (the WS publisher among them) and deletes them.
+
+Delivery is at-least-once: an event whose delete failed, or whose worker
+died mid-batch, is claimed again once its lease expires. Every event carries
+its outbox id as `event_id` so consumers can drop repeats; the relay also
+skips ids it published recently itself.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Optional, Set
+
+from app.db import db
+from app.events.domain import DomainEvent, event_bus
+from app.logging import logger
+from app.metrics import metrics
+from app.repositories.outbox_repository import ClaimedOutboxEvent, outbox_repo
+from app.settings import settings
+
+LEASE_SECONDS = 30
+STATS_INTERVAL_SECONDS = 5.0
+# Ids of events this relay published, to skip a repeat of its own
+RECENT_IDS = 1000
+
+
+class OutboxRelay:
+    def __init__(self) -> None:
+        self._poller: Optional[asyncio.Task] = None
+        # Created per run: the relay may be started on different event loops
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running = False
+        self._stats_refreshed_at = 0.0
+        self._recent: Deque[str] = deque()
+        self._recent_ids: Set[str] = set()
+
+        self._published = metrics.counter(
+            "outbox_published_total", "Outbox events handed to subscribers"
+        )
+        self._duplicates = metrics.counter(
+            "outbox_duplicates_total", "Redelivered outbox events skipped"
+        )
+        self._delay = metrics.histogram(
+            "outbox_delay_seconds", "Time from commit to publish of an event"
+        )
+        self._depth = metrics.gauge("outbox_depth", "Events waiting in the outbox")
+        self._lag = metrics.gauge(
+            "outbox_lag_seconds", "Age of the oldest event in the outbox"
+        )
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def notify(self) -> None:
+        """New events were committed; poll now instead of at the next tick."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        if self._running:
+            return
+
+        self._running = True
+        self._wakeup = asyncio.Event()
+        self._poller = asyncio.create_task(self._poll_loop())
+        logger.info("Outbox relay started")
+
+    async def stop(self) -> None:
+        """Stop polling after a last pass over what is already committed."""
+        if not self._running:
+            return
+
+        self._running = False
+        self._wakeup.set()
+
+        if self._poller is not None:
+            await self._poller
+            self._poller = None
+        self._wakeup = None
+
+        try:
+            await self.relay_batch()
+        except Exception:
+            logger.exception("Final outbox relay pass failed")
+        logger.info("Outbox relay stopped")
+
+    async def relay_batch(self) -> int:
+        """Publish one batch of events; returns how many were claimed."""
+        events = await outbox_repo.claim_batch(
+            db,
+            limit=settings.outbox_batch_size,
+            lease_seconds=LEASE_SECONDS,
+        )
+        if not events:
+            return 0
+
+        for event in events:
+            await self._publish(event)
+
+        # Until the delete lands the events stay leased; if it fails they
+        # are redelivered after the lease and skipped as recent here
+        await outbox_repo.delete(db, [event.id for event in events])
+        return len(events)
+
+    async def _poll_loop(self) -> None:
+        wakeup = self._wakeup
+        while self._running:
+            claimed = 0
+
+            try:
+                claimed = await self.relay_batch()
+                await self._refresh_stats()
+            except Exception:
+                logger.exception("Failed to relay outbox events")
+
+            if claimed < settings.outbox_batch_size:
+                try:
+                    await asyncio.wait_for(
+                        wakeup.wait(),
+                        timeout=settings.outbox_poll_interval_seconds,
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                wakeup.clear()
+
+    async def _publish(self, event: ClaimedOutboxEvent) -> None:
+        if event.id in self._recent_ids:
+            self._duplicates.inc()
+            return
+
+        await event_bus.deliver(
+            DomainEvent(
+                event_type=event.event_type,
+                payload=event.payload,
+                event_id=event.id,
+                seq=event.seq,
+            )
+        )
+        self._published.inc()
+        self._delay.observe(event.age_seconds)
+        self._remember(event.id)
+
+    def _remember(self, event_id: str) -> None:
+        self._recent.append(event_id)
+        self._recent_ids.add(event_id)
+        if len(self._recent) > RECENT_IDS:
+            self._recent_ids.discard(self._recent.popleft())
+
+    async def _refresh_stats(self) -> None:
+        now = time.monotonic()
+        if now - self._stats_refreshed_at < STATS_INTERVAL_SECONDS:
+            return
+
+        self._stats_refreshed_at = now
+        stats = await outbox_repo.stats(db)
+        self._depth.set(stats.depth)
+        self._lag.set(stats.oldest_age_seconds)
+
+
+# singleton instance
+outbox_relay = OutboxRelay()
@@ -0,0 +1,104 @@
+"""
+Bounded worker pool for argon2 password hashing.
+
+argon2 is CPU- and memory-hard on purpose: one hash or verify takes tens of
+milliseconds. Running it inline in an async handler stalls every request and
+WebSocket on the worker. Calls are moved to a small thread pool (argon2-cffi
+releases the GIL while hashing). Once too many calls are already waiting,
+new ones are rejected so a login storm cannot queue unbounded work.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from app.metrics import metrics
+from app.settings import settings
+
+T = TypeVar("T")
+
+
+class PasswordHasherBusyError(Exception):
+    """Too many password hashes are already in flight."""
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = max(workers, 1)
+        self.max_pending = max(max_pending, 0)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight = 0
+
+        self._rejected = metrics.counter(
+            "password_hash_rejected_total",
+            "Password hash/verify calls rejected because the pool was saturated",
+        )
+        metrics.gauge(
+            "password_hash_in_flight",
+            "Password hash/verify calls running or waiting for a worker",
+            fn=lambda: self._in_flight,
+        )
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_pending
+
+    async def run(self, operation: str, fn: Callable[..., T], *args) -> T:
+        """
+        Run `fn(*args)` on the pool.
+
+        Raises:
+            PasswordHasherBusyError: when `capacity` calls are already in flight
+        """
+        if self._in_flight >= self.capacity:
+            self._rejected.inc()
+            raise PasswordHasherBusyError("Password hashing is saturated")
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password-hasher"
+            )
+
+        # Timestamps are taken in the worker thread and observed back on the
+        # loop, so the metrics registry is only touched from one thread.
+        timings = [time.perf_counter(), 0.0, 0.0]
+
+        def timed() -> T:
+            timings[1] = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                timings[2] = time.perf_counter()
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, timed)
+        finally:
+            self._in_flight -= 1
+            submitted_at, started_at, finished_at = timings
+            if finished_at:
+                labels = {"operation": operation}
+                metrics.histogram(
+                    "password_hash_wait_seconds",
+                    "Time a password hash/verify call waited for a worker",
+                    labels,
+                ).observe(started_at - submitted_at)
+                metrics.histogram(
+                    "password_hash_seconds",
+                    "Time spent in argon2 per call, excluding queueing",
+                    labels,
+                ).observe(finished_at - started_at)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# singleton instance
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+)
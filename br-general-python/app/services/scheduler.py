@@ -0,0 +1,146 @@
+"""
+In-process delayed job scheduler.
+
+Jobs are registered under a unique key and fire on the event loop's timer
+queue after a delay, so callers (webhooks, REST handlers) never wait for
+them. Registering a job under an existing key replaces it, and a pending
+job can be cancelled by key (e.g. when an agent replies before the
+auto-greeting fires).
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from app.logging import logger
+from app.metrics import metrics
+
+JobCallback = Callable[[], Awaitable[None]]
+
+SHUTDOWN_TIMEOUT_SECONDS = 5.0
+
+
+@dataclass
+class DelayedJob:
+    key: str
+    run_at: float  # event loop time (monotonic seconds)
+    callback: JobCallback
+    handle: asyncio.TimerHandle
+
+
+class DelayedJobScheduler:
+    def __init__(self) -> None:
+        self._jobs: Dict[str, DelayedJob] = {}
+        self._running: Set[asyncio.Task] = set()
+
+        self._executed = metrics.counter(
+            "scheduler_jobs_executed_total", "Delayed jobs that finished"
+        )
+        self._failed = metrics.counter(
+            "scheduler_jobs_failed_total", "Delayed jobs that raised"
+        )
+        self._cancelled = metrics.counter(
+            "scheduler_jobs_cancelled_total", "Delayed jobs cancelled before firing"
+        )
+        self._lateness = metrics.histogram(
+            "scheduler_job_lateness_seconds",
+            "Delay between a job's due time and its start",
+        )
+        metrics.gauge(
+            "scheduler_jobs_pending",
+            "Delayed jobs waiting for their due time",
+            fn=lambda: self.pending_count,
+        )
+        metrics.gauge(
+            "scheduler_jobs_overdue",
+            "Delayed jobs past their due time that have not started",
+            fn=lambda: self.overdue_count,
+        )
+        metrics.gauge(
+            "scheduler_jobs_running",
+            "Delayed jobs currently executing",
+            fn=lambda: len(self._running),
+        )
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._jobs)
+
+    @property
+    def overdue_count(self) -> int:
+        if not self._jobs:
+            return 0
+        now = asyncio.get_running_loop().time()
+        return sum(1 for job in self._jobs.values() if job.run_at < now)
+
+    def is_scheduled(self, key: str) -> bool:
+        return key in self._jobs
+
+    def schedule(self, key: str, delay: float, callback: JobCallback) -> None:
+        """
+        Run `callback` after `delay` seconds.
+
+        An already scheduled job with the same key is replaced.
+        """
+        self.cancel(key)
+
+        loop = asyncio.get_running_loop()
+        delay = max(delay, 0.0)
+        handle = loop.call_later(delay, self._fire, key)
+        self._jobs[key] = DelayedJob(
+            key=key,
+            run_at=loop.time() + delay,
+            callback=callback,
+            handle=handle,
+        )
+
+    def cancel(self, key: str) -> bool:
+        """Cancel a pending job. Returns False if nothing was scheduled."""
+        job = self._jobs.pop(key, None)
+        if job is None:
+            return False
+
+        job.handle.cancel()
+        self._cancelled.inc()
+        return True
+
+    def _fire(self, key: str) -> None:
+        job = self._jobs.pop(key, None)
+        if job is None:
+            return
+
+        loop = asyncio.get_running_loop()
+        self._lateness.observe(max(loop.time() - job.run_at, 0.0))
+
+        task = loop.create_task(self._run(job))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, job: DelayedJob) -> None:
+        try:
+            await job.callback()
+            self._executed.inc()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._failed.inc()
+            logger.exception("Delayed job %s failed", job.key)
+
+    async def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Drop pending jobs and wait for running ones to finish."""
+        for key in list(self._jobs):
+            self.cancel(key)
+
+        if not self._running:
+            return
+
+        _, still_running = await asyncio.wait(
+            set(self._running),
+            timeout=SHUTDOWN_TIMEOUT_SECONDS if timeout is None else timeout,
+        )
+        for task in still_running:
+            task.cancel()
+
+
+# singleton instance
+scheduler = DelayedJobScheduler()
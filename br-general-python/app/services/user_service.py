@@ -13,7 +13,7 @@ class UserService:
         """
         Create a new user with hashed password.
         """
-        hashed_password = auth_service.hash_password(user.password)
+        hashed_password = await auth_service.hash_password(user.password)
 
         db_user = await self.user_repo.create(
             email=user.email,
@@ -47,12 +47,68 @@ class Settings(BaseSettings):
     jwt_algorithm: str = Field(..., alias="JWT_ALGORITHM")
     access_token_expire_minutes: int = Field(..., alias="ACCESS_TOKEN_EXPIRE_MINUTES")
     refresh_token_expire_minutes: int = Field(..., alias="REFRESH_TOKEN_EXPIRE_MINUTES")
+    # Build the current user from signed access token claims, skipping the DB
+    auth_trust_token_claims: bool = Field(
+        default=False, alias="AUTH_TRUST_TOKEN_CLAIMS"
+    )
+
+    # Verified JWTs cached until their expiry (per worker)
+    token_cache_max_size: int = Field(default=10_000, alias="TOKEN_CACHE_MAX_SIZE")
+
+    # argon2 worker pool; calls beyond workers + max pending get a 429
+    password_hash_workers: int = Field(default=2, alias="PASSWORD_HASH_WORKERS")
+    password_hash_max_pending: int = Field(
+        default=32, alias="PASSWORD_HASH_MAX_PENDING"
+    )
+
+    # Authenticated user cache (per worker)
+    user_cache_ttl_seconds: float = Field(default=60.0, alias="USER_CACHE_TTL_SECONDS")
+    user_cache_max_size: int = Field(default=10_000, alias="USER_CACHE_MAX_SIZE")
+
+    # Conversation access cache (per worker); denials expire sooner
+    acl_cache_ttl_seconds: float = Field(default=60.0, alias="ACL_CACHE_TTL_SECONDS")
+    acl_cache_negative_ttl_seconds: float = Field(
+        default=5.0, alias="ACL_CACHE_NEGATIVE_TTL_SECONDS"
+    )
+    acl_cache_max_size: int = Field(default=50_000, alias="ACL_CACHE_MAX_SIZE")
 
     # Meta API (WhatsApp, Messenger, Instagram)
     meta_verify_token: Optional[str] = Field(..., alias="META_VERIFY_TOKEN")
     meta_app_id: Optional[str] = Field(..., alias="META_APP_ID")
     meta_app_secret: Optional[str] = Field(..., alias="META_APP_SECRET")
 
+    # Meta webhook ingestion: process inline or ack first and drain a queue
+    meta_webhook_mode: Literal["inline", "queued"] = Field(
+        default="inline", alias="META_WEBHOOK_MODE"
+    )
+    inbound_queue_workers: int = Field(default=4, alias="INBOUND_QUEUE_WORKERS")
+    inbound_queue_batch_size: int = Field(default=50, alias="INBOUND_QUEUE_BATCH_SIZE")
+    inbound_queue_poll_interval_seconds: float = Field(
+        default=1.0, alias="INBOUND_QUEUE_POLL_INTERVAL_SECONDS"
+    )
+
+    # Graph API transport: connection pool, HTTP/2 and timeouts; sends get
+    # META_HTTP_SEND_TIMEOUT_SECONDS to read the response
+    meta_http2_enabled: bool = Field(default=True, alias="META_HTTP2_ENABLED")
+    meta_http_max_connections: int = Field(
+        default=20, alias="META_HTTP_MAX_CONNECTIONS"
+    )
+    meta_http_max_keepalive_connections: int = Field(
+        default=10, alias="META_HTTP_MAX_KEEPALIVE_CONNECTIONS"
+    )
+    meta_http_keepalive_expiry_seconds: float = Field(
+        default=30.0, alias="META_HTTP_KEEPALIVE_EXPIRY_SECONDS"
+    )
+    meta_http_connect_timeout_seconds: float = Field(
+        default=5.0, alias="META_HTTP_CONNECT_TIMEOUT_SECONDS"
+    )
+    meta_http_pool_timeout_seconds: float = Field(
+        default=5.0, alias="META_HTTP_POOL_TIMEOUT_SECONDS"
+    )
+    meta_http_send_timeout_seconds: float = Field(
+        default=15.0, alias="META_HTTP_SEND_TIMEOUT_SECONDS"
+    )
+
     # WhatsApp Business API
     whatsapp_phone_number_id: Optional[str] = Field(
         ..., alias="WHATSAPP_PHONE_NUMBER_ID"
@@ -82,6 +138,59 @@ class Settings(BaseSettings):
 
     ws_idle_timeout_seconds: int = Field(..., alias="WS_IDLE_TIMEOUT_SECONDS")
 
+    # Background sweep: heartbeat pings, idle/token expiry closes
+    ws_sweep_interval_seconds: float = Field(
+        default=30.0, alias="WS_SWEEP_INTERVAL_SECONDS"
+    )
+    # Opening one more evicts the user's oldest connection
+    ws_max_connections_per_user: int = Field(
+        default=10, alias="WS_MAX_CONNECTIONS_PER_USER"
+    )
+
+    # Outbound frames queued per connection, what to do when the queue is
+    # full, and the time a socket gets to accept one frame before eviction
+    ws_send_queue_size: int = Field(default=256, alias="WS_SEND_QUEUE_SIZE")
+    ws_send_queue_overflow: Literal["drop_oldest", "coalesce", "disconnect"] = Field(
+        default="coalesce", alias="WS_SEND_QUEUE_OVERFLOW"
+    )
+    ws_send_timeout_seconds: float = Field(default=5.0, alias="WS_SEND_TIMEOUT_SECONDS")
+
+    # Resumable sessions: how long a dropped session is kept and how many
+    # recent events per scope are kept to replay on resume
+    ws_session_ttl_seconds: float = Field(default=60.0, alias="WS_SESSION_TTL_SECONDS")
+    ws_replay_buffer_size: int = Field(default=100, alias="WS_REPLAY_BUFFER_SIZE")
+
+    # conversation_updated changes within this window go out as one event
+    ws_conversation_update_window_seconds: float = Field(
+        default=0.1, alias="WS_CONVERSATION_UPDATE_WINDOW_SECONDS"
+    )
+
+    # Domain event bus: queued events and consumer tasks; on shutdown the
+    # queue gets this long to drain
+    event_bus_max_size: int = Field(default=1000, alias="EVENT_BUS_MAX_SIZE")
+    event_bus_workers: int = Field(default=2, alias="EVENT_BUS_WORKERS")
+    event_bus_drain_timeout_seconds: float = Field(
+        default=5.0, alias="EVENT_BUS_DRAIN_TIMEOUT_SECONDS"
+    )
+
+    # Transactional outbox relay: events per claimed batch and how often to
+    # poll when not woken up by a local commit
+    outbox_batch_size: int = Field(default=100, alias="OUTBOX_BATCH_SIZE")
+    outbox_poll_interval_seconds: float = Field(
+        default=1.0, alias="OUTBOX_POLL_INTERVAL_SECONDS"
+    )
+
+    # Cross-worker WS fan-out: "memory" for one worker, "postgres" for N
+    ws_backplane: Literal["memory", "postgres"] = Field(
+        default="memory", alias="WS_BACKPLANE"
+    )
+
+    # Auto-greeting sent to a contact after their first message
+    auto_greeting_enabled: bool = Field(default=True, alias="AUTO_GREETING_ENABLED")
+    auto_greeting_delay_seconds: float = Field(
+        default=2.0, alias="AUTO_GREETING_DELAY_SECONDS"
+    )
+
     model_config = SettingsConfigDict(
         env_file=str(ENV_PATH),
         env_file_encoding="utf-8",
@@ -0,0 +1,44 @@
+import re
+from pathlib import Path
+
+MIGRATIONS = Path(__file__).resolve().parents[2] / "prisma" / "migrations"
+
+
+def _migrations() -> str:
+    return "\n".join(
+        path.read_text() for path in sorted(MIGRATIONS.glob("*/migration.sql"))
+    )
+
+
+def test_participant_changes_touch_the_conversation():
+    """
+    Sync filters by the current participants; adding or removing one must
+    give the conversation a new change_seq or a new assignee never gets it.
+    """
+    sql = _migrations()
+
+    for event, table in (("INSERT", "NEW"), ("DELETE", "OLD")):
+        trigger = re.search(
+            rf'AFTER {event} ON "conversation_participants"\s+'
+            rf"REFERENCING {table} TABLE AS changed\s+"
+            r'FOR EACH STATEMENT EXECUTE FUNCTION "(\w+)"',
+            sql,
+        )
+        assert trigger, event
+
+    function = re.search(
+        r'CREATE FUNCTION "touch_participant_conversations"\(\).*?\$\$ LANGUAGE',
+        sql,
+        re.S,
+    ).group(0)
+    assert 'UPDATE "conversations"' in function
+    # Conversation updates draw a new change_seq
+    assert re.search(r'BEFORE UPDATE ON "conversations"', sql)
+
+
+def test_change_seq_columns_are_added_without_a_table_rewrite():
+    sql = _migrations()
+
+    for statement in re.findall(r'ADD COLUMN\s+"change_seq"[^;]*;', sql):
+        assert "DEFAULT" not in statement
+        assert "NOT NULL" not in statement
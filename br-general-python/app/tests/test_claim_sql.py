@@ -0,0 +1,26 @@
+from app.db.sql import NOW_UTC
+from app.repositories import inbound_event_repository, outbox_repository
+
+
+def test_queues_share_the_lease_claim():
+    for module, table in (
+        (inbound_event_repository, "inbound_events"),
+        (outbox_repository, "event_outbox"),
+    ):
+        sql = module.CLAIM_SQL
+        assert f'UPDATE "{table}"' in sql
+        assert f'SELECT "id" FROM "{table}"' in sql
+        assert "make_interval(secs => $2)" in sql
+        assert f'"locked_until" < {NOW_UTC}' in sql
+        assert "LIMIT $1" in sql
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert '"attempts" = "attempts" + 1' in sql
+        assert 'AS "age_seconds"' in sql
+
+
+def test_inbound_claim_skips_processed_events():
+    sql = inbound_event_repository.CLAIM_SQL
+
+    assert '"processed_at" IS NULL\n  AND ("locked_until" IS NULL' in sql
+    assert 'ORDER BY "received_at"' in sql
+    assert '"processed_at"' not in outbox_repository.CLAIM_SQL
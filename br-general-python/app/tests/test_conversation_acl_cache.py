@@ -0,0 +1,111 @@
+import pytest
+
+from app.api import access_control
+from app.api.access_control import (
+    can_user_access_conversation,
+    filter_accessible_conversations,
+)
+from app.repositories import (
+    conversation_participant_repository as participant_repository,
+)
+from app.repositories.conversation_participant_repository import (
+    conversation_acl_cache,
+    invalidate_conversation_acl,
+)
+from app.ws.backplane import InMemoryBackplane, InMemoryHub
+from app.ws.dispatcher import deliver_from_backplane
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    conversation_acl_cache.clear()
+    participants = {("u1", "c1")}
+    calls = []
+
+    async def exists(*, user_id, conversation_id):
+        calls.append((user_id, conversation_id))
+        return (user_id, conversation_id) in participants
+
+    monkeypatch.setattr(
+        access_control.conversation_participant_repository, "exists", exists
+    )
+    yield calls, participants
+    conversation_acl_cache.clear()
+
+
+async def test_grants_and_denials_are_cached(lookups):
+    calls, _ = lookups
+
+    for _ in range(3):
+        assert await can_user_access_conversation(user_id="u1", conversation_id="c1")
+        assert not await can_user_access_conversation(
+            user_id="u2", conversation_id="c1"
+        )
+
+    assert calls == [("u1", "c1"), ("u2", "c1")]
+
+
+async def test_invalidation_picks_up_new_participants(lookups):
+    calls, participants = lookups
+
+    assert not await can_user_access_conversation(user_id="u2", conversation_id="c1")
+    participants.add(("u2", "c1"))
+    await invalidate_conversation_acl("c1", ["u2"])
+
+    assert await can_user_access_conversation(user_id="u2", conversation_id="c1")
+    assert len(calls) == 2
+
+
+async def test_filter_accessible_conversations_queries_only_cache_misses(
+    monkeypatch,
+):
+    conversation_acl_cache.clear()
+    conversation_acl_cache.set(("u1", "cached-yes"), True)
+    conversation_acl_cache.set(("u1", "cached-no"), False)
+    calls = []
+
+    async def accessible(*, user_id, conversation_ids):
+        calls.append(sorted(conversation_ids))
+        return {"new-yes"}
+
+    monkeypatch.setattr(
+        access_control.conversation_participant_repository,
+        "accessible_conversation_ids",
+        accessible,
+    )
+
+    allowed = await filter_accessible_conversations(
+        user_id="u1",
+        conversation_ids=["cached-yes", "cached-no", "new-yes", "new-no"],
+    )
+
+    assert allowed == {"cached-yes", "new-yes"}
+    assert calls == [["new-no", "new-yes"]]
+    assert conversation_acl_cache.get(("u1", "new-no")) is False
+    conversation_acl_cache.clear()
+
+
+async def test_invalidation_reaches_the_other_workers(monkeypatch):
+    hub = InMemoryHub()
+    this_worker = InMemoryBackplane(hub)
+    other_worker = InMemoryBackplane(hub)
+    monkeypatch.setattr(participant_repository, "backplane", this_worker)
+    await other_worker.start(deliver_from_backplane)
+
+    conversation_acl_cache.clear()
+    conversation_acl_cache.set(("u1", "c1"), True)
+    conversation_acl_cache.set(("u2", "c1"), True)
+    conversation_acl_cache.set(("u1", "c2"), True)
+
+    # Only the other worker's delivery can drop the entries re-added here
+    drop = participant_repository.drop_cached_acl
+    monkeypatch.setattr(participant_repository, "drop_cached_acl", lambda *_: None)
+    await invalidate_conversation_acl("c1")
+    monkeypatch.setattr(participant_repository, "drop_cached_acl", drop)
+
+    assert conversation_acl_cache.get(("u1", "c1")) is None
+    assert conversation_acl_cache.get(("u2", "c1")) is None
+    assert conversation_acl_cache.get(("u1", "c2")) is True
+    conversation_acl_cache.clear()
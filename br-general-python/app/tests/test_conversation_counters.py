@@ -0,0 +1,84 @@
+import re
+
+import pytest
+
+from app.repositories.ingest_repository import INGEST_INBOUND_SQL
+from app.repositories.message_repository import message_repo
+from app.schemas.platform import Platform
+from app.schemas.source import Source
+from app.services.conversation_service import conversation_service
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeConversationTable:
+    def __init__(self):
+        self.data = None
+
+    async def create(self, *, data):
+        self.data = data
+        return data
+
+
+class FakeDb:
+    def __init__(self):
+        self.conversation = FakeConversationTable()
+        self.query = None
+
+    async def query_first(self, query, *_, **__):
+        self.query = query
+        return object()
+
+
+def _touched(sql: str) -> str:
+    """Body of the "touched" CTE: the conversation counter update."""
+    return re.search(r"touched AS \((.*?)\n\s*\)", sql, re.S).group(1)
+
+
+@pytest.mark.parametrize(
+    ("source", "inbound"),
+    [(Source.CUSTOMER, True), (Source.AGENT, False), (Source.SYSTEM, False)],
+)
+async def test_initial_message_sets_every_counter(source, inbound):
+    db = FakeDb()
+
+    await conversation_service.create_with_initial_message(
+        db, contact_id="ct1", text="hello", source=source
+    )
+
+    data = db.conversation.data
+    created_at = data["messages"]["create"]["createdAt"]
+    assert data["messageCount"] == 1
+    assert data["inboundCount"] == (1 if inbound else 0)
+    assert data["lastMessageAt"] == created_at
+    # Same values the counters backfill computes from the messages
+    assert data["lastInboundAt"] == (created_at if inbound else None)
+    assert data["lastOutboundAt"] == (None if inbound else created_at)
+
+
+async def test_outbound_cte_bumps_outbound_counters():
+    db = FakeDb()
+
+    await message_repo.create_outbound(
+        db,
+        conversation_id="c1",
+        platform=Platform.WHATSAPP,
+        from_user_id="u1",
+        text="hi",
+        source=Source.AGENT,
+    )
+
+    touched = _touched(db.query)
+    assert '"last_outbound_at" = message."created_at"' in touched
+    assert '"message_count" = c."message_count" + 1' in touched
+    assert '"last_message_at" = message."created_at"' in touched
+    assert "inbound" not in touched
+
+
+async def test_inbound_cte_bumps_inbound_counters():
+    touched = _touched(INGEST_INBOUND_SQL)
+
+    assert "\"last_inbound_at\" = timezone('utc', now())" in touched
+    assert '"message_count" = "conversations"."message_count" + 1' in touched
+    assert '"inbound_count" = "conversations"."inbound_count" + 1' in touched
+    assert "outbound" not in touched
@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.auth import oauth2_scheme
+from app.api.users import get_current_user
+from app.main import app
+from app.pagination import decode_cursor
+from app.repositories.conversation_repository import conversation_repo
+from app.schemas.user import Role
+
+client = TestClient(app)
+
+BASE = datetime(2026, 2, 7, 12, 0, 0)
+
+
+class FakeUser:
+    id = "user-id"
+    role = Role.AGENT
+
+
+def _row(i: int, **overrides) -> dict:
+    row = {
+        "id": f"c{i}",
+        "contact_id": f"ct{i}",
+        "status": "OPEN",
+        "last_message_at": BASE - timedelta(minutes=i),
+        "created_at": BASE - timedelta(days=1),
+        "message_count": 3,
+        "inbound_count": 2,
+        "last_inbound_at": BASE - timedelta(minutes=i),
+        "last_outbound_at": None,
+        "contact_platform": "WHATSAPP",
+        "contact_platform_user_id": f"puid{i}",
+        "contact_phone": None,
+        "contact_name": f"Contact {i}",
+        "contact_opt_out": False,
+        "contact_created_at": BASE - timedelta(days=2),
+        "contact_updated_at": BASE - timedelta(days=2),
+        "last_message_id": f"m{i}",
+        "last_message_source": "CUSTOMER",
+        "last_message_text": "hello",
+        "last_message_has_media": False,
+        "last_message_created_at": BASE - timedelta(minutes=i),
+        "unread_count": 1,
+        "assignees": [{"id": "user-id", "name": "Agent"}],
+    }
+    row.update(overrides)
+    return row
+
+
+class FakeDb:
+    def __init__(self, rows):
+        self.rows = rows
+        self.query = None
+        self.params = None
+
+    async def query_raw(self, query, *params, **_):
+        self.query = query
+        self.params = params
+        return self.rows
+
+
+# -------------------------------------------------------------------
+# Repository
+# -------------------------------------------------------------------
+
+
+@pytest.mark.asyncio
+async def test_last_message_ties_are_broken_by_id():
+    db = FakeDb([])
+
+    await conversation_repo.list_inbox(db, user_id="user-id")
+
+    # Messages of a batch can share created_at; the preview must be stable
+    assert 'ORDER BY m."created_at" DESC, m."id" DESC' in db.query
+
+
+@pytest.mark.asyncio
+async def test_rows_map_to_inbox_items():
+    db = FakeDb(
+        [
+            _row(1),
+            _row(
+                2,
+                unread_count=None,
+                assignees='[{"id": "a1", "name": "Other"}]',
+                last_message_id=None,
+            ),
+        ]
+    )
+
+    items = await conversation_repo.list_inbox(db, user_id="user-id", limit=2)
+
+    assert db.params[0] == "user-id"
+    assert db.params[-1] == 2
+    assert items[0].unread_count == 1
+    assert items[0].last_message.id == "m1"
+    assert items[0].assignees[0].name == "Agent"
+    # Unread without a lateral match counts as zero
+    assert items[1].unread_count == 0
+    # json_agg may come back as text
+    assert items[1].assignees[0].id == "a1"
+    assert items[1].last_message is None
+
+
+# -------------------------------------------------------------------
+# API
+# -------------------------------------------------------------------
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    app.dependency_overrides[oauth2_scheme] = lambda: "fake-token"
+    app.dependency_overrides[get_current_user] = lambda: FakeUser()
+    calls = []
+    list_inbox = conversation_repo.list_inbox
+
+    async def fake_get_accessible_conversation(**kwargs):
+        calls.append(("access", kwargs))
+        return object()
+
+    async def fake_list_inbox(_db, *, user_id, status, limit, after):
+        calls.append(("inbox", {"user_id": user_id, "limit": limit, "after": after}))
+        rows = [_row(i) for i in range(1, 3)]
+        return await list_inbox(FakeDb(rows), user_id=user_id, limit=limit)
+
+    async def fake_mark_read(**kwargs):
+        calls.append(("read", kwargs))
+
+    monkeypatch.setattr(
+        "app.api.conversations.get_accessible_conversation",
+        fake_get_accessible_conversation,
+    )
+    monkeypatch.setattr(
+        "app.api.conversations.conversation_repo.list_inbox", fake_list_inbox
+    )
+    monkeypatch.setattr(
+        "app.api.conversations.conversation_participant_repository.mark_read",
+        fake_mark_read,
+    )
+    yield calls
+    app.dependency_overrides.clear()
+
+
+def test_full_inbox_page_returns_next_cursor(calls):
+    res = client.get("/br-general/conversations/inbox", params={"limit": 2})
+
+    assert res.status_code == 200
+    body = res.json()
+    assert [item["id"] for item in body["items"]] == ["c1", "c2"]
+    assert body["items"][0]["unreadCount"] == 1
+    assert body["items"][0]["lastMessage"]["id"] == "m1"
+    assert decode_cursor(body["nextCursor"]) == (BASE - timedelta(minutes=2), "c2")
+    assert calls == [("inbox", {"user_id": "user-id", "limit": 2, "after": None})]
+
+
+def test_short_inbox_page_has_no_next_cursor(calls):
+    res = client.get("/br-general/conversations/inbox", params={"limit": 5})
+
+    assert res.status_code == 200
+    assert res.json()["nextCursor"] is None
+
+
+def test_inbox_rejects_invalid_cursor(calls):
+    res = client.get("/br-general/conversations/inbox", params={"cursor": "nope"})
+
+    assert res.status_code == 400
+    assert calls == []
+
+
+def test_mark_read_checks_access_and_records_read(calls):
+    res = client.post("/br-general/conversations/conv-id/read")
+
+    assert res.status_code == 204
+    assert calls == [
+        ("access", {"user_id": "user-id", "conversation_id": "conv-id"}),
+        ("read", {"conversation_id": "conv-id", "user_id": "user-id"}),
+    ]
@@ -65,20 +65,12 @@ async def test_agent_can_create_suggestions(monkeypatch, auth_override_factory):
         fake_generate,
     )
 
-    async def fake_get_by_id(*_):
+    async def fake_get_accessible_conversation(**_):
         return FakeConversation()
 
     monkeypatch.setattr(
-        "app.api.conversations.conversation_repo.get_by_id",
-        fake_get_by_id,
-    )
-
-    async def fake_can_access(*_, **__):
-        return True
-
-    monkeypatch.setattr(
-        "app.api.conversations.can_user_access_conversation",
-        fake_can_access,
+        "app.api.conversations.get_accessible_conversation",
+        fake_get_accessible_conversation,
     )
 
     async def fake_get_messages(*_, **__):
@@ -123,20 +115,12 @@ async def test_non_agent_forbidden(monkeypatch, auth_override_factory):
         fake_generate,
     )
 
-    async def fake_get_by_id(*_):
+    async def fake_get_accessible_conversation(**_):
         return FakeConversation()
 
     monkeypatch.setattr(
-        "app.api.conversations.conversation_repo.get_by_id",
-        fake_get_by_id,
-    )
-
-    async def fake_can_access(*_, **__):
-        return True
-
-    monkeypatch.setattr(
-        "app.api.conversations.can_user_access_conversation",
-        fake_can_access,
+        "app.api.conversations.get_accessible_conversation",
+        fake_get_accessible_conversation,
     )
 
     response = client.post(
@@ -160,24 +144,12 @@ async def test_ai_failure_maps_to_503(monkeypatch, auth_override_factory):
         fake_generate,
     )
 
-    async def fake_get_by_id(*_):
+    async def fake_get_accessible_conversation(**_):
         return FakeConversation()
 
     monkeypatch.setattr(
-        "app.api.conversations.conversation_repo.get_by_id",
-        fake_get_by_id,
-    )
-    monkeypatch.setattr(
-        "app.api.conversations.can_user_access_conversation",
-        lambda *_, **__: True,
-    )
-
-    async def fake_can_access(*_, **__):
-        return True
-
-    monkeypatch.setattr(
-        "app.api.conversations.can_user_access_conversation",
-        fake_can_access,
+        "app.api.conversations.get_accessible_conversation",
+        fake_get_accessible_conversation,
     )
 
     async def fake_get_messages(*_, **__):
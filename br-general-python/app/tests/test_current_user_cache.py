@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.api import auth
+from app.api.auth import get_current_user
+from app.repositories.user_repository import user_cache, user_repo
+from app.schemas.user import Role
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeUserTable:
+    def __init__(self):
+        self.row = SimpleNamespace(
+            id="u1", email="a@example.com", name="Ann", role=Role.AGENT.value
+        )
+
+    async def update(self, *, where, data):
+        self.row = SimpleNamespace(**{**vars(self.row), **data})
+        return self.row
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    user_cache.clear()
+    db = SimpleNamespace(user=FakeUserTable())
+    calls = []
+
+    async def get_by_id(_db, user_id):
+        calls.append(user_id)
+        return db.user.row
+
+    monkeypatch.setattr(auth, "db", db)
+    monkeypatch.setattr(auth.user_repo, "get_by_id", get_by_id)
+    monkeypatch.setattr(
+        auth.auth_service,
+        "require_access_token",
+        lambda token: {
+            "sub": "u1",
+            "email": "claimed@example.com",
+            "name": "Claimed",
+            "role": Role.ADMIN.value,
+        },
+    )
+    monkeypatch.setattr(auth.settings, "auth_trust_token_claims", False)
+    yield db, calls
+    user_cache.clear()
+
+
+async def test_user_is_looked_up_once_then_served_from_cache(lookups):
+    _, calls = lookups
+
+    first = await get_current_user("token")
+    second = await get_current_user("token")
+
+    assert calls == ["u1"]
+    assert first == second
+    assert first.email == "a@example.com"
+
+
+async def test_trusted_claims_skip_the_lookup(lookups, monkeypatch):
+    _, calls = lookups
+    monkeypatch.setattr(auth.settings, "auth_trust_token_claims", True)
+
+    user = await get_current_user("token")
+
+    assert calls == []
+    assert user.email == "claimed@example.com"
+    assert user.role == Role.ADMIN
+
+
+async def test_update_drops_the_cached_user(lookups):
+    db, calls = lookups
+
+    await get_current_user("token")
+    await user_repo.update(db, "u1", {"name": "Anna"})
+    user = await get_current_user("token")
+
+    assert calls == ["u1", "u1"]
+    assert user.name == "Anna"
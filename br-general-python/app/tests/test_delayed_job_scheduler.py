@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from app.services.scheduler import DelayedJobScheduler
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_job_runs_after_delay_without_blocking_caller():
+    scheduler = DelayedJobScheduler()
+    calls = []
+
+    async def job():
+        calls.append("ran")
+
+    scheduler.schedule("greeting:c1", 0.05, job)
+
+    # schedule() returns immediately, the job is still pending
+    assert calls == []
+    assert scheduler.pending_count == 1
+
+    await asyncio.sleep(0.1)
+
+    assert calls == ["ran"]
+    assert scheduler.pending_count == 0
+
+
+async def test_cancel_prevents_job_from_running():
+    scheduler = DelayedJobScheduler()
+    calls = []
+
+    async def job():
+        calls.append("ran")
+
+    scheduler.schedule("greeting:c1", 0.05, job)
+
+    assert scheduler.cancel("greeting:c1") is True
+    assert scheduler.cancel("greeting:c1") is False
+
+    await asyncio.sleep(0.1)
+
+    assert calls == []
+
+
+async def test_rescheduling_same_key_replaces_job():
+    scheduler = DelayedJobScheduler()
+    calls = []
+
+    async def first():
+        calls.append("first")
+
+    async def second():
+        calls.append("second")
+
+    scheduler.schedule("greeting:c1", 0.05, first)
+    scheduler.schedule("greeting:c1", 0.05, second)
+
+    assert scheduler.pending_count == 1
+
+    await asyncio.sleep(0.1)
+
+    assert calls == ["second"]
+
+
+async def test_failing_job_does_not_break_scheduler():
+    scheduler = DelayedJobScheduler()
+    calls = []
+
+    async def broken():
+        raise RuntimeError("boom")
+
+    async def ok():
+        calls.append("ok")
+
+    scheduler.schedule("a", 0.01, broken)
+    scheduler.schedule("b", 0.02, ok)
+
+    await asyncio.sleep(0.05)
+
+    assert calls == ["ok"]
+
+
+async def test_shutdown_drops_pending_jobs():
+    scheduler = DelayedJobScheduler()
+    calls = []
+
+    async def job():
+        calls.append("ran")
+
+    scheduler.schedule("greeting:c1", 0.05, job)
+    await scheduler.shutdown()
+    await asyncio.sleep(0.1)
+
+    assert calls == []
+    assert scheduler.pending_count == 0
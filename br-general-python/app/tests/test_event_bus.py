@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.events.domain import DomainEvent, EventBus
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_failing_subscriber_does_not_affect_others():
+    bus = EventBus(max_size=10, workers=2)
+    delivered = []
+
+    async def broken(event):
+        raise RuntimeError("boom")
+
+    async def record(event):
+        delivered.append(event.payload["n"])
+
+    bus.subscribe(broken)
+    bus.subscribe(record)
+    bus.start()
+
+    for n in range(5):
+        await bus.publish(DomainEvent("check_event", {"n": n}))
+    await bus.stop(timeout=1)
+
+    assert sorted(delivered) == [0, 1, 2, 3, 4]
+    assert not bus.running
+
+
+async def test_publish_does_not_wait_for_subscribers():
+    bus = EventBus(max_size=10, workers=1)
+    release = asyncio.Event()
+    delivered = []
+
+    async def slow(event):
+        await release.wait()
+        delivered.append(event.event_type)
+
+    bus.subscribe(slow)
+    bus.start()
+
+    await asyncio.wait_for(bus.publish(DomainEvent("a", {})), timeout=0.1)
+    await asyncio.wait_for(bus.publish(DomainEvent("b", {})), timeout=0.1)
+    assert delivered == []
+
+    release.set()
+    await bus.stop(timeout=1)
+    assert delivered == ["a", "b"]
+
+
+async def test_full_queue_applies_backpressure():
+    bus = EventBus(max_size=1, workers=1)
+    release = asyncio.Event()
+
+    async def slow(event):
+        await release.wait()
+
+    bus.subscribe(slow)
+    bus.start()
+
+    await bus.publish(DomainEvent("a", {}))  # taken by the consumer
+    await asyncio.sleep(0)
+    await bus.publish(DomainEvent("b", {}))  # fills the queue
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(bus.publish(DomainEvent("c", {})), timeout=0.05)
+
+    release.set()
+    await bus.stop(timeout=1)
@@ -0,0 +1,182 @@
+import asyncio
+
+import pytest
+
+from app.repositories.inbound_event_repository import (
+    ClaimedInboundEvent,
+    inbound_event_repo,
+)
+from app.schemas.message import NormalizedMessage
+from app.schemas.platform import Platform
+from app.schemas.source import Source
+from app.services import inbound_queue as inbound_queue_module
+from app.services.inbound_queue import InboundQueue, partition_for
+
+pytestmark = pytest.mark.asyncio
+
+
+def _msg(sender: str, message_id: str) -> NormalizedMessage:
+    return NormalizedMessage(
+        platform=Platform.WHATSAPP,
+        from_number=sender,
+        wa_id=sender,
+        message_id=message_id,
+        timestamp=0,
+        type="text",
+        text=message_id,
+        phone_number_id="",
+        source=Source.CUSTOMER,
+    )
+
+
+class FakeRepo:
+    def __init__(self, events):
+        self.events = list(events)
+        self.processed = []
+        self.released = []
+        self.renewed = []
+
+    async def claim_batch(self, _db, *, limit, lease_seconds):
+        batch, self.events = self.events[:limit], self.events[limit:]
+        return batch
+
+    async def mark_processed(self, _db, event_id, error=None):
+        self.processed.append((event_id, error))
+
+    async def release(self, _db, event_id, *, error, retry_in_seconds):
+        self.released.append(event_id)
+
+    async def renew(self, _db, event_ids, *, lease_seconds):
+        self.renewed.append(sorted(event_ids))
+
+    async def stats(self, _db):
+        return type("S", (), {"depth": len(self.events), "oldest_age_seconds": 0})()
+
+
+async def test_partition_is_stable_per_contact():
+    a1 = _msg("contact-a", "m1")
+    a2 = _msg("contact-a", "m2")
+
+    assert partition_for(a1, 8) == partition_for(a2, 8)
+
+
+async def test_queue_keeps_order_per_contact_and_marks_events(monkeypatch):
+    messages = [
+        _msg("contact-a", "a1"),
+        _msg("contact-b", "b1"),
+        _msg("contact-a", "a2"),
+        _msg("contact-b", "b2"),
+        _msg("contact-a", "a3"),
+    ]
+    events = [
+        ClaimedInboundEvent(id=f"e{i}", payload={"i": i}, attempts=1, age_seconds=0)
+        for i in range(len(messages))
+    ]
+    repo = FakeRepo(events)
+    handled = []
+
+    def fake_normalize(payload):
+        yield messages[payload["i"]]
+
+    async def fake_handle_inbound_batch(msgs):
+        # contact-a is slower; must not reorder its own messages
+        for msg in msgs:
+            await asyncio.sleep(0.01 if msg.from_number == "contact-a" else 0)
+            handled.append(msg.message_id)
+
+    monkeypatch.setattr(inbound_queue_module, "inbound_event_repo", repo)
+    monkeypatch.setattr(
+        inbound_queue_module.meta_service, "normalize_webhook", fake_normalize
+    )
+    monkeypatch.setattr(
+        inbound_queue_module.message_service,
+        "handle_inbound_batch",
+        fake_handle_inbound_batch,
+    )
+    monkeypatch.setattr(inbound_queue_module.settings, "inbound_queue_workers", 4)
+
+    queue = InboundQueue()
+    queue.start()
+    for _ in range(50):
+        if len(repo.processed) == len(events):
+            break
+        await asyncio.sleep(0.01)
+    await queue.stop()
+
+    assert [m for m in handled if m.startswith("a")] == ["a1", "a2", "a3"]
+    assert [m for m in handled if m.startswith("b")] == ["b1", "b2"]
+    assert sorted(event_id for event_id, _ in repo.processed) == [
+        "e0",
+        "e1",
+        "e2",
+        "e3",
+        "e4",
+    ]
+    assert repo.released == []
+
+
+async def test_leases_are_renewed_until_events_are_settled(monkeypatch):
+    events = [
+        ClaimedInboundEvent(id=f"e{i}", payload={"i": i}, attempts=1, age_seconds=0)
+        for i in range(2)
+    ]
+    repo = FakeRepo(events)
+    release = asyncio.Event()
+
+    def fake_normalize(payload):
+        yield _msg("contact-a", f"m{payload['i']}")
+
+    async def slow_handle_inbound_batch(msgs):
+        await release.wait()
+
+    monkeypatch.setattr(inbound_queue_module, "inbound_event_repo", repo)
+    monkeypatch.setattr(inbound_queue_module, "LEASE_RENEW_INTERVAL_SECONDS", 0.01)
+    monkeypatch.setattr(
+        inbound_queue_module.meta_service, "normalize_webhook", fake_normalize
+    )
+    monkeypatch.setattr(
+        inbound_queue_module.message_service,
+        "handle_inbound_batch",
+        slow_handle_inbound_batch,
+    )
+
+    queue = InboundQueue()
+    queue.start()
+    for _ in range(50):
+        if repo.renewed:
+            break
+        await asyncio.sleep(0.01)
+    release.set()
+    for _ in range(50):
+        if len(repo.processed) == len(events):
+            break
+        await asyncio.sleep(0.01)
+    renewals = len(repo.renewed)
+    await asyncio.sleep(0.05)
+    await queue.stop()
+
+    assert repo.renewed[0] == ["e0", "e1"]
+    # Settled events are no longer renewed
+    assert len(repo.renewed) == renewals
+
+
+class RecordingDB:
+    def __init__(self):
+        self.statements = []
+
+    async def execute_raw(self, query, *params):
+        self.statements.append((" ".join(query.split()), params))
+        return 1
+
+
+async def test_processed_events_are_deleted_and_dead_ones_kept():
+    db = RecordingDB()
+
+    await inbound_event_repo.mark_processed(db, "ok")
+    await inbound_event_repo.mark_processed(db, "dead", error="boom")
+
+    (deleted, deleted_params), (kept, kept_params) = db.statements
+    assert deleted.startswith('DELETE FROM "inbound_events"')
+    assert deleted_params == ("ok",)
+    assert kept.startswith('UPDATE "inbound_events"')
+    assert kept_params == ("dead", "boom")
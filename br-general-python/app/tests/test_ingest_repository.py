@@ -0,0 +1,59 @@
+import pytest
+
+from app.repositories.ingest_repository import InboundContact, ingest_repo
+from app.schemas.platform import Platform
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeDB:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    async def query_raw(self, query, *params):
+        self.calls.append((query, params))
+        return self.rows
+
+
+async def test_resolve_inbound_contacts_is_one_statement_per_batch():
+    db = FakeDB(
+        [
+            {
+                "contact_id": "contact-a",
+                "platform": "WHATSAPP",
+                "platform_user_id": "a",
+                "contact_opt_out": True,
+                "conversation_id": "conv-a",
+                "conversation_created": False,
+                "participants_added": 0,
+            }
+        ]
+    )
+
+    resolved = await ingest_repo.resolve_inbound_contacts(
+        db,
+        [
+            InboundContact(platform=Platform.WHATSAPP, platform_user_id="a", name="A"),
+            InboundContact(
+                platform=Platform.WHATSAPP, platform_user_id="a", opt_out=True
+            ),
+        ],
+    )
+
+    assert len(db.calls) == 1
+    _, params = db.calls[0]
+    # Duplicates are merged: one row, name kept, opt-out applied
+    assert len(params) == 7
+    assert params[1:6] == ("WHATSAPP", "a", None, "A", True)
+
+    contact = resolved[(Platform.WHATSAPP, "a")]
+    assert contact.conversation_id == "conv-a"
+    assert contact.contact_opt_out is True
+
+
+async def test_resolve_inbound_contacts_skips_empty_batches():
+    db = FakeDB([])
+
+    assert await ingest_repo.resolve_inbound_contacts(db, []) == {}
+    assert db.calls == []
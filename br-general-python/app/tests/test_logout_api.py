@@ -0,0 +1,48 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.auth_service import InvalidTokenError, auth_service
+
+client = TestClient(app)
+
+LOGOUT = "/br-general/auth/logout"
+
+REVOKED = auth_service.create_access_token("user-revoked")
+auth_service.revoke_token(auth_service.require_access_token(REVOKED))
+
+
+def test_logout_revokes_the_access_token():
+    token = auth_service.create_access_token("user-logout")
+
+    res = client.post(LOGOUT, headers={"Authorization": f"Bearer {token}"})
+
+    assert res.status_code == 200
+    with pytest.raises(InvalidTokenError):
+        auth_service.require_access_token(token)
+
+
+@pytest.mark.parametrize(
+    "token",
+    # Malformed, wrong type, already revoked
+    [
+        "not-a-jwt",
+        auth_service.create_refresh_token("user-logout"),
+        REVOKED,
+    ],
+)
+def test_logout_accepts_tokens_it_cannot_revoke(token):
+    res = client.post(LOGOUT, headers={"Authorization": f"Bearer {token}"})
+
+    assert res.status_code == 200
+
+
+def test_logout_does_not_hide_unexpected_errors(monkeypatch):
+    def broken(_payload):
+        raise RuntimeError("revocation store down")
+
+    monkeypatch.setattr(auth_service, "revoke_token", broken)
+    token = auth_service.create_access_token("user-logout")
+
+    with pytest.raises(RuntimeError):
+        client.post(LOGOUT, headers={"Authorization": f"Bearer {token}"})
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.repositories.message_repository import InboundMessageRow, message_repo
+from app.schemas.platform import Platform
+
+pytestmark = pytest.mark.asyncio
+
+BASE = datetime(2026, 2, 7, 12, 0, 0)
+
+
+class FakeDb:
+    def __init__(self):
+        self.query = None
+        self.params = None
+
+    async def query_raw(self, query, *params, **_):
+        self.query = query
+        self.params = params
+        # Out of order, as RETURNING does not promise input order
+        return [
+            {
+                "id": f"m{i}",
+                "conversation_id": "c1",
+                "remote_message_id": f"r{i}",
+                "created_at": BASE + timedelta(milliseconds=i),
+                "change_seq": 10 + i,
+            }
+            for i in (1, 0)
+        ]
+
+
+async def test_inbound_created_at_comes_from_the_database_clock():
+    db = FakeDb()
+    rows = [
+        InboundMessageRow(
+            conversation_id="c1",
+            platform=Platform.WHATSAPP,
+            text=f"hello {i}",
+            remote_message_id=f"r{i}",
+        )
+        for i in range(2)
+    ]
+
+    inserted = await message_repo.create_many_inbound(db, rows)
+
+    assert "timezone('utc', now()) + $7::int * interval '1 millisecond'" in db.query
+    # Only the row position is sent; no timestamp from the app server
+    assert db.params[6] == 0
+    assert db.params[13] == 1
+    assert not any(isinstance(param, datetime) for param in db.params)
+    assert [m.remote_message_id for m in inserted] == ["r0", "r1"]
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.auth import oauth2_scheme
+from app.api.users import get_current_user
+from app.main import app
+from app.pagination import decode_cursor, encode_cursor
+from app.schemas.user import Role
+
+client = TestClient(app)
+
+BASE = datetime(2026, 2, 7, 12, 0, 0)
+
+
+class FakeUser:
+    id = "user-id"
+    role = Role.AGENT
+
+
+class FakeMessage:
+    def __init__(self, i: int):
+        self.id = f"m{i}"
+        self.conversationId = "conv-id"
+        self.fromUserId = None
+        self.platform = "WHATSAPP"
+        self.text = f"hello {i}"
+        self.mediaUrl = None
+        self.remoteMessageId = None
+        self.createdAt = BASE + timedelta(seconds=i)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    app.dependency_overrides[oauth2_scheme] = lambda: "fake-token"
+    app.dependency_overrides[get_current_user] = lambda: FakeUser()
+    calls = []
+
+    async def fake_get_accessible_conversation(**_):
+        return object()
+
+    async def fake_get_by_conversation(_db, *, conversation_id, limit, before, after):
+        calls.append({"limit": limit, "before": before, "after": after})
+        return [FakeMessage(i) for i in (5, 4)]
+
+    monkeypatch.setattr(
+        "app.api.conversations.get_accessible_conversation",
+        fake_get_accessible_conversation,
+    )
+    monkeypatch.setattr(
+        "app.api.conversations.message_repo.get_by_conversation",
+        fake_get_by_conversation,
+    )
+    yield calls
+    app.dependency_overrides.clear()
+
+
+def test_full_page_returns_both_cursors(calls):
+    before = encode_cursor(BASE + timedelta(seconds=6), "m6")
+
+    response = client.get(
+        "/br-general/conversations/conv-id/messages",
+        params={"limit": 2, "before": before},
+    )
+
+    assert response.status_code == 200
+    assert [m["id"] for m in response.json()] == ["m5", "m4"]
+    assert calls[0]["before"] == (BASE + timedelta(seconds=6), "m6")
+    assert decode_cursor(response.headers["X-Next-Cursor"]) == (
+        BASE + timedelta(seconds=4),
+        "m4",
+    )
+    assert decode_cursor(response.headers["X-Prev-Cursor"]) == (
+        BASE + timedelta(seconds=5),
+        "m5",
+    )
+
+
+def test_short_page_has_no_older_cursor(calls):
+    response = client.get(
+        "/br-general/conversations/conv-id/messages", params={"limit": 10}
+    )
+
+    assert response.status_code == 200
+    assert "X-Next-Cursor" not in response.headers
+    assert "X-Prev-Cursor" in response.headers
+
+
+def test_before_and_after_together_are_rejected(calls):
+    cursor = encode_cursor(BASE, "m0")
+
+    response = client.get(
+        "/br-general/conversations/conv-id/messages",
+        params={"before": cursor, "after": cursor},
+    )
+
+    assert response.status_code == 400
+    assert calls == []
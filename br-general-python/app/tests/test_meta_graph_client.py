@@ -0,0 +1,79 @@
+import httpx
+import pytest
+
+from app.metrics import metrics
+from app.schemas.platform import Platform
+from app.services.meta_graph_client import (
+    META_API_BASE,
+    MESSAGES_ENDPOINT,
+    MetaGraphClient,
+)
+from app.settings import settings
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_post_uses_the_pooled_client_and_endpoint_timeouts():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"message_id": "mid-1"})
+
+    client = MetaGraphClient()
+    client.open(transport=httpx.MockTransport(handler))
+    try:
+        for _ in range(2):
+            r = await client.post(
+                Platform.MESSENGER,
+                MESSAGES_ENDPOINT,
+                "/me/messages",
+                headers={"Authorization": "Bearer token"},
+                json={"recipient": {"id": "u1"}},
+            )
+            assert r.json() == {"message_id": "mid-1"}
+    finally:
+        await client.close()
+
+    assert not client.is_open
+    assert [str(request.url) for request in requests] == [
+        f"{META_API_BASE}/me/messages"
+    ] * 2
+    assert "access_token" not in str(requests[0].url)
+    assert requests[0].headers["Authorization"] == "Bearer token"
+
+    timeout = requests[0].extensions["timeout"]
+    assert timeout["connect"] == settings.meta_http_connect_timeout_seconds
+    assert timeout["read"] == settings.meta_http_send_timeout_seconds
+
+    latency = metrics.histogram(
+        "meta_api_request_seconds", labels={"platform": Platform.MESSENGER.value}
+    )
+    assert latency.sample()["count"] >= 2
+
+
+async def test_post_counts_transport_errors_per_platform():
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectTimeout("timed out", request=request)
+
+    errors = metrics.counter(
+        "meta_api_errors_total", labels={"platform": Platform.WHATSAPP.value}
+    )
+    before = errors.value
+
+    client = MetaGraphClient()
+    client.open(transport=httpx.MockTransport(handler))
+    try:
+        with pytest.raises(httpx.TimeoutException):
+            await client.post(
+                Platform.WHATSAPP,
+                MESSAGES_ENDPOINT,
+                "/123/messages",
+                headers={},
+                json={},
+            )
+    finally:
+        await client.close()
+
+    assert errors.value == before + 1
+    assert metrics.gauge("meta_api_in_flight_requests").value == 0
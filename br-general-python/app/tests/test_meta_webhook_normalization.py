@@ -0,0 +1,88 @@
+from app.schemas.platform import Platform
+from app.services.meta_service import meta_service
+
+
+def _wa_message(msg_id: str, sender: str, text: str) -> dict:
+    return {
+        "from": sender,
+        "id": msg_id,
+        "timestamp": "1700000000",
+        "type": "text",
+        "text": {"body": text},
+    }
+
+
+def test_whatsapp_batch_yields_every_message():
+    payload = {
+        "object": "whatsapp_business_account",
+        "entry": [
+            {
+                "changes": [
+                    {
+                        "value": {
+                            "metadata": {"phone_number_id": "pn-1"},
+                            "contacts": [
+                                {"wa_id": "111", "profile": {"name": "Ann"}},
+                                {"wa_id": "222", "profile": {"name": "Bob"}},
+                            ],
+                            "messages": [
+                                _wa_message("m1", "111", "hi"),
+                                _wa_message("m2", "222", "hello"),
+                            ],
+                        }
+                    },
+                    {
+                        "value": {
+                            "contacts": [{"wa_id": "111"}],
+                            "messages": [_wa_message("m3", "111", "again")],
+                        }
+                    },
+                ]
+            },
+            {
+                "changes": [
+                    {
+                        "value": {
+                            "contacts": [{"wa_id": "333"}],
+                            "messages": [_wa_message("m4", "333", "hey")],
+                        }
+                    }
+                ]
+            },
+        ],
+    }
+
+    messages = list(meta_service.normalize_webhook(payload))
+
+    assert [m.message_id for m in messages] == ["m1", "m2", "m3", "m4"]
+    assert [m.name for m in messages[:2]] == ["Ann", "Bob"]
+    assert messages[0].phone_number_id == "pn-1"
+
+
+def test_messenger_batch_yields_every_message():
+    payload = {
+        "object": "page",
+        "entry": [
+            {
+                "messaging": [
+                    {"sender": {"id": "u1"}, "message": {"mid": "a", "text": "1"}},
+                    {"sender": {"id": "u2"}, "message": {"mid": "b", "text": "2"}},
+                ]
+            },
+            {"messaging": [{"sender": {"id": "u1"}, "message": {"mid": "c"}}]},
+        ],
+    }
+
+    messages = list(meta_service.normalize_webhook(payload))
+
+    assert [m.message_id for m in messages] == ["a", "b", "c"]
+    assert all(m.platform == Platform.MESSENGER for m in messages)
+
+
+def test_status_only_payload_yields_nothing():
+    payload = {
+        "object": "whatsapp_business_account",
+        "entry": [{"changes": [{"value": {"statuses": [{"id": "s1"}]}}]}],
+    }
+
+    assert list(meta_service.normalize_webhook(payload)) == []
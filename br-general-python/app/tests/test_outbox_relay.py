@@ -0,0 +1,107 @@
+import pytest
+
+from app.events.domain import EventBus
+from app.repositories.outbox_repository import ClaimedOutboxEvent
+from app.services import outbox_relay as outbox_relay_module
+from app.services.outbox_relay import OutboxRelay
+
+pytestmark = pytest.mark.asyncio
+
+
+def _event(event_id: str, seq: int) -> ClaimedOutboxEvent:
+    return ClaimedOutboxEvent(
+        id=event_id,
+        event_type="new_message",
+        payload={"conversation_id": "c1", "message_id": f"m-{event_id}"},
+        seq=seq,
+        attempts=1,
+        age_seconds=0.01,
+    )
+
+
+class FakeRepo:
+    def __init__(self, events):
+        self.events = list(events)
+        self.deleted = []
+        self.fail_delete = False
+
+    async def claim_batch(self, _db, *, limit, lease_seconds):
+        batch, self.events = self.events[:limit], self.events[limit:]
+        return batch
+
+    async def delete(self, _db, event_ids):
+        if self.fail_delete:
+            raise RuntimeError("db down")
+        self.deleted.extend(event_ids)
+
+    async def stats(self, _db):
+        return type("S", (), {"depth": len(self.events), "oldest_age_seconds": 0})()
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    bus = EventBus(max_size=10, workers=1)
+    monkeypatch.setattr(outbox_relay_module, "event_bus", bus)
+    return bus
+
+
+async def test_relay_publishes_in_order_with_dedup_ids_and_deletes(monkeypatch, bus):
+    repo = FakeRepo([_event("e1", 1), _event("e2", 2)])
+    monkeypatch.setattr(outbox_relay_module, "outbox_repo", repo)
+
+    received = []
+
+    async def handler(event):
+        received.append((event.event_id, event.seq, event.payload["message_id"]))
+
+    bus.subscribe(handler)
+
+    assert await OutboxRelay().relay_batch() == 2
+
+    assert received == [("e1", 1, "m-e1"), ("e2", 2, "m-e2")]
+    assert repo.deleted == ["e1", "e2"]
+
+
+async def test_relay_skips_events_it_already_published(monkeypatch, bus):
+    repo = FakeRepo([_event("e1", 1)])
+    repo.fail_delete = True
+    monkeypatch.setattr(outbox_relay_module, "outbox_repo", repo)
+
+    received = []
+
+    async def handler(event):
+        received.append(event.event_id)
+
+    bus.subscribe(handler)
+    relay = OutboxRelay()
+
+    with pytest.raises(RuntimeError):
+        await relay.relay_batch()
+
+    # The lease expired and the event was claimed again
+    repo.events = [_event("e1", 1)]
+    repo.fail_delete = False
+    await relay.relay_batch()
+
+    assert received == ["e1"]
+    assert repo.deleted == ["e1"]
+
+
+async def test_relay_waits_for_subscribers_even_when_bus_is_running(monkeypatch, bus):
+    repo = FakeRepo([_event("e1", 1)])
+    monkeypatch.setattr(outbox_relay_module, "outbox_repo", repo)
+
+    received = []
+
+    async def handler(event):
+        received.append(event.event_id)
+
+    bus.subscribe(handler)
+    bus.start()
+    try:
+        await OutboxRelay().relay_batch()
+        # Delivered before the row was deleted, not just queued
+        assert received == ["e1"]
+        assert repo.deleted == ["e1"]
+    finally:
+        await bus.stop(timeout=1)
@@ -0,0 +1,20 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.pagination import InvalidCursorError, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trips_as_naive_utc():
+    at = datetime(2026, 2, 5, 10, 30, 15, 123000, tzinfo=timezone.utc)
+
+    cursor = encode_cursor(at, "conv-1")
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (at.replace(tzinfo=None), "conv-1")
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "e30", ""])
+def test_garbage_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
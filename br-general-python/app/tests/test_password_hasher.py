@@ -0,0 +1,41 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.metrics import metrics
+from app.services.password_hasher import PasswordHasher, PasswordHasherBusyError
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_runs_off_the_event_loop_thread():
+    hasher = PasswordHasher(workers=1, max_pending=0)
+    try:
+        thread_name = await hasher.run("hash", lambda: threading.current_thread().name)
+    finally:
+        hasher.shutdown()
+
+    assert thread_name.startswith("password-hasher")
+    latency = metrics.histogram("password_hash_seconds", labels={"operation": "hash"})
+    assert latency.sample()["count"] >= 1
+
+
+async def test_rejects_calls_beyond_capacity():
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    release = threading.Event()
+
+    try:
+        running = [
+            asyncio.create_task(hasher.run("verify", release.wait)) for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+
+        with pytest.raises(PasswordHasherBusyError):
+            await hasher.run("verify", release.wait)
+
+        release.set()
+        assert await asyncio.gather(*running) == [True, True]
+    finally:
+        release.set()
+        hasher.shutdown()
@@ -1,7 +1,8 @@
 from app.events.domain import (
     publish_event,
     get_published_events,
-    clear_event_sink,
+    start_recording,
+    stop_recording,
 )
 
 import pytest
@@ -9,9 +10,19 @@ import pytest
 
 @pytest.mark.asyncio
 async def test_domain_event_is_published():
-    clear_event_sink()
+    start_recording()
 
     await publish_event("user_created", {"id": "123"})
 
     events = get_published_events()
+    stop_recording()
     assert events == [("user_created", {"id": "123"})]
+
+
+@pytest.mark.asyncio
+async def test_events_are_only_recorded_on_request():
+    stop_recording()
+
+    await publish_event("user_created", {"id": "123"})
+
+    assert get_published_events() == []
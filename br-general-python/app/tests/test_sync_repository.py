@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.repositories.sync_repository import sync_repo
+from app.ws.events import ws_event
+
+pytestmark = pytest.mark.asyncio
+
+
+def _rows(*seqs):
+    return [SimpleNamespace(changeSeq=seq) for seq in seqs]
+
+
+class FakeTable:
+    def __init__(self, rows):
+        self.rows = rows
+        self.where = None
+
+    async def find_many(self, *, where, **_):
+        self.where = where
+        return self.rows
+
+
+class FakeDb:
+    def __init__(self, conversations, messages, orders, suggestions, watermark=50):
+        self.conversation = FakeTable(conversations)
+        self.message = FakeTable(messages)
+        self.suggestions = FakeTable(suggestions)
+        self.orders = orders
+        self.watermark = watermark
+        self.order_params = None
+
+    async def query_first(self, query, *_):
+        assert "change_seq_watermark" in query
+        return {"watermark": self.watermark}
+
+    async def query_raw(self, _query, *params, **__):
+        self.order_params = params
+        return self.orders
+
+
+async def test_seq_is_the_watermark_when_nothing_is_cut_off():
+    db = FakeDb(_rows(12), _rows(11, 13), [], _rows(14), watermark=20)
+
+    batch = await sync_repo.changes_since(db, user_id="u1", since=10, limit=5)
+
+    assert batch.seq == 20
+    assert not batch.has_more
+
+
+async def test_rows_past_the_watermark_are_not_read():
+    db = FakeDb([], [], [], [], watermark=20)
+
+    await sync_repo.changes_since(db, user_id="u1", since=10, limit=5)
+
+    for table in (db.conversation, db.message, db.suggestions):
+        assert table.where["changeSeq"] == {"gt": 10, "lte": 20}
+    assert db.order_params == (10, "u1", 5, 20)
+
+
+async def test_seq_stops_at_the_earliest_truncated_kind():
+    db = FakeDb(_rows(12, 20), _rows(11, 13), _rows(30), [])
+
+    batch = await sync_repo.changes_since(db, user_id="u1", since=10, limit=2)
+
+    assert batch.has_more
+    assert batch.seq == 13
+
+
+async def test_seq_never_moves_back_before_since():
+    db = FakeDb([], [], [], [], watermark=30)
+
+    batch = await sync_repo.changes_since(db, user_id="u1", since=42, limit=5)
+
+    assert batch.seq == 42
+
+
+async def test_ws_event_carries_seq_only_when_known():
+    assert ws_event("new_message", {}, seq=7)["seq"] == 7
+    assert "seq" not in ws_event("health_ping", {})
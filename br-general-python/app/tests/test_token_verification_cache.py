@@ -0,0 +1,33 @@
+import pytest
+
+from app.services import auth_service as auth_module
+from app.services.auth_service import InvalidTokenError, auth_service
+
+
+def test_repeated_tokens_are_verified_once(monkeypatch):
+    token = auth_service.create_access_token("user-1")
+    calls = []
+    real_decode = auth_module.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(1)
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(auth_module.jwt, "decode", counting_decode)
+
+    first = auth_service.require_access_token(token)
+    second = auth_service.require_access_token(f"Bearer {token}")
+
+    assert first == second
+    assert first["sub"] == "user-1"
+    assert len(calls) == 1
+
+
+def test_revoked_jti_is_rejected_even_when_cached():
+    token = auth_service.create_access_token("user-2")
+    payload = auth_service.require_access_token(token)
+
+    auth_service.revoke_token(payload)
+
+    with pytest.raises(InvalidTokenError):
+        auth_service.require_access_token(token)
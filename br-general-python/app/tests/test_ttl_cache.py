@@ -0,0 +1,61 @@
+import time
+
+from app.cache import TTLCache
+
+
+def test_get_returns_value_until_ttl_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = TTLCache("test-ttl", max_size=10, ttl_seconds=5)
+
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+
+    now[0] += 5
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache("test-lru", max_size=2, ttl_seconds=60)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_invalidate_drops_entries():
+    cache = TTLCache(
+        "test-invalidate", max_size=10, ttl_seconds=60, group_by=lambda key: key[1]
+    )
+    cache.set(("u1", "c1"), True)
+    cache.set(("u1", "c2"), True)
+    cache.set(("u2", "c1"), True)
+
+    cache.invalidate(("u1", "c1"))
+    cache.invalidate_group("c1")
+
+    assert cache.get(("u1", "c1")) is None
+    assert cache.get(("u2", "c1")) is None
+    assert cache.get(("u1", "c2")) is True
+
+
+def test_groups_forget_evicted_and_expired_keys(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = TTLCache(
+        "test-groups", max_size=2, ttl_seconds=5, group_by=lambda key: key[1]
+    )
+
+    cache.set(("u1", "c1"), True)
+    cache.set(("u2", "c1"), True)
+    cache.set(("u1", "c2"), True)  # evicts ("u1", "c1")
+    now[0] += 5
+    assert cache.get(("u2", "c1")) is None
+
+    assert cache._groups == {"c2": {("u1", "c2")}}
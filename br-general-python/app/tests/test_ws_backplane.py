@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+
+from app.ws.backplane import (
+    BROADCAST_CHANNEL,
+    Backplane,
+    InMemoryBackplane,
+    InMemoryHub,
+    PostgresBackplane,
+    _asyncpg_dsn,
+    _without_text,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_worker(hub):
+    received = []
+
+    async def deliver(scopes, message):
+        received.append((list(scopes), message))
+
+    return InMemoryBackplane(hub), received, deliver
+
+
+async def test_publish_reaches_only_workers_watching_the_scope():
+    hub = InMemoryHub()
+    a, a_received, a_deliver = make_worker(hub)
+    b, b_received, b_deliver = make_worker(hub)
+    c, c_received, c_deliver = make_worker(hub)
+    for worker, deliver in ((a, a_deliver), (b, b_deliver), (c, c_deliver)):
+        await worker.start(deliver)
+
+    b.watch("ws:conversation:1")
+
+    await a.publish(["ws:conversation:1"], {"type": "message_created"})
+
+    assert b_received == [(["ws:conversation:1"], {"type": "message_created"})]
+    assert a_received == []
+    assert c_received == []
+
+
+async def test_unwatch_stops_delivery_and_broadcast_reaches_all():
+    hub = InMemoryHub()
+    a, a_received, a_deliver = make_worker(hub)
+    b, b_received, b_deliver = make_worker(hub)
+    await a.start(a_deliver)
+    await b.start(b_deliver)
+
+    b.watch("ws:conversation:1")
+    b.unwatch("ws:conversation:1")
+    await a.publish(["ws:conversation:1"], {"type": "message_created"})
+    await a.publish([BROADCAST_CHANNEL], {"type": "ping"})
+
+    assert b_received == [([BROADCAST_CHANNEL], {"type": "ping"})]
+    assert a_received == []
+
+
+async def test_publish_delivers_once_with_the_watched_scopes():
+    hub = InMemoryHub()
+    a, _, a_deliver = make_worker(hub)
+    b, b_received, b_deliver = make_worker(hub)
+    await a.start(a_deliver)
+    await b.start(b_deliver)
+
+    b.watch("ws:conversation:1")
+    b.watch("ws:user:u2:conversations")
+    await a.publish(
+        ["ws:conversation:1", "ws:user:u1:conversations", "ws:user:u2:conversations"],
+        {"type": "message_created"},
+    )
+
+    assert [scopes for scopes, _ in b_received] == [
+        ["ws:conversation:1", "ws:user:u2:conversations"]
+    ]
+
+
+async def test_postgres_publish_notifies_all_scopes_in_one_statement(monkeypatch):
+    calls = []
+
+    class FakeDB:
+        async def query_raw(self, query, *params):
+            calls.append((query, params))
+            return []
+
+    monkeypatch.setattr("app.ws.backplane.db", FakeDB())
+    worker = PostgresBackplane("postgresql://u:p@db:5432/crm")
+
+    await worker.publish(["ws:conversation:1", "ws:user:u1:conversations"], {})
+    await worker.publish([], {})
+
+    assert len(calls) == 1
+    query, params = calls[0]
+    assert "pg_notify" in query
+    assert params[1:] == ("ws:conversation:1", "ws:user:u1:conversations")
+
+
+async def test_postgres_delivers_an_event_once_across_its_channels(monkeypatch):
+    calls = []
+
+    class FakeDB:
+        async def query_raw(self, query, *params):
+            calls.append(params)
+            return []
+
+    monkeypatch.setattr("app.ws.backplane.db", FakeDB())
+    a = PostgresBackplane("postgresql://u:p@db:5432/crm")
+    b = PostgresBackplane("postgresql://u:p@db:5432/crm")
+    received = []
+
+    async def deliver(scopes, message):
+        received.append((list(scopes), message))
+
+    b._deliver = deliver
+    b.watch("ws:conversation:1")
+    b.watch("ws:user:u2:conversations")
+
+    scopes = [
+        "ws:conversation:1",
+        "ws:user:u1:conversations",
+        "ws:user:u2:conversations",
+    ]
+    await a.publish(scopes, {"type": "message_created"})
+    payload = calls[0][0]
+    # Postgres notifies every channel; b listens on two of them
+    b._on_notify(None, 1, "ws:conversation:1", payload)
+    b._on_notify(None, 1, "ws:user:u2:conversations", payload)
+    await asyncio.gather(*b._tasks)
+
+    assert received == [
+        (
+            ["ws:conversation:1", "ws:user:u2:conversations"],
+            {"type": "message_created"},
+        )
+    ]
+
+
+async def test_backplane_requires_publish():
+    with pytest.raises(TypeError):
+        Backplane()
+
+
+async def test_without_text_drops_the_body():
+    message = {"type": "message_created", "data": {"id": "m1", "text": "x" * 9000}}
+
+    shrunk = _without_text(message)
+
+    assert shrunk["data"] == {"id": "m1", "truncated": True}
+    assert message["data"]["text"] == "x" * 9000
+
+
+async def test_asyncpg_dsn_drops_prisma_parameters():
+    dsn = "postgresql://u:p@db:5432/crm?schema=public&connection_limit=5"
+
+    assert _asyncpg_dsn(dsn) == "postgresql://u:p@db:5432/crm"
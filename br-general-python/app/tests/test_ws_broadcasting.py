@@ -1,4 +1,9 @@
+import asyncio
+import json
+import time
+
 import pytest
+from app.settings import settings
 from app.ws.manager import ws_manager
 from app.ws.dispatcher import emit
 
@@ -8,21 +13,43 @@ pytestmark = pytest.mark.asyncio
 class FakeWS:
     def __init__(self):
         self.messages = []
+        self.closed_with = None
+
+    async def send_text(self, data):
+        self.messages.append(json.loads(data))
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+class StuckWS(FakeWS):
+    async def send_text(self, data):
+        await asyncio.sleep(3600)
+
 
-    async def send_json(self, data):
-        self.messages.append(data)
+@pytest.fixture(autouse=True)
+def clean_manager():
+    yield
+    for connection_id in list(ws_manager.connections):
+        ws_manager.disconnect(connection_id)
+
+
+def connect(ws):
+    return ws_manager.connect(ws, user_id="u1", token_exp=int(time.time()) + 60)
+
+
+async def drain(*connection_ids):
+    for connection_id in connection_ids:
+        await ws_manager.connections[connection_id].send_queue.drain()
 
 
 async def test_global_broadcast():
     ws1 = FakeWS()
     ws2 = FakeWS()
-
-    ws_manager.connections = {
-        "c1": type("C", (), {"ws": ws1})(),
-        "c2": type("C", (), {"ws": ws2})(),
-    }
+    c1, c2 = connect(ws1), connect(ws2)
 
     await ws_manager.broadcast_all({"type": "ping"})
+    await drain(c1, c2)
 
     assert ws1.messages == [{"type": "ping"}]
     assert ws2.messages == [{"type": "ping"}]
@@ -31,38 +58,122 @@ async def test_global_broadcast():
 async def test_scope_broadcast_only_to_subscribers():
     ws1 = FakeWS()
     ws2 = FakeWS()
+    c1, c2 = connect(ws1), connect(ws2)
 
-    ws_manager.connections = {
-        "c1": type("C", (), {"ws": ws1})(),
-        "c2": type("C", (), {"ws": ws2})(),
-    }
-
-    ws_manager.subscribe("c1", "ws:conversation:room-1")
+    ws_manager.subscribe(c1, "ws:conversation:room-1")
 
     await ws_manager.broadcast_scope(
         "ws:conversation:room-1",
         {"type": "msg"},
     )
+    await drain(c1, c2)
 
-    assert ws1.messages == [{"type": "msg"}]
+    assert ws1.messages == [{"type": "msg", "stream_seq": ws_manager.stream_seq}]
     assert ws2.messages == []
 
 
+async def test_socket_in_several_scopes_gets_the_event_once():
+    ws1 = FakeWS()
+    ws2 = FakeWS()
+    c1, c2 = connect(ws1), connect(ws2)
+
+    ws_manager.subscribe(c1, "ws:conversation:room-1")
+    ws_manager.subscribe(c1, "ws:user:u1:conversations")
+    ws_manager.subscribe(c2, "ws:user:u1:conversations")
+
+    await ws_manager.broadcast_scopes(
+        ["ws:conversation:room-1", "ws:user:u1:conversations"],
+        {"type": "msg"},
+    )
+    await drain(c1, c2)
+
+    assert ws1.messages == [{"type": "msg", "stream_seq": ws_manager.stream_seq}]
+    assert ws2.messages == ws1.messages
+
+
 async def test_emit_routes_by_conversation_id(monkeypatch):
     called = {"all": 0, "scope": 0}
 
     async def fake_all(msg):
         called["all"] += 1
 
-    async def fake_scope(scope, msg):
+    async def fake_scopes(scopes, msg):
         called["scope"] += 1
-        assert scope == "ws:conversation:123"
+        assert scopes[0] == "ws:conversation:123"
 
     monkeypatch.setattr(ws_manager, "broadcast_all", fake_all)
-    monkeypatch.setattr(ws_manager, "broadcast_scope", fake_scope)
+    monkeypatch.setattr(ws_manager, "broadcast_scopes", fake_scopes)
 
     await emit("event", {"conversation_id": "123"})
     await emit("event", {"foo": "bar"})
 
     assert called["scope"] == 1
     assert called["all"] == 1
+
+
+async def test_slow_socket_is_evicted_without_blocking_others(monkeypatch):
+    monkeypatch.setattr(settings, "ws_send_timeout_seconds", 0.05)
+    stuck = StuckWS()
+    ws2 = FakeWS()
+    slow, fast = connect(stuck), connect(ws2)
+
+    # returns without waiting on either socket
+    await asyncio.wait_for(ws_manager.broadcast_all({"type": "ping"}), timeout=0.01)
+    await drain(fast)
+    await asyncio.sleep(0.1)
+
+    assert ws2.messages == [{"type": "ping"}]
+    assert slow not in ws_manager.connections
+    assert stuck.closed_with == 1013
+
+
+def updated(conversation_id, n):
+    return {
+        "type": "conversation_updated",
+        "data": {"conversation_id": conversation_id, "n": n},
+    }
+
+
+async def test_full_queue_coalesces_conversation_updates(monkeypatch):
+    monkeypatch.setattr(settings, "ws_send_queue_size", 2)
+    monkeypatch.setattr(settings, "ws_send_queue_overflow", "coalesce")
+    ws = FakeWS()
+    c1 = connect(ws)
+
+    # nothing is written until the writer task gets the loop
+    await ws_manager.broadcast_all(updated("a", 1))
+    await ws_manager.broadcast_all({"type": "new_message", "data": {}})
+    await ws_manager.broadcast_all(updated("a", 2))
+    await drain(c1)
+
+    assert ws.messages == [{"type": "new_message", "data": {}}, updated("a", 2)]
+
+
+async def test_full_queue_drops_oldest(monkeypatch):
+    monkeypatch.setattr(settings, "ws_send_queue_size", 2)
+    monkeypatch.setattr(settings, "ws_send_queue_overflow", "drop_oldest")
+    ws = FakeWS()
+    c1 = connect(ws)
+
+    for n in range(3):
+        await ws_manager.broadcast_all(updated("a", n))
+    await drain(c1)
+
+    assert ws.messages == [updated("a", 1), updated("a", 2)]
+
+
+async def test_full_queue_disconnects_with_resync_hint(monkeypatch):
+    monkeypatch.setattr(settings, "ws_send_queue_size", 2)
+    monkeypatch.setattr(settings, "ws_send_queue_overflow", "disconnect")
+    ws = FakeWS()
+    c1 = connect(ws)
+    send_queue = ws_manager.connections[c1].send_queue
+
+    for n in range(3):
+        await ws_manager.broadcast_all(updated("a", n))
+    await send_queue.drain()
+    await asyncio.sleep(0)
+
+    assert c1 not in ws_manager.connections
+    assert [m["type"] for m in ws.messages] == ["resync_required"]
+    assert ws.closed_with == 1013
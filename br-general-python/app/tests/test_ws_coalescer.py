@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from app.ws.coalescer import ConversationUpdateCoalescer
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_coalescer(window_seconds=0.02):
+    emitted = []
+
+    async def emit(event_type, data, seq):
+        emitted.append((event_type, data, seq))
+
+    return ConversationUpdateCoalescer(window_seconds, emit), emitted
+
+
+async def test_updates_within_a_window_are_merged():
+    coalescer, emitted = make_coalescer()
+
+    coalescer.update("a", {"last_message_id": "m1"}, seq=5)
+    coalescer.update("a", {"status": "OPEN"}, seq=3)
+    coalescer.update("a", {"last_message_id": "m2"})
+    coalescer.update("b", {"assignee_id": "u1"})
+    assert emitted == []
+
+    await asyncio.sleep(0.05)
+
+    assert sorted(emitted, key=lambda e: e[1]["conversation_id"]) == [
+        (
+            "conversation_updated",
+            {"conversation_id": "a", "last_message_id": "m2", "status": "OPEN"},
+            5,
+        ),
+        ("conversation_updated", {"conversation_id": "b", "assignee_id": "u1"}, None),
+    ]
+
+
+async def test_next_window_starts_after_a_flush():
+    coalescer, emitted = make_coalescer()
+
+    coalescer.update("a", {"n": 1})
+    await asyncio.sleep(0.05)
+    coalescer.update("a", {"n": 2})
+    await asyncio.sleep(0.05)
+
+    assert [data["n"] for _, data, _ in emitted] == [1, 2]
+
+
+async def test_flush_all_sends_pending_updates_immediately():
+    coalescer, emitted = make_coalescer(window_seconds=60)
+
+    coalescer.update("a", {"n": 1})
+    await coalescer.flush_all()
+
+    assert emitted == [("conversation_updated", {"conversation_id": "a", "n": 1}, None)]
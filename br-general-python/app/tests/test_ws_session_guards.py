@@ -1,5 +1,4 @@
 import time as time_mod
-from datetime import datetime, timedelta, timezone
 
 import pytest
 from fastapi.testclient import TestClient
@@ -13,12 +12,12 @@ from app.api import websocket as ws_api  # this module holds auth_service + endp
 def reset_ws_manager_state():
     # hard reset between tests (in-memory singleton)
     ws_manager.connections.clear()
-    ws_manager._scopes_by_connection.clear()
     ws_manager._connections_by_scope.clear()
+    ws_manager._connections_by_user.clear()
     yield
     ws_manager.connections.clear()
-    ws_manager._scopes_by_connection.clear()
     ws_manager._connections_by_scope.clear()
+    ws_manager._connections_by_user.clear()
 
 
 @pytest.fixture
@@ -36,7 +35,7 @@ def _mock_decode_token(monkeypatch, *, sub="user-1", exp=None):
     monkeypatch.setattr(ws_api.auth_service, "decode_token", fake_decode_token)
 
 
-def _get_single_connection_id() -> str:
+def _get_single_connection_id() -> int:
     assert len(ws_manager.connections) == 1
     return next(iter(ws_manager.connections.keys()))
 
@@ -46,6 +45,9 @@ def test_ws_closes_when_token_expired(client, monkeypatch):
     _mock_decode_token(monkeypatch, exp=int(time_mod.time()) - 5)
 
     with client.websocket_connect("/br-general/ws/ws?token=fake") as ws:
+        # every connection starts with its session event
+        assert ws.receive_json()["type"] == "session"
+
         # trigger the loop (any message works; ping is fine)
         ws.send_json(
             {
@@ -68,12 +70,13 @@ def test_ws_closes_when_idle_timeout_exceeded(client, monkeypatch):
     _mock_decode_token(monkeypatch, exp=int(time_mod.time()) + 3600)
 
     with client.websocket_connect("/br-general/ws/ws?token=fake") as ws:
+        # every connection starts with its session event
+        assert ws.receive_json()["type"] == "session"
+
         conn_id = _get_single_connection_id()
 
         # make connection appear idle for > 2 hours
-        ws_manager.connections[conn_id].last_seen = datetime.now(
-            timezone.utc
-        ) - timedelta(hours=3)
+        ws_manager.connections[conn_id].last_seen = time_mod.monotonic() - 3 * 3600
 
         # send "real" message to trigger idle check (ping does not update last_seen anyway)
         ws.send_json(
@@ -89,3 +92,26 @@ def test_ws_closes_when_idle_timeout_exceeded(client, monkeypatch):
 
         with pytest.raises(Exception):
             ws.receive_json()
+
+
+def test_ws_endpoint_writes_only_through_the_send_queue(client, monkeypatch):
+    _mock_decode_token(monkeypatch)
+
+    async def direct_send(self, data, mode="text"):
+        raise AssertionError("endpoint wrote to the socket directly")
+
+    # The writer task uses send_text; acks must not bypass it
+    monkeypatch.setattr(ws_api.WebSocket, "send_json", direct_send)
+
+    with client.websocket_connect("/br-general/ws/ws?token=fake") as ws:
+        assert ws.receive_json()["type"] == "session"
+
+        ws.send_json({"type": "subscribe", "data": {"scope": "my_conversations"}})
+        msg = ws.receive_json()
+        assert msg["type"] == "subscribed"
+        assert msg["data"] == {"scope": "my_conversations"}
+
+        ws.send_json({"type": "subscribe", "data": {"scope": "orders"}})
+        msg = ws.receive_json()
+        assert msg["type"] == "error"
+        assert msg["data"]["code"] == "forbidden"
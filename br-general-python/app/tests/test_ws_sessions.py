@@ -0,0 +1,182 @@
+import json
+import time
+
+import pytest
+
+from app.api import websocket as ws_api
+from app.ws.manager import ws_manager
+
+pytestmark = pytest.mark.asyncio
+
+SCOPE = "ws:conversation:c1"
+
+
+async def allow_all(_conn, scopes):
+    return scopes
+
+
+class FakeWS:
+    def __init__(self):
+        self.messages = []
+
+    async def send_text(self, data):
+        self.messages.append(json.loads(data))
+
+    async def close(self, code=1000):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def clean_manager():
+    yield
+    for connection_id in list(ws_manager.connections):
+        ws_manager.disconnect(connection_id)
+    ws_manager._released(ws_manager.sessions.expire(float("inf")))
+
+
+def connect(ws, user_id="u1"):
+    return ws_manager.connect(ws, user_id=user_id, token_exp=int(time.time()) + 60)
+
+
+async def drain(connection_id):
+    await ws_manager.connections[connection_id].send_queue.drain()
+
+
+async def open_and_drop_session():
+    """Subscribe, see one event, drop the socket; return (session, last seq)."""
+    first = connect(FakeWS())
+    await ws_manager.start_session(first, authorize=allow_all)
+    ws_manager.subscribe(first, SCOPE)
+    await ws_manager.broadcast_scope(SCOPE, {"type": "new_message", "data": {"n": 0}})
+    seen = ws_manager.stream_seq
+    session_id = ws_manager.connections[first].session_id
+    ws_manager.disconnect(first)
+    return session_id, seen
+
+
+async def test_resume_restores_subscriptions_and_replays_missed_events():
+    session_id, seen = await open_and_drop_session()
+    for n in (1, 2):
+        await ws_manager.broadcast_scope(
+            SCOPE, {"type": "new_message", "data": {"n": n}}
+        )
+
+    ws = FakeWS()
+    second = connect(ws)
+    assert await ws_manager.start_session(
+        second, authorize=allow_all, resume_session_id=session_id, last_stream_seq=seen
+    )
+    await drain(second)
+
+    session, *replayed = ws.messages
+    assert session["type"] == "session"
+    assert session["data"]["resumed"] is True
+    assert session["data"]["session_id"] == session_id
+    assert session["data"]["subscriptions"] == [{"scope": "conversation", "id": "c1"}]
+    assert [m["data"]["n"] for m in replayed] == [1, 2]
+    assert SCOPE in ws_manager.connections[second].scopes
+
+
+async def test_replay_sends_an_event_of_several_scopes_once():
+    other_scope = "ws:user:u1:conversations"
+    first = connect(FakeWS())
+    await ws_manager.start_session(first, authorize=allow_all)
+    ws_manager.subscribe(first, SCOPE)
+    ws_manager.subscribe(first, other_scope)
+    seen = ws_manager.stream_seq
+    session_id = ws_manager.connections[first].session_id
+    ws_manager.disconnect(first)
+
+    await ws_manager.broadcast_scopes(
+        [SCOPE, other_scope], {"type": "new_message", "data": {"n": 1}}
+    )
+
+    ws = FakeWS()
+    second = connect(ws)
+    await ws_manager.start_session(
+        second, authorize=allow_all, resume_session_id=session_id, last_stream_seq=seen
+    )
+    await drain(second)
+
+    _, *replayed = ws.messages
+    assert [m["data"]["n"] for m in replayed] == [1]
+
+
+async def test_resume_past_the_buffer_asks_for_resync(monkeypatch):
+    monkeypatch.setattr(ws_manager.sessions, "buffer_size", 2)
+    session_id, seen = await open_and_drop_session()
+    # buffer was created before the limit changed; start a fresh one
+    ws_manager.sessions.forget(SCOPE)
+    for n in (1, 2, 3):
+        await ws_manager.broadcast_scope(
+            SCOPE, {"type": "new_message", "data": {"n": n}}
+        )
+
+    ws = FakeWS()
+    second = connect(ws)
+    await ws_manager.start_session(
+        second, authorize=allow_all, resume_session_id=session_id, last_stream_seq=seen
+    )
+    await drain(second)
+
+    assert [m["type"] for m in ws.messages] == ["session", "resync_required"]
+    assert ws.messages[1]["data"] == {
+        "reason": "replay_gap",
+        "scope": "conversation",
+        "id": "c1",
+    }
+
+
+async def test_session_of_another_user_is_not_resumed():
+    session_id, seen = await open_and_drop_session()
+
+    ws = FakeWS()
+    other = connect(ws, user_id="u2")
+    resumed = await ws_manager.start_session(
+        other, authorize=allow_all, resume_session_id=session_id, last_stream_seq=seen
+    )
+    await drain(other)
+
+    assert resumed is False
+    assert ws.messages[0]["data"]["resumed"] is False
+    assert ws.messages[0]["data"]["session_id"] != session_id
+    assert ws_manager.connections[other].scopes == set()
+
+
+async def test_resume_drops_scopes_whose_access_was_revoked(monkeypatch):
+    session_id, seen = await open_and_drop_session()
+    await ws_manager.broadcast_scope(SCOPE, {"type": "new_message", "data": {"n": 1}})
+
+    checked = []
+
+    async def no_access(*, user_id, conversation_ids):
+        checked.append((user_id, conversation_ids))
+        return set()
+
+    monkeypatch.setattr(ws_api, "filter_accessible_conversations", no_access)
+
+    ws = FakeWS()
+    second = connect(ws)
+    assert await ws_manager.start_session(
+        second,
+        authorize=ws_api.authorize_resumed_scopes,
+        resume_session_id=session_id,
+        last_stream_seq=seen,
+    )
+    await drain(second)
+
+    assert checked == [("u1", ["c1"])]
+    assert [m["type"] for m in ws.messages] == ["session"]
+    assert ws.messages[0]["data"]["subscriptions"] == []
+    assert ws_manager.connections[second].scopes == set()
+    assert not ws_manager.sessions.holds(SCOPE)
+
+
+async def test_resume_drops_orders_scope_for_non_admins():
+    conn = ws_manager.connections[connect(FakeWS())]
+
+    allowed = await ws_api.authorize_resumed_scopes(
+        conn, {"ws:orders", "ws:user:u1:conversations", "ws:user:u2:conversations"}
+    )
+
+    assert allowed == {"ws:user:u1:conversations"}
@@ -29,6 +29,9 @@ def test_ws_subscribe_allowed(monkeypatch, client):
     )
 
     with client.websocket_connect("/br-general/ws/ws?token=fake") as ws:
+        # every connection starts with its session event
+        assert ws.receive_json()["type"] == "session"
+
         ws.send_json(
             {
                 "type": "subscribe",
@@ -73,6 +76,9 @@ def test_ws_subscribe_admin_bypass(monkeypatch, client):
     )
 
     with client.websocket_connect("/br-general/ws/ws?token=fake") as ws:
+        # every connection starts with its session event
+        assert ws.receive_json()["type"] == "session"
+
         ws.send_json(
             {
                 "type": "subscribe",
@@ -83,13 +89,13 @@ def test_ws_subscribe_admin_bypass(monkeypatch, client):
             }
         )
 
+        conn = next(iter(ws_manager.connections.values()))
         for _ in range(20):
-            if ws_manager._scopes_by_connection:
+            if conn.scopes:
                 break
             time.sleep(0.01)
 
-        conn = next(iter(ws_manager.connections.values()))
-        assert "ws:conversation:c1" in ws_manager._scopes_by_connection[conn.id]
+        assert "ws:conversation:c1" in conn.scopes
         assert called["count"] == 0
 
 
@@ -110,6 +116,9 @@ def test_ws_subscribe_forbidden(monkeypatch, client):
     )
 
     with client.websocket_connect("/br-general/ws/ws?token=fake") as ws:
+        # every connection starts with its session event
+        assert ws.receive_json()["type"] == "session"
+
         ws.send_json(
             {
                 "type": "subscribe",
@@ -126,3 +135,79 @@ def test_ws_subscribe_forbidden(monkeypatch, client):
 
         with pytest.raises(Exception):
             ws.receive_json()
+
+
+def test_ws_subscribe_many_checks_acl_once(monkeypatch, client):
+    monkeypatch.setattr(
+        ws_api.auth_service,
+        "decode_token",
+        lambda _: {"sub": "u1", "exp": 9999999999, "role": "user"},
+    )
+
+    calls = []
+
+    async def only_c1(*, user_id, conversation_ids):
+        calls.append(list(conversation_ids))
+        return {"c1"}
+
+    monkeypatch.setattr(
+        "app.api.websocket.filter_accessible_conversations",
+        only_c1,
+    )
+
+    with client.websocket_connect("/br-general/ws/ws?token=fake") as ws:
+        # every connection starts with its session event
+        assert ws.receive_json()["type"] == "session"
+
+        ws.send_json(
+            {
+                "type": "subscribe_many",
+                "data": {"scope": "conversation", "ids": ["c1", "c2", "c1"]},
+            }
+        )
+
+        msg = ws.receive_json()
+        assert msg["type"] == "subscribed_many"
+        assert msg["data"] == {"scope": "conversation", "ids": ["c1"], "denied": ["c2"]}
+        assert calls == [["c1", "c2"]]
+
+        conn = next(iter(ws_manager.connections.values()))
+        assert conn.scopes == {"ws:conversation:c1"}
+
+        ws.send_json(
+            {
+                "type": "unsubscribe_many",
+                "data": {"scope": "conversation", "ids": ["c1"]},
+            }
+        )
+
+        msg = ws.receive_json()
+        assert msg["type"] == "unsubscribed_many"
+        assert conn.scopes == set()
+
+
+def test_ws_subscribe_wildcard_scopes(monkeypatch, client):
+    monkeypatch.setattr(
+        ws_api.auth_service,
+        "decode_token",
+        lambda _: {"sub": "u1", "exp": 9999999999, "role": "user"},
+    )
+
+    with client.websocket_connect("/br-general/ws/ws?token=fake") as ws:
+        # every connection starts with its session event
+        assert ws.receive_json()["type"] == "session"
+
+        ws.send_json({"type": "subscribe", "data": {"scope": "my_conversations"}})
+
+        msg = ws.receive_json()
+        assert msg["type"] == "subscribed"
+        assert msg["data"] == {"scope": "my_conversations"}
+        conn = next(iter(ws_manager.connections.values()))
+        assert conn.scopes == {"ws:user:u1:conversations"}
+
+        # orders are for admins only
+        ws.send_json({"type": "subscribe", "data": {"scope": "orders"}})
+
+        msg = ws.receive_json()
+        assert msg["type"] == "error"
+        assert msg["data"]["code"] == "forbidden"
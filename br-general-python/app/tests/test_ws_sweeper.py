@@ -0,0 +1,104 @@
+import json
+import time
+
+import pytest
+
+from app.settings import settings
+from app.ws.manager import ws_manager
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeWS:
+    def __init__(self):
+        self.messages = []
+        self.closed_with = None
+
+    async def send_text(self, data):
+        self.messages.append(json.loads(data))
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+@pytest.fixture(autouse=True)
+def clean_manager():
+    yield
+    for connection_id in list(ws_manager.connections):
+        ws_manager.disconnect(connection_id)
+
+
+def connect(ws, user_id="u1", expires_in=60):
+    return ws_manager.connect(
+        ws, user_id=user_id, token_exp=int(time.time()) + expires_in
+    )
+
+
+async def drain(send_queue):
+    await send_queue.drain()
+
+
+async def test_sweep_pings_live_connections():
+    ws = FakeWS()
+    c1 = connect(ws)
+
+    ws_manager.sweep()
+    await drain(ws_manager.connections[c1].send_queue)
+
+    assert [m["type"] for m in ws.messages] == ["health_ping"]
+    assert c1 in ws_manager.connections
+
+
+async def test_sweep_closes_expired_and_idle_connections():
+    expired_ws, idle_ws = FakeWS(), FakeWS()
+    expired = connect(expired_ws, expires_in=-1)
+    idle = connect(idle_ws)
+    ws_manager.subscribe(idle, "ws:conversation:1")
+    ws_manager.connections[idle].last_seen = (
+        time.monotonic() - settings.ws_idle_timeout_seconds - 1
+    )
+    queues = [ws_manager.connections[c].send_queue for c in (expired, idle)]
+
+    ws_manager.sweep()
+    for send_queue in queues:
+        await drain(send_queue)
+
+    assert ws_manager.connections == {}
+    assert "ws:conversation:1" not in ws_manager._connections_by_scope
+    assert expired_ws.messages[-1]["data"] == {"code": "token_expired"}
+    assert expired_ws.closed_with == 1008
+    assert idle_ws.messages[-1]["data"] == {"code": "idle_timeout"}
+    assert idle_ws.closed_with == 1001
+
+
+async def test_connection_limit_evicts_the_oldest(monkeypatch):
+    monkeypatch.setattr(settings, "ws_max_connections_per_user", 2)
+    sockets = [FakeWS() for _ in range(3)]
+    first = connect(sockets[0])
+    first_queue = ws_manager.connections[first].send_queue
+    second = connect(sockets[1])
+    third = connect(sockets[2])
+    other_user = connect(FakeWS(), user_id="u2")
+
+    await drain(first_queue)
+
+    assert set(ws_manager.connections) == {second, third, other_user}
+    assert sockets[0].messages[-1]["data"] == {"code": "connection_limit"}
+    assert sockets[0].closed_with == 1008
+
+
+async def test_connection_limit_of_one_keeps_the_new_connection_registered(
+    monkeypatch,
+):
+    monkeypatch.setattr(settings, "ws_max_connections_per_user", 1)
+    first = connect(FakeWS())
+    second = connect(FakeWS())
+
+    assert set(ws_manager.connections) == {second}
+    assert ws_manager._connections_by_user["u1"] == {second}
+
+    # The limit still applies to the surviving connection
+    third = connect(FakeWS())
+    assert set(ws_manager.connections) == {third}
+    assert ws_manager._connections_by_user["u1"] == {third}
+    assert first not in ws_manager.connections
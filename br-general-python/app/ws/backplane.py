@@ -0,0 +1,293 @@
+"""
+Cross-worker pub/sub under `emit`.
+
+Each worker delivers events to its own sockets directly and publishes them
+on the backplane for the other workers. A worker only listens on the scopes
+its local connections are subscribed to (plus the broadcast and ACL cache
+invalidation channels), so traffic scales with what the worker actually
+serves.
+
+- `InMemoryBackplane`: workers sharing a hub in one process (single worker
+  deployments and tests).
+- `PostgresBackplane`: LISTEN/NOTIFY with one channel per scope.
+
+An event often goes to several scopes (a conversation and its participants'
+my_conversations); `publish` takes them all at once and each worker gets it
+once, with the scopes it watches, so a socket in several of them is sent
+one copy.
+"""
+
+import abc
+import asyncio
+from collections import deque
+import json
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Set
+from urllib.parse import urlsplit, urlunsplit
+
+from app.db import db
+from app.logging import logger
+from app.metrics import metrics
+from app.settings import settings
+
+# Channel for broadcast_all events
+BROADCAST_CHANNEL = "ws:all"
+
+# Conversation access changes, for the per-worker ACL caches
+ACL_INVALIDATION_CHANNEL = "cache:acl"
+
+# Channels every worker listens on, whatever its sockets subscribe to
+ALWAYS_LISTENED = frozenset({BROADCAST_CHANNEL, ACL_INVALIDATION_CHANNEL})
+
+# NOTIFY payloads are limited to 8000 bytes
+NOTIFY_MAX_BYTES = 7900
+
+RECONNECT_DELAY_SECONDS = 2.0
+
+# Ids of recently received events; one event arrives once per channel
+RECENT_EVENT_IDS = 256
+
+Deliver = Callable[[Sequence[str], dict[str, Any]], Awaitable[None]]
+
+
+class Backplane(abc.ABC):
+    """Interface of the WS pub/sub backplane."""
+
+    def __init__(self) -> None:
+        self._deliver: Optional[Deliver] = None
+        self._watched: Set[str] = set()
+
+        self._published = metrics.counter(
+            "ws_backplane_published_total", "Events published to other workers"
+        )
+        self._received = metrics.counter(
+            "ws_backplane_received_total", "Events received from other workers"
+        )
+        metrics.gauge(
+            "ws_backplane_channels",
+            "Scopes this worker listens on",
+            fn=lambda: len(self._watched),
+        )
+
+    async def start(self, deliver: Deliver) -> None:
+        """Start receiving; `deliver(scopes, message)` fans out locally."""
+        self._deliver = deliver
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+    def watch(self, scope: str) -> None:
+        """A local connection subscribed to `scope`."""
+        self._watched.add(scope)
+
+    def unwatch(self, scope: str) -> None:
+        """The last local connection left `scope`."""
+        self._watched.discard(scope)
+
+    @abc.abstractmethod
+    async def publish(self, scopes: Sequence[str], message: dict[str, Any]) -> None:
+        """Send `message` to the other workers watching any of `scopes`."""
+
+    def _listens(self, scope: str) -> bool:
+        return scope in ALWAYS_LISTENED or scope in self._watched
+
+    async def _receive(self, scopes: Sequence[str], message: dict[str, Any]) -> None:
+        if self._deliver is None or not scopes:
+            return
+
+        self._received.inc()
+        try:
+            await self._deliver(scopes, message)
+        except Exception:
+            logger.exception(
+                "[WS] failed to deliver backplane event on %s", ", ".join(scopes)
+            )
+
+
+class InMemoryHub:
+    """Connects in-memory backplanes as if they were separate workers."""
+
+    def __init__(self) -> None:
+        self.backplanes: list["InMemoryBackplane"] = []
+
+
+class InMemoryBackplane(Backplane):
+    def __init__(self, hub: Optional[InMemoryHub] = None) -> None:
+        super().__init__()
+        self.hub = hub or InMemoryHub()
+        self.hub.backplanes.append(self)
+
+    async def publish(self, scopes: Sequence[str], message: dict[str, Any]) -> None:
+        self._published.inc()
+        for other in self.hub.backplanes:
+            if other is self:
+                continue
+            await other._receive(
+                [scope for scope in scopes if other._listens(scope)], message
+            )
+
+
+class PostgresBackplane(Backplane):
+    """
+    LISTEN/NOTIFY backplane.
+
+    Publishing goes through the Prisma connection with pg_notify(); a
+    dedicated asyncpg connection holds the LISTENs. Notifications from this
+    worker are ignored since it already delivered them locally.
+
+    An event is notified on each of its channels; the payload carries an id
+    and every scope, so a worker listening on several of them delivers it
+    on the first notification and skips the rest.
+    """
+
+    def __init__(self, dsn: str) -> None:
+        super().__init__()
+        self._dsn = dsn
+        self._origin = uuid.uuid4().hex
+        self._conn = None
+        self._lock = asyncio.Lock()
+        self._listening: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._stopping = False
+        self._recent_ids: deque[str] = deque(maxlen=RECENT_EVENT_IDS)
+
+    async def start(self, deliver: Deliver) -> None:
+        await super().start(deliver)
+        self._stopping = False
+        await self._connect()
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        if self._conn is not None:
+            try:
+                await self._conn.close()
+            except Exception:
+                logger.exception("[WS] failed to close backplane connection")
+            self._conn = None
+        self._listening.clear()
+        await super().stop()
+
+    def watch(self, scope: str) -> None:
+        super().watch(scope)
+        if self._conn is not None:
+            self._spawn(self._sync_listens())
+
+    def unwatch(self, scope: str) -> None:
+        super().unwatch(scope)
+        if self._conn is not None:
+            self._spawn(self._sync_listens())
+
+    async def publish(self, scopes: Sequence[str], message: dict[str, Any]) -> None:
+        if not scopes:
+            return
+
+        envelope = {
+            "origin": self._origin,
+            "id": uuid.uuid4().hex,
+            "scopes": list(scopes),
+            "message": message,
+        }
+        payload = json.dumps(envelope)
+        if len(payload.encode()) > NOTIFY_MAX_BYTES:
+            payload = json.dumps({**envelope, "message": _without_text(message)})
+
+        # One statement notifies every scope
+        channels = ", ".join(f"(${i + 2})" for i in range(len(scopes)))
+        await db.query_raw(
+            f'SELECT pg_notify(s."channel", $1) FROM (VALUES {channels}) s("channel")',
+            payload,
+            *scopes,
+        )
+        self._published.inc()
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        self._conn = await asyncpg.connect(_asyncpg_dsn(self._dsn))
+        self._conn.add_termination_listener(self._on_terminated)
+        self._listening.clear()
+        await self._sync_listens()
+        logger.info("[WS] Postgres backplane listening")
+
+    async def _sync_listens(self) -> None:
+        """Make the LISTENs of the connection match the watched scopes."""
+        async with self._lock:
+            if self._conn is None or self._conn.is_closed():
+                return
+
+            wanted = self._watched | ALWAYS_LISTENED
+            for scope in wanted - self._listening:
+                await self._conn.add_listener(scope, self._on_notify)
+                self._listening.add(scope)
+            for scope in self._listening - wanted:
+                await self._conn.remove_listener(scope, self._on_notify)
+                self._listening.discard(scope)
+
+    def _on_notify(self, _conn, _pid: int, channel: str, payload: str) -> None:
+        try:
+            envelope = json.loads(payload)
+        except ValueError:
+            logger.error("[WS] malformed backplane payload on %s", channel)
+            return
+
+        if envelope.get("origin") == self._origin:
+            return
+
+        event_id = envelope.get("id")
+        if event_id is not None:
+            if event_id in self._recent_ids:
+                return
+            self._recent_ids.append(event_id)
+
+        scopes = [
+            scope for scope in envelope.get("scopes", [channel]) if self._listens(scope)
+        ]
+        self._spawn(self._receive(scopes, envelope["message"]))
+
+    def _on_terminated(self, _conn) -> None:
+        if not self._stopping:
+            logger.error("[WS] backplane connection lost, reconnecting")
+            self._spawn(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        while not self._stopping:
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+            try:
+                await self._connect()
+                return
+            except Exception:
+                logger.exception("[WS] backplane reconnect failed")
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+def _without_text(message: dict[str, Any]) -> dict[str, Any]:
+    """Shrink an oversized event; clients fetch the rest via /sync."""
+    data: Dict[str, Any] = {
+        key: value for key, value in message.get("data", {}).items() if key != "text"
+    }
+    data["truncated"] = True
+    return {**message, "data": data}
+
+
+def _asyncpg_dsn(database_url: str) -> str:
+    """Drop Prisma-only query parameters (schema, connection_limit, ...)."""
+    parts = urlsplit(database_url)
+    return urlunsplit(parts._replace(query=""))
+
+
+def create_backplane() -> Backplane:
+    if settings.ws_backplane == "postgres":
+        return PostgresBackplane(settings.database_url)
+    return InMemoryBackplane()
+
+
+# singleton instance
+backplane = create_backplane()
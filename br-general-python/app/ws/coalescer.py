@@ -0,0 +1,91 @@
+"""
+Debounced conversation_updated events.
+
+Changes to a conversation (new message, status, assignee) report the fields
+they touched. Updates for one conversation arriving within the window are
+merged, later values winning, and go out as a single event when the window
+closes, so a busy conversation costs one send per window instead of one per
+change.
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from app.logging import logger
+from app.metrics import metrics
+from app.ws.event_types import WSEventType
+
+Emit = Callable[[str, dict, Optional[int]], Awaitable[None]]
+
+
+@dataclass(slots=True)
+class PendingUpdate:
+    fields: Dict[str, Any] = field(default_factory=dict)
+    # Highest change sequence among the merged updates
+    seq: Optional[int] = None
+
+
+class ConversationUpdateCoalescer:
+    def __init__(self, window_seconds: float, emit: Emit) -> None:
+        self.window_seconds = window_seconds
+        self._emit = emit
+        self._pending: Dict[str, PendingUpdate] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+        self._updates = metrics.counter(
+            "ws_conversation_updates_total", "conversation_updated changes reported"
+        )
+        self._emitted = metrics.counter(
+            "ws_conversation_updates_emitted_total",
+            "conversation_updated events sent after merging",
+        )
+
+    def update(
+        self, conversation_id: str, fields: Dict[str, Any], seq: Optional[int] = None
+    ) -> None:
+        """Merge `fields` into the conversation's pending event."""
+        self._updates.inc()
+
+        pending = self._pending.get(conversation_id)
+        if pending is None:
+            pending = self._pending[conversation_id] = PendingUpdate()
+            if self.window_seconds > 0:
+                asyncio.get_running_loop().call_later(
+                    self.window_seconds, self._flush, conversation_id
+                )
+            else:
+                self._flush(conversation_id)
+
+        pending.fields.update(fields)
+        if seq is not None and (pending.seq is None or seq > pending.seq):
+            pending.seq = seq
+
+    async def flush_all(self) -> None:
+        """Send every pending event now (shutdown)."""
+        for conversation_id in list(self._pending):
+            self._flush(conversation_id)
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _flush(self, conversation_id: str) -> None:
+        task = asyncio.ensure_future(self._send(conversation_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, conversation_id: str) -> None:
+        # Popped when the send starts, so a window is never sent twice
+        pending = self._pending.pop(conversation_id, None)
+        if pending is None:
+            return
+
+        self._emitted.inc()
+        try:
+            await self._emit(
+                WSEventType.CONVERSATION_UPDATED.value,
+                {"conversation_id": conversation_id, **pending.fields},
+                pending.seq,
+            )
+        except Exception:
+            logger.exception(
+                "[WS] failed to emit conversation_updated for %s", conversation_id
+            )
@@ -1,21 +1,88 @@
+from typing import List, Optional, Sequence
+
+from app.logging import logger
+from app.repositories.conversation_participant_repository import (
+    conversation_participant_repository,
+    drop_cached_acl,
+)
 from app.settings import settings
+from app.ws.backplane import ACL_INVALIDATION_CHANNEL, BROADCAST_CHANNEL, backplane
+from app.ws.coalescer import ConversationUpdateCoalescer
 from app.ws.manager import ws_manager
+from app.ws.scopes import ORDERS_SCOPE, conversation_scope, user_conversations_scope
 from app.ws.events import ws_event
 
 
-async def emit(event_type: str, data: dict) -> None:
+async def emit(
+    event_type: str,
+    data: dict,
+    seq: Optional[int] = None,
+    event_id: Optional[str] = None,
+) -> None:
     """
     WS dispatch entry-point.
+
+    Delivers to this worker's sockets and publishes on the backplane for
+    the other workers. `seq` is the change sequence of the row the event
+    reports, if any; `event_id` the outbox id of a relayed event.
     """
-    message = ws_event(event_type, data)
+    message = ws_event(event_type, data, seq=seq, event_id=event_id)
 
     conversation_id = data.get("conversation_id")
 
     if conversation_id:
-        scope = f"ws:conversation:{conversation_id}"
-        await ws_manager.broadcast_scope(scope, message)
+        # The conversation and every participant's my_conversations scope,
+        # delivered once per socket and published to the other workers together
+        scopes = [conversation_scope(conversation_id)]
+        scopes += await _participant_scopes(conversation_id)
+        await ws_manager.broadcast_scopes(scopes, message)
+        await _publish(scopes, message)
         return
 
+    if data.get("order_id"):
+        await ws_manager.broadcast_scope(ORDERS_SCOPE, message)
+        await _publish([ORDERS_SCOPE], message)
+
     # fallback: global broadcast (MVP only)
     if settings.enable_ws_broadcast_endpoint:
         await ws_manager.broadcast_all(message)
+        await _publish([BROADCAST_CHANNEL], message)
+
+
+async def _participant_scopes(conversation_id: str) -> List[str]:
+    """The my_conversations scope of every participant."""
+    try:
+        user_ids = await conversation_participant_repository.user_ids_for_conversation(
+            conversation_id
+        )
+    except Exception:
+        logger.exception("[WS] failed to load participants of %s", conversation_id)
+        return []
+
+    return [user_conversations_scope(user_id) for user_id in user_ids]
+
+
+async def _publish(scopes: List[str], message: dict) -> None:
+    # Local sockets already got the event; a backplane outage must not undo that
+    try:
+        await backplane.publish(scopes, message)
+    except Exception:
+        logger.exception("[WS] backplane publish failed on %s", ", ".join(scopes))
+
+
+async def deliver_from_backplane(scopes: Sequence[str], message: dict) -> None:
+    """Fan out an event published by another worker to local sockets."""
+    if ACL_INVALIDATION_CHANNEL in scopes:
+        data = message["data"]
+        drop_cached_acl(data["conversation_id"], data["user_ids"])
+    elif BROADCAST_CHANNEL in scopes:
+        await ws_manager.broadcast_all(message)
+    else:
+        await ws_manager.broadcast_scopes(scopes, message)
+
+
+# Debounced conversation_updated events, one per conversation per window
+conversation_updates = ConversationUpdateCoalescer(
+    window_seconds=settings.ws_conversation_update_window_seconds,
+    emit=emit,
+)
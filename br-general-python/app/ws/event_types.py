@@ -10,6 +10,10 @@ class WSEventType(str, Enum):
 
     # System events
     HEALTH_PING = "health_ping"
+    # Session id and resume state, first event on every connection
+    SESSION = "session"
+    # Events were dropped; the client should catch up with GET /sync
+    RESYNC_REQUIRED = "resync_required"
 
     # Chat events
     NEW_MESSAGE = "new_message"
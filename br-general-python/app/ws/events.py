@@ -1,16 +1,32 @@
 from datetime import datetime, timezone
-from typing import TypedDict, Any
+from typing import Any, NotRequired, Optional, TypedDict
 
 
 class WSEvent(TypedDict):
     type: str
     timestamp: str
     data: dict[str, Any]
+    # Change sequence of the stored change; resume with GET /sync?since=seq
+    seq: NotRequired[int]
+    # Position in this worker's stream of scoped events; resume after it
+    stream_seq: NotRequired[int]
+    # Outbox id; at-least-once delivery may repeat an event with the same id
+    event_id: NotRequired[str]
 
 
-def ws_event(event_type: str, data: dict) -> WSEvent:
-    return {
+def ws_event(
+    event_type: str,
+    data: dict,
+    seq: Optional[int] = None,
+    event_id: Optional[str] = None,
+) -> WSEvent:
+    event: WSEvent = {
         "type": event_type,
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "data": data,
     }
+    if seq is not None:
+        event["seq"] = seq
+    if event_id is not None:
+        event["event_id"] = event_id
+    return event
@@ -1,103 +1,434 @@
+import asyncio
 from collections import defaultdict
-from dataclasses import dataclass
-from datetime import datetime, timezone
-from typing import Dict, Set
-import uuid
+from dataclasses import dataclass, field
+import itertools
+import secrets
+import sys
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Sequence, Set
 
-from fastapi import WebSocket, WebSocketDisconnect
+from fastapi import WebSocket
 
 from app.logging import logger
+from app.metrics import metrics
+from app.settings import settings
+from app.ws.backplane import backplane
+from app.ws.event_types import WSEventType
+from app.ws.events import ws_event
+from app.ws.send_queue import SendQueue, coalesce_key, encode_frame
+from app.ws.scopes import scope_ref
+from app.ws.sessions import SessionStore
 
+WS_CLOSE_GOING_AWAY = 1001
+WS_CLOSE_POLICY_VIOLATION = 1008
 
-@dataclass
+
+# Connection handles are small ints, unique per process
+ConnectionId = int
+
+
+@dataclass(slots=True, eq=False)
 class WSConnection:
-    id: str
+    id: ConnectionId
     ws: WebSocket
-    connected_at: datetime
     user_id: str
-    last_seen: datetime
     token_exp: int  # unix timestamp (seconds)
+    send_queue: SendQueue
+    # Token a reconnecting client presents to resume this session
+    session_id: str
+    # Admins may subscribe to any conversation without an ACL lookup
+    is_admin: bool = False
+    # time.monotonic() seconds
+    connected_at: float = field(default_factory=time.monotonic)
+    last_seen: float = field(default_factory=time.monotonic)
+    # Interned scope keys this connection is subscribed to
+    scopes: Set[str] = field(default_factory=set)
+
+
+# (connection, scopes of a resumed session) -> the scopes it may still hold
+ScopeAuthorizer = Callable[[WSConnection, Set[str]], Awaitable[Set[str]]]
 
 
 class WSManager:
     def __init__(self) -> None:
         # all active connections
-        self.connections: Dict[str, WSConnection] = {}
-        self._scopes_by_connection: Dict[str, Set[str]] = defaultdict(set)
-        self._connections_by_scope: Dict[str, Set[str]] = defaultdict(set)
+        self.connections: Dict[ConnectionId, WSConnection] = {}
+        self._connections_by_scope: Dict[str, Set[ConnectionId]] = {}
+        self._connections_by_user: Dict[str, Set[ConnectionId]] = defaultdict(set)
+        self._next_id = itertools.count(1)
+        # Last stream_seq stamped on a scoped event
+        self.stream_seq = 0
+        self.sessions = SessionStore(buffer_size=settings.ws_replay_buffer_size)
+        self._sweeper: Optional[asyncio.Task] = None
+
+        metrics.gauge(
+            "ws_connections",
+            "Open WebSocket connections",
+            fn=lambda: len(self.connections),
+        )
+        metrics.gauge(
+            "ws_detached_sessions",
+            "Sessions kept for resumption after their socket went away",
+            fn=lambda: len(self.sessions),
+        )
+        self._resumed = metrics.counter(
+            "ws_sessions_resumed_total", "Sessions resumed on reconnect"
+        )
+        self._replayed = metrics.counter(
+            "ws_replayed_events_total", "Buffered events replayed on resume"
+        )
+        metrics.gauge(
+            "ws_connected_users",
+            "Users with at least one open WebSocket connection",
+            fn=lambda: len(self._connections_by_user),
+        )
+        self._broadcast_seconds = metrics.histogram(
+            "ws_broadcast_seconds", "Time to queue one event for its recipients"
+        )
+        metrics.gauge(
+            "ws_send_queue_depth_total",
+            "Frames queued across all connections",
+            fn=lambda: sum(len(c.send_queue) for c in self.connections.values()),
+        )
+        metrics.gauge(
+            "ws_send_queue_depth_max",
+            "Deepest send queue of any connection",
+            fn=lambda: max(
+                (len(c.send_queue) for c in self.connections.values()), default=0
+            ),
+        )
+
+    def connect(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        token_exp: int,
+        is_admin: bool = False,
+    ) -> ConnectionId:
+        """
+        Register an accepted socket.
 
-    def connect(self, websocket: WebSocket, user_id: str, token_exp: int) -> str:
-        connection_id = str(uuid.uuid4())
+        A user at `ws_max_connections_per_user` loses their oldest connection
+        (usually a forgotten tab) to make room.
+        """
+        limit = max(settings.ws_max_connections_per_user, 1)
+        # Re-read every time: disconnect drops the user's set once it is empty
+        while (
+            len(user_connections := self._connections_by_user.get(user_id, ())) >= limit
+        ):
+            oldest = min(
+                user_connections, key=lambda cid: self.connections[cid].connected_at
+            )
+            self.close(oldest, WS_CLOSE_POLICY_VIOLATION, "connection_limit")
+
+        connection_id = next(self._next_id)
+        send_queue = SendQueue(
+            websocket,
+            max_size=settings.ws_send_queue_size,
+            policy=settings.ws_send_queue_overflow,
+            send_timeout=settings.ws_send_timeout_seconds,
+            on_failure=lambda: self.disconnect(connection_id),
+        )
         self.connections[connection_id] = WSConnection(
             id=connection_id,
             ws=websocket,
-            connected_at=datetime.now(timezone.utc),
             user_id=user_id,
-            last_seen=datetime.now(timezone.utc),
             token_exp=token_exp,
+            send_queue=send_queue,
+            session_id=secrets.token_urlsafe(16),
+            is_admin=is_admin,
+        )
+        self._connections_by_user[user_id].add(connection_id)
+        send_queue.start()
+        metrics.gauge(
+            "ws_send_queue_depth",
+            "Frames queued for one connection",
+            {"connection": str(connection_id)},
+            fn=lambda: len(send_queue),
         )
 
         logger.info("[WS] connected %s", connection_id)
         return connection_id
 
-    def disconnect(self, connection_id: str) -> None:
-        if connection_id not in self.connections:
+    def disconnect(self, connection_id: ConnectionId) -> None:
+        conn = self.connections.pop(connection_id, None)
+        if conn is None:
             return
 
-        scopes = self._scopes_by_connection.pop(connection_id, set())
-        for scope in scopes:
-            self._connections_by_scope[scope].discard(connection_id)
-            if not self._connections_by_scope[scope]:
-                del self._connections_by_scope[scope]
+        if conn.scopes:
+            # Keep the session (and its scopes buffered) for a reconnect
+            self.sessions.detach(
+                conn.session_id,
+                conn.user_id,
+                conn.scopes,
+                expires_at=time.monotonic() + settings.ws_session_ttl_seconds,
+            )
+        for scope in conn.scopes:
+            self._leave_scope(connection_id, scope)
+        conn.scopes.clear()
+        conn.send_queue.stop()
+
+        user_connections = self._connections_by_user.get(conn.user_id)
+        if user_connections is not None:
+            user_connections.discard(connection_id)
+            if not user_connections:
+                del self._connections_by_user[conn.user_id]
 
-        del self.connections[connection_id]
+        metrics.remove("ws_send_queue_depth", {"connection": str(connection_id)})
         logger.info("[WS] disconnected %s", connection_id)
 
-    def subscribe(self, connection_id: str, scope: str) -> None:
-        self._scopes_by_connection[connection_id].add(scope)
-        self._connections_by_scope[scope].add(connection_id)
-        logger.info("[WS] %s subscribed to %s", connection_id, scope)
+    async def start_session(
+        self,
+        connection_id: ConnectionId,
+        *,
+        authorize: ScopeAuthorizer,
+        resume_session_id: Optional[str] = None,
+        last_stream_seq: int = 0,
+    ) -> bool:
+        """
+        Send the `session` event, resuming a detached session if asked.
+
+        On resume the old subscriptions that `authorize` still allows (access
+        may have been revoked meanwhile) are restored and the frames the
+        client missed after `last_stream_seq` are queued right after the
+        `session` event. A scope whose buffer no longer reaches back that
+        far gets `resync_required` instead. Returns whether it resumed.
+        """
+        conn = self.connections.get(connection_id)
+        if conn is None:
+            return False
+
+        session = None
+        if resume_session_id:
+            session = self.sessions.claim(resume_session_id, conn.user_id)
+            if session is not None and session.expires_at <= time.monotonic():
+                self._released(session.scopes)
+                session = None
+
+        if session is None:
+            self.send(connection_id, self._session_event(conn, resumed=False))
+            return False
+
+        try:
+            allowed = await authorize(conn, set(session.scopes))
+        except Exception:
+            self._released(session.scopes)
+            raise
+
+        if connection_id not in self.connections:
+            # The socket went away during the access check
+            self._released(session.scopes)
+            return False
+
+        conn.session_id = resume_session_id
+        for scope in session.scopes & allowed:
+            self.subscribe(connection_id, scope)
+        self._released(session.scopes)
+
+        self.send(connection_id, self._session_event(conn, resumed=True))
 
-    def unsubscribe(self, connection_id: str, scope: str) -> None:
-        self._scopes_by_connection[connection_id].discard(scope)
-        self._connections_by_scope[scope].discard(connection_id)
+        # An event sent to several scopes is buffered in each of them under
+        # one stream_seq; replay it once
+        missed: Dict[int, str] = {}
+        for scope in sorted(conn.scopes):
+            frames = self.sessions.replay(scope, last_stream_seq)
+            if frames is None:
+                self.send(
+                    connection_id,
+                    ws_event(
+                        WSEventType.RESYNC_REQUIRED.value,
+                        {"reason": "replay_gap", **scope_ref(scope)},
+                    ),
+                )
+            else:
+                missed.update(frames)
 
-        if (
-            scope in self._connections_by_scope
-            and not self._connections_by_scope[scope]
+        for _, frame in sorted(missed.items()):
+            if not conn.send_queue.put(frame):
+                self.disconnect(connection_id)
+                break
+
+        self._resumed.inc()
+        self._replayed.inc(len(missed))
+        return True
+
+    def send(self, connection_id: ConnectionId, message: dict) -> None:
+        """Queue one event for one connection."""
+        conn = self.connections.get(connection_id)
+        if conn is not None and not conn.send_queue.put(
+            encode_frame(message), coalesce_key(message)
         ):
-            del self._connections_by_scope[scope]
-        logger.info("[WS] %s unsubscribed to %s", connection_id, scope)
+            self.disconnect(connection_id)
+
+    def _session_event(self, conn: WSConnection, *, resumed: bool) -> dict:
+        return ws_event(
+            WSEventType.SESSION.value,
+            {
+                "session_id": conn.session_id,
+                "resumed": resumed,
+                "stream_seq": self.stream_seq,
+                "subscriptions": [scope_ref(scope) for scope in sorted(conn.scopes)],
+            },
+        )
+
+    def close(self, connection_id: ConnectionId, code: int, reason: str) -> None:
+        """Send an error event with `reason`, close the socket and forget it."""
+        conn = self.connections.get(connection_id)
+        if conn is None:
+            return
+
+        metrics.counter(
+            "ws_connections_closed_total",
+            "Connections closed by the server",
+            {"reason": reason},
+        ).inc()
+        conn.send_queue.close(code, encode_frame(ws_event("error", {"code": reason})))
+        self.disconnect(connection_id)
+
+    def sweep(self) -> None:
+        """
+        Ping every connection and close the expired ones.
+
+        The endpoint only checks expiry when the client sends something, so
+        silent or dead sockets (and their scope subscriptions) are reaped
+        here. A ping to a dead socket fails or times out in its writer,
+        which evicts it.
+        """
+        now = time.monotonic()
+        now_ts = int(time.time())
+        idle_timeout = settings.ws_idle_timeout_seconds
+        ping = encode_frame(ws_event(WSEventType.HEALTH_PING.value, {}))
+
+        self._released(self.sessions.expire(now))
 
-    async def broadcast_all(self, message: dict) -> None:
-        logger.info("[WS] broadcasting to all: %s", message)
         for conn_id, conn in list(self.connections.items()):
-            try:
-                await conn.ws.send_json(message)
-                logger.info("[WS] sent to %s", conn_id)
-            except WebSocketDisconnect:
-                self.disconnect(conn_id)
-            except Exception:
-                logger.exception("[WS] failed to send to %s", conn_id)
+            if conn.token_exp <= now_ts:
+                self.close(conn_id, WS_CLOSE_POLICY_VIOLATION, "token_expired")
+            elif now - conn.last_seen > idle_timeout:
+                self.close(conn_id, WS_CLOSE_GOING_AWAY, "idle_timeout")
+            elif not conn.send_queue.put(ping):
                 self.disconnect(conn_id)
 
-    async def broadcast_scope(self, scope: str, message: dict) -> None:
-        connection_ids = self._connections_by_scope.get(scope, set())
+    def start(self) -> None:
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
 
-        for conn_id in list(connection_ids):
-            conn = self.connections.get(conn_id)
-            if not conn:
-                connection_ids.discard(conn_id)
-                continue
+    async def stop(self) -> None:
+        if self._sweeper is None:
+            return
+
+        self._sweeper.cancel()
+        await asyncio.gather(self._sweeper, return_exceptions=True)
+        self._sweeper = None
 
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.ws_sweep_interval_seconds)
             try:
-                await conn.ws.send_json(message)
-            except WebSocketDisconnect:
-                self.disconnect(conn_id)
+                self.sweep()
             except Exception:
-                logger.exception("[WS] failed to send to %s", conn_id)
+                logger.exception("[WS] sweep failed")
+
+    def subscribe(self, connection_id: ConnectionId, scope: str) -> None:
+        conn = self.connections.get(connection_id)
+        if conn is None:
+            return
+
+        # One shared key object per scope, however many connections hold it
+        scope = sys.intern(scope)
+        subscribers = self._connections_by_scope.get(scope)
+        if subscribers is None:
+            subscribers = self._connections_by_scope[scope] = set()
+            backplane.watch(scope)
+
+        subscribers.add(connection_id)
+        conn.scopes.add(scope)
+        logger.debug("[WS] %s subscribed to %s", connection_id, scope)
+
+    def unsubscribe(self, connection_id: ConnectionId, scope: str) -> None:
+        conn = self.connections.get(connection_id)
+        if conn is None or scope not in conn.scopes:
+            return
+
+        conn.scopes.discard(scope)
+        self._leave_scope(connection_id, scope)
+        logger.debug("[WS] %s unsubscribed from %s", connection_id, scope)
+
+    def _leave_scope(self, connection_id: ConnectionId, scope: str) -> None:
+        subscribers = self._connections_by_scope.get(scope)
+        if subscribers is None:
+            return
+
+        subscribers.discard(connection_id)
+        if not subscribers:
+            del self._connections_by_scope[scope]
+            self._released({scope})
+
+    def _released(self, scopes: Set[str]) -> None:
+        """Stop buffering scopes that no connection or session needs now."""
+        for scope in scopes:
+            if scope not in self._connections_by_scope and not self.sessions.holds(
+                scope
+            ):
+                self.sessions.forget(scope)
+                backplane.unwatch(scope)
+
+    async def broadcast_all(self, message: dict) -> None:
+        self._fanout(list(self.connections), message)
+
+    async def broadcast_scope(self, scope: str, message: dict) -> None:
+        await self.broadcast_scopes([scope], message)
+
+    async def broadcast_scopes(self, scopes: Iterable[str], message: dict) -> None:
+        """
+        Queue one event for the subscribers of any of `scopes`.
+
+        A connection subscribed to several of them (a conversation and its
+        user's my_conversations) gets the event once.
+        """
+        live = [
+            scope
+            for scope in scopes
+            if scope in self._connections_by_scope or self.sessions.holds(scope)
+        ]
+        if not live:
+            return
+
+        connection_ids: Set[ConnectionId] = set()
+        for scope in live:
+            connection_ids |= self._connections_by_scope.get(scope, set())
+
+        self.stream_seq += 1
+        message = {**message, "stream_seq": self.stream_seq}
+        self._fanout(connection_ids, message, buffer_scopes=live)
+
+    def _fanout(
+        self,
+        connection_ids: Iterable[ConnectionId],
+        message: dict,
+        buffer_scopes: Sequence[str] = (),
+    ) -> None:
+        """
+        Queue one event for many connections.
+
+        The event is serialized once; each connection's writer puts it on the
+        wire, so the caller never waits on a socket. Scoped events are also
+        kept for replay.
+        """
+        started_at = time.perf_counter()
+        frame = encode_frame(message)
+        key = coalesce_key(message)
+
+        for scope in buffer_scopes:
+            self.sessions.record(scope, message["stream_seq"], frame)
+
+        for conn_id in connection_ids:
+            conn = self.connections.get(conn_id)
+            if conn is not None and not conn.send_queue.put(frame, key):
                 self.disconnect(conn_id)
 
+        self._broadcast_seconds.observe(time.perf_counter() - started_at)
+
 
 # singleton instance
 ws_manager = WSManager()
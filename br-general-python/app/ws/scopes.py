@@ -0,0 +1,48 @@
+"""
+WS scope keys.
+
+Clients name a scope as {"scope": <kind>, "id": <id>}; internally a scope is
+a string key shared by WSManager, the replay buffers and the backplane
+channels.
+
+- conversation: one conversation, {"scope": "conversation", "id": ...}
+- my_conversations: every conversation the user participates in
+- orders: all order events (admins only)
+"""
+
+from typing import Optional
+
+CONVERSATION = "conversation"
+MY_CONVERSATIONS = "my_conversations"
+ORDERS = "orders"
+
+# Scopes subscribed without an id
+WILDCARD_SCOPES = {MY_CONVERSATIONS, ORDERS}
+
+ORDERS_SCOPE = "ws:orders"
+
+
+def conversation_scope(conversation_id: str) -> str:
+    return f"ws:conversation:{conversation_id}"
+
+
+def user_conversations_scope(user_id: str) -> str:
+    return f"ws:user:{user_id}:conversations"
+
+
+def scope_key(kind: str, scope_id: Optional[str], user_id: str) -> str:
+    """Key of a client scope; `scope_id` is ignored for wildcards."""
+    if kind == MY_CONVERSATIONS:
+        return user_conversations_scope(user_id)
+    if kind == ORDERS:
+        return ORDERS_SCOPE
+    return conversation_scope(str(scope_id))
+
+
+def scope_ref(key: str) -> dict:
+    """Client form of a scope key, as sent in acks and session events."""
+    if key == ORDERS_SCOPE:
+        return {"scope": ORDERS}
+    if key.startswith("ws:user:"):
+        return {"scope": MY_CONVERSATIONS}
+    return {"scope": CONVERSATION, "id": key.removeprefix("ws:conversation:")}
@@ -0,0 +1,215 @@
+"""
+Per-connection outbound queue.
+
+Broadcasts only append pre-serialized frames; a writer task per connection
+drains its queue onto the socket. A stuck browser fills its own queue
+instead of holding up `emit` and whoever called it (inbound webhooks,
+Stripe, the AI flow).
+
+When a queue is full the overflow policy decides what gives:
+
+- `drop_oldest`: discard the oldest queued frame.
+- `coalesce`: replace a queued `conversation_updated` for the same
+  conversation, otherwise drop the oldest frame.
+- `disconnect`: discard the backlog, send `resync_required` and close; the
+  client reconnects and catches up with GET /sync.
+"""
+
+import asyncio
+import json
+from collections import deque
+from typing import Callable, Deque, Literal, Optional, Tuple
+
+from fastapi import WebSocket
+
+from app.logging import logger
+from app.metrics import metrics
+from app.ws.event_types import WSEventType
+from app.ws.events import ws_event
+
+OverflowPolicy = Literal["drop_oldest", "coalesce", "disconnect"]
+
+# "Try Again Later": the client should reconnect and catch up via /sync
+WS_CLOSE_TRY_AGAIN_LATER = 1013
+
+# (coalesce key, serialized frame)
+Frame = Tuple[Optional[str], str]
+
+
+def encode_frame(message: dict) -> str:
+    """Serialize an event the same way WebSocket.send_json does."""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def coalesce_key(message: dict) -> Optional[str]:
+    """Events with the same key supersede each other in a full queue."""
+    if message.get("type") != WSEventType.CONVERSATION_UPDATED.value:
+        return None
+
+    conversation_id = message.get("data", {}).get("conversation_id")
+    if not conversation_id:
+        return None
+    return f"{WSEventType.CONVERSATION_UPDATED.value}:{conversation_id}"
+
+
+class SendQueue:
+    # One per connection; keep the instance compact
+    __slots__ = (
+        "ws",
+        "max_size",
+        "policy",
+        "send_timeout",
+        "_on_failure",
+        "_frames",
+        "_wakeup",
+        "_idle",
+        "_close_code",
+        "_task",
+        "_overflows",
+        "_send_timeouts",
+    )
+
+    def __init__(
+        self,
+        ws: WebSocket,
+        *,
+        max_size: int,
+        policy: OverflowPolicy,
+        send_timeout: float,
+        on_failure: Callable[[], None],
+    ) -> None:
+        self.ws = ws
+        self.max_size = max(max_size, 1)
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self._on_failure = on_failure
+
+        self._frames: Deque[Frame] = deque()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._close_code: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self._overflows = metrics.counter(
+            "ws_send_queue_overflows_total",
+            "Frames that found their connection's send queue full",
+            {"policy": policy},
+        )
+        self._send_timeouts = metrics.counter(
+            "ws_send_timeouts_total", "Connections evicted for a slow send"
+        )
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    @property
+    def closing(self) -> bool:
+        return self._close_code is not None
+
+    def start(self) -> None:
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self) -> None:
+        """Abandon queued frames, unless a close is already being flushed."""
+        if self.closing:
+            return
+
+        self._frames.clear()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def drain(self) -> None:
+        """Wait until every queued frame is written (and a close is done)."""
+        await self._idle.wait()
+
+    def put(self, frame: str, key: Optional[str] = None) -> bool:
+        """
+        Queue a frame for the writer.
+
+        Returns False when the connection has to be dropped (it is already
+        closing, or the overflow policy is `disconnect`).
+        """
+        if self.closing:
+            return False
+
+        if len(self._frames) >= self.max_size:
+            self._overflows.inc()
+
+            if self.policy == "disconnect":
+                self._frames.clear()
+                self.close(
+                    WS_CLOSE_TRY_AGAIN_LATER, _resync_frame("send_queue_overflow")
+                )
+                return False
+
+            superseded = None
+            if self.policy == "coalesce" and key is not None:
+                superseded = next((f for f in self._frames if f[0] == key), None)
+
+            if superseded is not None:
+                self._frames.remove(superseded)
+            else:
+                self._frames.popleft()
+
+        self._frames.append((key, frame))
+        self._idle.clear()
+        self._wakeup.set()
+        return True
+
+    def close(self, code: int, frame: Optional[str] = None) -> None:
+        """Close the socket after the queued frames and `frame` are written."""
+        if self.closing:
+            return
+
+        if frame is not None:
+            self._frames.append((None, frame))
+        self._close_code = code
+        self._idle.clear()
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        try:
+            await self._write()
+            await asyncio.wait_for(
+                self.ws.close(code=self._close_code), timeout=self.send_timeout
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+        finally:
+            self._idle.set()
+
+    async def _write(self) -> None:
+        """Write frames until the queue is closed or a send fails."""
+        try:
+            while True:
+                if not self._frames:
+                    if self.closing:
+                        return
+                    self._idle.set()
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                _, frame = self._frames.popleft()
+                await asyncio.wait_for(
+                    self.ws.send_text(frame), timeout=self.send_timeout
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            if isinstance(exc, asyncio.TimeoutError):
+                self._send_timeouts.inc()
+                logger.warning("[WS] evicting slow connection")
+            else:
+                logger.info("[WS] send failed: %r", exc)
+
+            self._frames.clear()
+            self._close_code = WS_CLOSE_TRY_AGAIN_LATER
+            self._on_failure()
+
+
+def _resync_frame(reason: str) -> str:
+    return encode_frame(ws_event(WSEventType.RESYNC_REQUIRED.value, {"reason": reason}))
@@ -0,0 +1,117 @@
+"""
+Resumable WebSocket sessions.
+
+Every event fanned out to a scope gets a `stream_seq` from the worker's
+WSManager and is kept, already serialized, in a bounded replay buffer for
+that scope. When a socket goes away its session (user and scopes) is kept
+for `ws_session_ttl_seconds`; the scopes stay buffered meanwhile. A client
+that reconnects with the session id and the last `stream_seq` it saw gets
+its subscriptions back and the missed frames replayed.
+
+Sessions and stream sequences are per worker. A client that lands on a
+different worker, or whose gap outgrew a buffer, is told to resync through
+GET /sync instead.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+# (stream_seq, serialized frame)
+BufferedFrame = Tuple[int, str]
+
+
+@dataclass(slots=True)
+class DetachedSession:
+    user_id: str
+    scopes: Set[str]
+    # time.monotonic() seconds
+    expires_at: float
+
+
+class ReplayBuffer:
+    __slots__ = ("frames", "dropped_through")
+
+    def __init__(self, size: int) -> None:
+        self.frames: Deque[BufferedFrame] = deque(maxlen=max(size, 1))
+        # stream_seq of the newest frame pushed out of the buffer
+        self.dropped_through = 0
+
+    def append(self, stream_seq: int, frame: str) -> None:
+        if len(self.frames) == self.frames.maxlen:
+            self.dropped_through = self.frames[0][0]
+        self.frames.append((stream_seq, frame))
+
+    def since(self, stream_seq: int) -> Optional[List[BufferedFrame]]:
+        """Frames after `stream_seq`, or None if some of them were dropped."""
+        if self.dropped_through > stream_seq:
+            return None
+        return [item for item in self.frames if item[0] > stream_seq]
+
+
+class SessionStore:
+    """Detached sessions and the per-scope replay buffers."""
+
+    def __init__(self, buffer_size: int) -> None:
+        self.buffer_size = buffer_size
+        self._detached: Dict[str, DetachedSession] = {}
+        # scope -> number of detached sessions holding it
+        self._holders: Dict[str, int] = {}
+        self._buffers: Dict[str, ReplayBuffer] = {}
+
+    def __len__(self) -> int:
+        return len(self._detached)
+
+    def holds(self, scope: str) -> bool:
+        return scope in self._holders
+
+    def detach(
+        self, session_id: str, user_id: str, scopes: Set[str], expires_at: float
+    ) -> None:
+        self._detached[session_id] = DetachedSession(
+            user_id=user_id, scopes=set(scopes), expires_at=expires_at
+        )
+        for scope in scopes:
+            self._holders[scope] = self._holders.get(scope, 0) + 1
+
+    def claim(self, session_id: str, user_id: str) -> Optional[DetachedSession]:
+        """Take a detached session of `user_id` out of the store."""
+        session = self._detached.get(session_id)
+        if session is None or session.user_id != user_id:
+            return None
+
+        self._release(session_id)
+        return session
+
+    def expire(self, now: float) -> Set[str]:
+        """Drop expired sessions; return the scopes they held."""
+        released: Set[str] = set()
+        for session_id, session in list(self._detached.items()):
+            if session.expires_at <= now:
+                self._release(session_id)
+                released |= session.scopes
+        return released
+
+    def record(self, scope: str, stream_seq: int, frame: str) -> None:
+        buffer = self._buffers.get(scope)
+        if buffer is None:
+            buffer = self._buffers[scope] = ReplayBuffer(self.buffer_size)
+        buffer.append(stream_seq, frame)
+
+    def replay(self, scope: str, stream_seq: int) -> Optional[List[BufferedFrame]]:
+        buffer = self._buffers.get(scope)
+        if buffer is None:
+            return []
+        return buffer.since(stream_seq)
+
+    def forget(self, scope: str) -> None:
+        self._buffers.pop(scope, None)
+
+    def _release(self, session_id: str) -> None:
+        session = self._detached.pop(session_id)
+        for scope in session.scopes:
+            remaining = self._holders[scope] - 1
+            if remaining:
+                self._holders[scope] = remaining
+            else:
+                del self._holders[scope]
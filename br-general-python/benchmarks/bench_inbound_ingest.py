@@ -0,0 +1,119 @@
+"""
+Benchmark: per-message DB latency of inbound ingestion.
+
+Compares the legacy sequence of Prisma calls (contact upsert, conversation
+get-or-create, participant count, message insert, COUNT(*) over messages,
+timestamp update) with the single-statement CTE in `ingest_repo`.
+
+Requires a migrated database from DATABASE_URL with at least one ADMIN user.
+Rows are created under throwaway platform user prefixes; that run's contacts,
+conversations, messages and outbox events are deleted at the end. Run it with
+the outbox relay stopped, or it broadcasts the benchmark messages.
+
+    cd br-general-python
+    python -m benchmarks.bench_inbound_ingest --messages 200 --contacts 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from app.db import db
+from app.repositories.contact_repository import contact_repo
+from app.repositories.conversation_repository import conversation_repo
+from app.repositories.ingest_repository import ingest_repo
+from app.repositories.message_repository import message_repo
+from app.schemas.platform import Platform
+from app.schemas.source import Source
+from app.services.conversation_service import conversation_service
+
+
+async def legacy_ingest(platform_user_id: str, text: str, remote_id: str) -> None:
+    contact = await contact_repo.upsert(
+        db,
+        platform=Platform.WHATSAPP,
+        platform_user_id=platform_user_id,
+        phone=platform_user_id,
+    )
+    conversation = await conversation_service.start_for_contact(contact_id=contact.id)
+    await message_repo.create(
+        db,
+        conversation_id=conversation.id,
+        platform=Platform.WHATSAPP,
+        text=text,
+        remote_message_id=remote_id,
+        source=Source.CUSTOMER,
+    )
+    await message_repo.count_by_conversation(db, conversation_id=conversation.id)
+    await conversation_repo.update_last_message_at(db, conversation.id)
+
+
+async def cte_ingest(platform_user_id: str, text: str, remote_id: str) -> None:
+    await ingest_repo.ingest_inbound(
+        db,
+        platform=Platform.WHATSAPP,
+        platform_user_id=platform_user_id,
+        phone=platform_user_id,
+        name=None,
+        text=text,
+        remote_message_id=remote_id,
+    )
+
+
+async def run(name, ingest, prefix: str, messages: int, contacts: int) -> None:
+    timings = []
+    for i in range(messages):
+        started = time.perf_counter()
+        await ingest(f"{prefix}-{i % contacts}", f"hello {i}", f"{prefix}-{name}-{i}")
+        timings.append((time.perf_counter() - started) * 1000)
+
+    timings.sort()
+    print(
+        f"{name:>8}: mean {statistics.mean(timings):7.2f} ms  "
+        f"p50 {timings[len(timings) // 2]:7.2f} ms  "
+        f"p95 {timings[int(len(timings) * 0.95)]:7.2f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--contacts", type=int, default=20)
+    args = parser.parse_args()
+
+    legacy_prefix = f"bench-legacy-{uuid.uuid4().hex[:8]}"
+    cte_prefix = f"bench-cte-{uuid.uuid4().hex[:8]}"
+
+    await db.connect()
+    try:
+        await run("legacy", legacy_ingest, legacy_prefix, args.messages, args.contacts)
+        await run("cte", cte_ingest, cte_prefix, args.messages, args.contacts)
+    finally:
+        await cleanup([legacy_prefix, cte_prefix])
+        await db.disconnect()
+
+
+async def cleanup(prefixes: list[str]) -> None:
+    """Delete this run's rows only, outbox events included."""
+    for prefix in prefixes:
+        # Not yet relayed new_message events of the messages created above
+        await db.execute_raw(
+            """
+            DELETE FROM "event_outbox"
+            WHERE "payload"->>'message_id' IN (
+                SELECT "id" FROM "messages"
+                WHERE starts_with("remote_message_id", $1)
+            )
+            """,
+            f"{prefix}-",
+        )
+        # Conversations and messages go with their contact
+        await db.contact.delete_many(
+            where={"platformUserId": {"startswith": f"{prefix}-"}}
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+"""
+Benchmark: WebSocket registry memory per connection and subscribe throughput.
+
+Registers N fake sockets in a fresh `WSManager` (each with its send queue and
+writer task), subscribes every connection to a few conversation scopes and
+reports traced memory per connection, then times subscribe/unsubscribe
+cycles. For comparison the legacy record layout (dataclass with a uuid4 key,
+two datetimes and per-connection scope map entries) is measured on its own.
+
+No database needed.
+
+    cd br-general-python
+    python -m benchmarks.bench_ws_registry --connections 20000 --scopes 3
+"""
+
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from app.settings import settings
+from app.ws.manager import WSManager
+
+
+class FakeWS:
+    async def send_text(self, data: str) -> None:
+        pass
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+
+@dataclass
+class LegacyConnection:
+    id: str
+    ws: object
+    connected_at: datetime
+    user_id: str
+    last_seen: datetime
+    token_exp: int
+
+
+def traced(build) -> int:
+    """Bytes still allocated after `build()`, keeping its result alive."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del keep
+    return after - before
+
+
+def build_legacy(connections: int, scopes: int):
+    records = {}
+    scopes_by_connection = defaultdict(set)
+    connections_by_scope = defaultdict(set)
+    for i in range(connections):
+        connection_id = str(uuid.uuid4())
+        records[connection_id] = LegacyConnection(
+            id=connection_id,
+            ws=None,
+            connected_at=datetime.now(timezone.utc),
+            user_id=f"user-{i % 500}",
+            last_seen=datetime.now(timezone.utc),
+            token_exp=0,
+        )
+        for s in range(scopes):
+            scope = f"ws:conversation:{(i + s) % 1000}"
+            scopes_by_connection[connection_id].add(scope)
+            connections_by_scope[scope].add(connection_id)
+    return records, scopes_by_connection, connections_by_scope
+
+
+def build_registry(manager: WSManager, connections: int, scopes: int):
+    token_exp = int(time.time()) + 3600
+    for i in range(connections):
+        connection_id = manager.connect(FakeWS(), f"user-{i % 500}", token_exp)
+        for s in range(scopes):
+            manager.subscribe(connection_id, f"ws:conversation:{(i + s) % 1000}")
+    return manager
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, default=20000)
+    parser.add_argument("--scopes", type=int, default=3)
+    parser.add_argument("--cycles", type=int, default=200000)
+    args = parser.parse_args()
+
+    legacy = traced(lambda: build_legacy(args.connections, args.scopes))
+    print(f"  legacy records: {legacy / args.connections:8.0f} B/connection")
+
+    # fake users share connections; keep the per-user cap out of the way
+    settings.ws_max_connections_per_user = args.connections
+    manager = WSManager()
+
+    registry = traced(lambda: build_registry(manager, args.connections, args.scopes))
+    print(
+        f"        registry: {registry / args.connections:8.0f} B/connection "
+        "(incl. send queue + writer task)"
+    )
+
+    connection_id = next(iter(manager.connections))
+    started = time.perf_counter()
+    for i in range(args.cycles):
+        scope = f"ws:conversation:bench-{i % 64}"
+        manager.subscribe(connection_id, scope)
+        manager.unsubscribe(connection_id, scope)
+    elapsed = time.perf_counter() - started
+    print(f"sub+unsub cycles: {args.cycles / elapsed:8.0f} /s")
+
+    for connection_id in list(manager.connections):
+        manager.disconnect(connection_id)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
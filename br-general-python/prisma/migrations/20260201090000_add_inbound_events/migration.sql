@@ -0,0 +1,15 @@
+-- CreateTable
+CREATE TABLE "inbound_events" (
+    "id" TEXT NOT NULL,
+    "payload" JSONB NOT NULL,
+    "received_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "locked_until" TIMESTAMP(3),
+    "attempts" INTEGER NOT NULL DEFAULT 0,
+    "last_error" TEXT,
+    "processed_at" TIMESTAMP(3),
+
+    CONSTRAINT "inbound_events_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE INDEX "inbound_events_processed_at_received_at_idx" ON "inbound_events"("processed_at", "received_at");
@@ -0,0 +1,22 @@
+-- AlterTable
+ALTER TABLE "conversations" ADD COLUMN     "message_count" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "inbound_count" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "last_inbound_at" TIMESTAMP(3),
+ADD COLUMN     "last_outbound_at" TIMESTAMP(3);
+
+-- Backfill counters from existing messages
+UPDATE "conversations" c
+SET "message_count" = s."message_count",
+    "inbound_count" = s."inbound_count",
+    "last_inbound_at" = s."last_inbound_at",
+    "last_outbound_at" = s."last_outbound_at"
+FROM (
+    SELECT "conversation_id",
+           COUNT(*)::int AS "message_count",
+           (COUNT(*) FILTER (WHERE "source" = 'CUSTOMER'))::int AS "inbound_count",
+           MAX("created_at") FILTER (WHERE "source" = 'CUSTOMER') AS "last_inbound_at",
+           MAX("created_at") FILTER (WHERE "source" <> 'CUSTOMER') AS "last_outbound_at"
+    FROM "messages"
+    GROUP BY "conversation_id"
+) s
+WHERE c."id" = s."conversation_id";
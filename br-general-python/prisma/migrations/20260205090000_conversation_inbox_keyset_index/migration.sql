@@ -0,0 +1,5 @@
+-- DropIndex
+DROP INDEX "conversations_last_message_at_idx";
+
+-- CreateIndex
+CREATE INDEX "conversations_last_message_at_id_idx" ON "conversations"("last_message_at" DESC, "id" DESC);
@@ -0,0 +1,2 @@
+-- AlterTable
+ALTER TABLE "conversation_participants" ADD COLUMN     "lastReadAt" TIMESTAMP(3);
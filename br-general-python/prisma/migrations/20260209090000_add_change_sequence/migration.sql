@@ -0,0 +1,58 @@
+-- CreateSequence
+-- One sequence shared by every synced table: a client that has seen
+-- change N has seen every change to any of them up to N.
+CREATE SEQUENCE "change_seq";
+
+-- AlterTable
+-- Added nullable without a default: a volatile default would rewrite the
+-- table under an ACCESS EXCLUSIVE lock. Existing rows are backfilled in the
+-- next migration and the column made NOT NULL after that.
+ALTER TABLE "conversations" ADD COLUMN     "change_seq" BIGINT;
+
+-- AlterTable
+ALTER TABLE "messages" ADD COLUMN     "change_seq" BIGINT;
+
+-- AlterTable
+ALTER TABLE "orders" ADD COLUMN     "change_seq" BIGINT;
+
+-- AlterTable
+ALTER TABLE "suggestions" ADD COLUMN     "change_seq" BIGINT;
+
+-- AlterTable
+-- Only applies to new rows; does not touch existing ones
+ALTER TABLE "conversations" ALTER COLUMN "change_seq" SET DEFAULT nextval('change_seq'::regclass);
+
+-- AlterTable
+ALTER TABLE "messages" ALTER COLUMN "change_seq" SET DEFAULT nextval('change_seq'::regclass);
+
+-- AlterTable
+ALTER TABLE "orders" ALTER COLUMN "change_seq" SET DEFAULT nextval('change_seq'::regclass);
+
+-- AlterTable
+ALTER TABLE "suggestions" ALTER COLUMN "change_seq" SET DEFAULT nextval('change_seq'::regclass);
+
+-- CreateFunction
+-- Inserts take the column default; updates move the row to the end of the
+-- sequence whatever client wrote them (Prisma or raw SQL).
+CREATE FUNCTION "bump_change_seq"() RETURNS trigger AS $$
+BEGIN
+    NEW."change_seq" := nextval('change_seq'::regclass);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- CreateTrigger
+CREATE TRIGGER "conversations_bump_change_seq" BEFORE UPDATE ON "conversations"
+    FOR EACH ROW EXECUTE FUNCTION "bump_change_seq"();
+
+-- CreateTrigger
+CREATE TRIGGER "messages_bump_change_seq" BEFORE UPDATE ON "messages"
+    FOR EACH ROW EXECUTE FUNCTION "bump_change_seq"();
+
+-- CreateTrigger
+CREATE TRIGGER "orders_bump_change_seq" BEFORE UPDATE ON "orders"
+    FOR EACH ROW EXECUTE FUNCTION "bump_change_seq"();
+
+-- CreateTrigger
+CREATE TRIGGER "suggestions_bump_change_seq" BEFORE UPDATE ON "suggestions"
+    FOR EACH ROW EXECUTE FUNCTION "bump_change_seq"();
@@ -0,0 +1,25 @@
+-- VALIDATE scans under SHARE UPDATE EXCLUSIVE, which does not block reads or
+-- writes. With the check validated, SET NOT NULL skips its own full-table
+-- scan, so the ACCESS EXCLUSIVE locks below are only held until commit.
+
+-- ValidateConstraint
+ALTER TABLE "conversations" VALIDATE CONSTRAINT "conversations_change_seq_not_null";
+ALTER TABLE "messages" VALIDATE CONSTRAINT "messages_change_seq_not_null";
+ALTER TABLE "orders" VALIDATE CONSTRAINT "orders_change_seq_not_null";
+ALTER TABLE "suggestions" VALIDATE CONSTRAINT "suggestions_change_seq_not_null";
+
+-- AlterTable
+ALTER TABLE "conversations" ALTER COLUMN "change_seq" SET NOT NULL;
+ALTER TABLE "conversations" DROP CONSTRAINT "conversations_change_seq_not_null";
+
+-- AlterTable
+ALTER TABLE "messages" ALTER COLUMN "change_seq" SET NOT NULL;
+ALTER TABLE "messages" DROP CONSTRAINT "messages_change_seq_not_null";
+
+-- AlterTable
+ALTER TABLE "orders" ALTER COLUMN "change_seq" SET NOT NULL;
+ALTER TABLE "orders" DROP CONSTRAINT "orders_change_seq_not_null";
+
+-- AlterTable
+ALTER TABLE "suggestions" ALTER COLUMN "change_seq" SET NOT NULL;
+ALTER TABLE "suggestions" DROP CONSTRAINT "suggestions_change_seq_not_null";
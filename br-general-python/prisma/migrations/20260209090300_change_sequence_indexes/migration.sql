@@ -0,0 +1,11 @@
+-- CreateIndex
+CREATE INDEX "conversations_change_seq_idx" ON "conversations"("change_seq");
+
+-- CreateIndex
+CREATE INDEX "messages_change_seq_idx" ON "messages"("change_seq");
+
+-- CreateIndex
+CREATE INDEX "orders_change_seq_idx" ON "orders"("change_seq");
+
+-- CreateIndex
+CREATE INDEX "suggestions_change_seq_idx" ON "suggestions"("change_seq");
@@ -0,0 +1,15 @@
+-- CreateTable
+CREATE TABLE "event_outbox" (
+    "id" TEXT NOT NULL DEFAULT gen_random_uuid()::text,
+    "event_type" TEXT NOT NULL,
+    "payload" JSONB NOT NULL,
+    "seq" BIGINT,
+    "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "locked_until" TIMESTAMP(3),
+    "attempts" INTEGER NOT NULL DEFAULT 0,
+
+    CONSTRAINT "event_outbox_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE INDEX "event_outbox_created_at_idx" ON "event_outbox"("created_at");
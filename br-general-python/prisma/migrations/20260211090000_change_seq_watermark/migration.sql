@@ -0,0 +1,84 @@
+-- Sequence values are drawn at write time, so a transaction can commit a
+-- lower change_seq after a reader has seen a higher one.
+--
+-- Before its first change_seq, a transaction records its floor, the last
+-- value drawn so far: everything it draws is above it. The floor is held as
+-- a shared advisory lock until the transaction ends, which makes it visible
+-- in pg_locks to other sessions. "change_seq_watermark" returns the lowest
+-- floor of the writers in flight, or the last value drawn when there are
+-- none, without taking a lock or waiting. Every change_seq at or below the
+-- watermark is committed or rolled back.
+--
+-- Advisory locks with a single bigint key are reserved for these floors.
+
+-- AlterTable
+-- The trigger below is the only place a change_seq is drawn
+ALTER TABLE "conversations" ALTER COLUMN "change_seq" SET DEFAULT 0;
+
+-- AlterTable
+ALTER TABLE "messages" ALTER COLUMN "change_seq" SET DEFAULT 0;
+
+-- AlterTable
+ALTER TABLE "orders" ALTER COLUMN "change_seq" SET DEFAULT 0;
+
+-- AlterTable
+ALTER TABLE "suggestions" ALTER COLUMN "change_seq" SET DEFAULT 0;
+
+-- CreateFunction
+CREATE OR REPLACE FUNCTION "bump_change_seq"() RETURNS trigger AS $$
+DECLARE
+    txn_floor BIGINT;
+BEGIN
+    IF COALESCE(current_setting('app.change_seq_floor', true), '') = '' THEN
+        SELECT CASE WHEN "is_called" THEN "last_value" ELSE "last_value" - 1 END
+        INTO txn_floor
+        FROM "change_seq";
+        PERFORM pg_advisory_xact_lock_shared(txn_floor);
+        PERFORM set_config('app.change_seq_floor', txn_floor::text, true);
+    END IF;
+
+    NEW."change_seq" := nextval('change_seq'::regclass);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- CreateTrigger
+CREATE TRIGGER "conversations_insert_change_seq" BEFORE INSERT ON "conversations"
+    FOR EACH ROW EXECUTE FUNCTION "bump_change_seq"();
+
+-- CreateTrigger
+CREATE TRIGGER "messages_insert_change_seq" BEFORE INSERT ON "messages"
+    FOR EACH ROW EXECUTE FUNCTION "bump_change_seq"();
+
+-- CreateTrigger
+CREATE TRIGGER "orders_insert_change_seq" BEFORE INSERT ON "orders"
+    FOR EACH ROW EXECUTE FUNCTION "bump_change_seq"();
+
+-- CreateTrigger
+CREATE TRIGGER "suggestions_insert_change_seq" BEFORE INSERT ON "suggestions"
+    FOR EACH ROW EXECUTE FUNCTION "bump_change_seq"();
+
+-- CreateFunction
+CREATE FUNCTION "change_seq_watermark"() RETURNS BIGINT AS $$
+DECLARE
+    drawn BIGINT;
+    oldest_floor BIGINT;
+BEGIN
+    -- Read the sequence before the locks: a writer whose floor is not
+    -- locked yet draws above this value
+    SELECT CASE WHEN "is_called" THEN "last_value" ELSE "last_value" - 1 END
+    INTO drawn
+    FROM "change_seq";
+
+    SELECT MIN(("classid"::bigint << 32) | "objid"::bigint)
+    INTO oldest_floor
+    FROM pg_locks
+    WHERE "locktype" = 'advisory'
+      AND "objsubid" = 1
+      AND "database" = (
+          SELECT "oid" FROM pg_database WHERE "datname" = current_database()
+      );
+
+    RETURN LEAST(drawn, oldest_floor);
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,25 @@
+-- Sync decides what a user sees by the current conversation_participants
+-- rows, but those rows have no change_seq. Touching the conversation when
+-- its participants change gives it a new change_seq, so a newly added
+-- participant gets it (and can then load its messages) on the next sync.
+-- One UPDATE per statement, whatever client wrote the rows.
+
+-- CreateFunction
+CREATE FUNCTION "touch_participant_conversations"() RETURNS trigger AS $$
+BEGIN
+    UPDATE "conversations"
+    SET "updated_at" = timezone('utc', now())
+    WHERE "id" IN (SELECT DISTINCT "conversationId" FROM changed);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- CreateTrigger
+CREATE TRIGGER "conversation_participants_insert_touch" AFTER INSERT ON "conversation_participants"
+    REFERENCING NEW TABLE AS changed
+    FOR EACH STATEMENT EXECUTE FUNCTION "touch_participant_conversations"();
+
+-- CreateTrigger
+CREATE TRIGGER "conversation_participants_delete_touch" AFTER DELETE ON "conversation_participants"
+    REFERENCING OLD TABLE AS changed
+    FOR EACH STATEMENT EXECUTE FUNCTION "touch_participant_conversations"();